@@ -0,0 +1,281 @@
+import mmap
+import os
+import re
+from array import array
+from functools import lru_cache
+from multiprocessing import Pool
+
+from parquet_convert import is_parquet
+from spans import lastindex_codes, spans_from_matches
+from word_tokenizer_Regex import SENTENCE_END_TOKENS, TOKEN_CLASS_NAMES, find_shard_edges, join_shards, months
+
+# Bytes-mode word tokenizer: the same tokens as gujarati_word_tokenizer, found by
+# a bytes regex running straight over an mmap of the UTF-8 file. The text is never
+# decoded; only the tokens are (or not even those, when they go to a file).
+#
+# Every Gujarati code point (U+0A80-U+0AFF) is 3 bytes in UTF-8 (e0 aa xx or
+# e0 ab xx), so a Gujarati character class becomes a short byte sequence. The
+# Unicode classes of the str pattern (\d, \s, and the \w behind \b in the URL
+# pattern) are turned into byte alternations for all of Unicode, so token edges
+# are exactly where the str regex puts them, also for Devanagari digits or a
+# no-break space.
+#
+# Differences from reading the file in text mode with errors="ignore":
+#   - invalid UTF-8 bytes are never part of a token; text mode drops them, so
+#     letters on both sides of one can end up joined into one word there
+#   - \r and \r\n are read as \n like text mode does (only visible inside a
+#     date token that spans a line break)
+#
+#     tokens = tokenize_file_bytes("indiccorp_gu.txt")       # list of str
+#     process_file_bytes("indiccorp_gu.txt", "indiccorp_gu_words.txt", workers=4)
+# The output file is byte-identical to process_in_chunks / process_in_shards.
+
+
+# --- Code point ranges -> UTF-8 byte patterns ---
+def utf8_sequences(lo, hi, out):
+    # Splits [lo, hi] into ranges whose UTF-8 forms are products of byte ranges
+    # (same length, only the trailing bytes vary over the full 80-bf) and appends
+    # each as a list of (first, last) byte pairs, one per byte position
+    if lo > hi:
+        return
+    for edge in (0x7F, 0x7FF, 0xFFFF):
+        if lo <= edge < hi:
+            utf8_sequences(lo, edge, out)
+            utf8_sequences(edge + 1, hi, out)
+            return
+    if hi > 0x7F:
+        for i in (1, 2, 3):
+            m = (1 << (6 * i)) - 1
+            if lo & ~m != hi & ~m:
+                if lo & m:
+                    utf8_sequences(lo, lo | m, out)
+                    utf8_sequences((lo | m) + 1, hi, out)
+                    return
+                if hi & m != m:
+                    utf8_sequences(lo, (hi & ~m) - 1, out)
+                    utf8_sequences(hi & ~m, hi, out)
+                    return
+    out.append(list(zip(chr(lo).encode(), chr(hi).encode())))
+
+
+def byte_range(first, last):
+    return f'\\x{first:02x}' if first == last else f'[\\x{first:02x}-\\x{last:02x}]'
+
+
+def byte_alternation(sequences):
+    # Alternation of byte sequences, sharing common leading byte ranges
+    groups = {}
+    for seq in sequences:
+        groups.setdefault(seq[0], []).append(seq[1:])
+    alternatives = []
+    for (first, last), rests in groups.items():
+        rests = [r for r in rests if r]
+        head = byte_range(first, last)
+        if rests:
+            inner = byte_alternation(rests)
+            head += inner if '|' not in inner else f'(?:{inner})'
+        alternatives.append(head)
+    return '|'.join(alternatives)
+
+
+def byte_class(ranges):
+    # Pattern source (for a bytes regex) matching one character whose code point
+    # is in one of the (lo, hi) ranges. ASCII comes first as one [...] class.
+    sequences = []
+    for lo, hi in ranges:
+        utf8_sequences(lo, hi, sequences)
+    ascii_part = ''.join(byte_range(*s[0]).strip('[]') for s in sequences if len(s) == 1)
+    alternatives = [f'[{ascii_part}]'] if ascii_part else []
+    multi = [s for s in sequences if len(s) > 1]
+    if multi:
+        alternatives.append(byte_alternation(multi))
+    return '(?:' + '|'.join(alternatives) + ')'
+
+
+@lru_cache(maxsize=None)
+def all_code_points():
+    # Every code point as one str (surrogates replaced by NUL), so the str regex
+    # engine itself tells which ones \d, \s and \w match
+    codes = array('I', range(0x110000))
+    codes[0xD800:0xE000] = array('I', [0]) * 0x800
+    return codes.tobytes().decode('utf-32-le')
+
+
+def unicode_ranges(pattern):
+    # (lo, hi) code point ranges matched by a str pattern like r'\d+'
+    return [(m.start(), m.end() - 1) for m in re.finditer(pattern, all_code_points())]
+
+
+def char_ranges(chars):
+    return [(ord(c), ord(c)) for c in sorted(set(chars))]
+
+
+# --- The bytes pattern ---
+# Mirrors word_tokenizer_Regex: the same alternatives in the same order. The email
+# alternative (^...$, so only ever the whole text) is checked on its own first.
+EMAIL_PATTERN = re.compile(rb'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}(?:\.[a-zA-Z]{2,})?')
+# what $ may still leave after the match, without / with newline translation
+LINE_ENDS = {False: (b'', b'\n'), True: (b'', b'\n', b'\r\n', b'\r')}
+
+
+@lru_cache(maxsize=None)
+def byte_word_pattern(tagged=False):
+    # tagged=True puts every alternative in a group named after its token class
+    # (as WORD_PATTERN_TAGGED does), for byte_word_spans
+    guj_start = byte_class([(0x0A80, 0x0AE5), (0x0AF0, 0x0AFF)])
+    guj = byte_class([(0x0A80, 0x0AFF)])
+    guj_digit = byte_class([(0x0AE6, 0x0AEF)])
+    guj_matra = byte_class([(0x0ABE, 0x0ACC), (0x0A81, 0x0A83), (0x0ACD, 0x0ACD)])
+    # \d: ASCII digits first, so a non-digit ASCII byte fails on one class test
+    digit = '(?:[0-9]|' + byte_class([r for r in unicode_ranges(r'\d+') if r[0] > 0x7F]) + ')'
+    space = byte_class(unicode_ranges(r'\s+'))
+    word = byte_class(unicode_ranges(r'\w+'))
+    month = byte_class(char_ranges(months))
+    punct = byte_class(char_ranges('.।,!?…'))
+    # \b after the TLD, whose last char is a word char unless it is ( or )
+    boundary = f'(?:(?<=[()])(?={word})|(?<![()])(?!{word}))'
+    url = r'https?://(?:www\.)?[-a-zA-Z0-9@:%._+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}' + boundary + r'[-a-zA-Z0-9()@:%_+.~#?&/=]*'
+    date = (f'{digit}{{1,2}}[-/]{digit}{{1,2}}[-/]{digit}{{2,4}}'
+            f'|{digit}{{1,2}}{space}*{month}+{space}*{digit}{{2,4}}')
+    num = f'{digit}+(?:[.,]{digit}+)+'
+    alternatives = [f'{guj_start}{guj}*', url, date, rf'{digit}+\.', num, r'\.\.\.', punct,
+                    f'{guj_digit}+', f'{digit}+', f'{guj}+{guj_matra}*']
+    if tagged:
+        names = ['guj_letters'] + [name for name in TOKEN_CLASS_NAMES if name != 'email']
+        alternatives = [f'(?P<{name}>{p})' for name, p in zip(names, alternatives)]
+    # no token starts with any other byte; checked before trying the alternatives
+    first_byte = r'(?=[0-9.,!?h\x80-\xff])'
+    return re.compile((first_byte + '(?:' + '|'.join(alternatives) + ')').encode('ascii'))
+
+
+# --- Tokenizing a buffer ---
+def byte_tokens(buf, start=0, end=None, translate_newlines=False):
+    # Tokens (bytes) of buf[start:end]. buf is anything with the buffer protocol:
+    # bytes, bytearray, an mmap. start/end must be where no token can continue
+    # across (0 / len(buf), or edges from find_shard_edges); nothing is copied.
+    # translate_newlines reads \r\n and \r as \n, like text mode.
+    if end is None:
+        end = len(buf)
+    tokens = []
+    if start == 0:
+        # ^...$: the whole buffer, except for one final line break
+        m = EMAIL_PATTERN.match(buf)
+        if m is not None and buf[m.end():m.end() + 3] in LINE_ENDS[translate_newlines]:
+            tokens.append(m.group())
+            start = m.end()
+    tokens += byte_word_pattern().findall(buf, start, end)
+    if translate_newlines and buf.find(b'\r', start, end) != -1:
+        tokens = [t.replace(b'\r\n', b'\n').replace(b'\r', b'\n') if b'\r' in t else t for t in tokens]
+    return tokens
+
+
+def byte_word_spans(buf, start=0, end=None):
+    # byte_tokens as a spans.Spans of byte offsets into buf, with the token class
+    # codes of word_tokenizer_Regex.gujarati_word_spans; nothing is copied or decoded
+    if end is None:
+        end = len(buf)
+    email = None
+    if start == 0:
+        m = EMAIL_PATTERN.match(buf)
+        if m is not None and buf[m.end():m.end() + 3] in LINE_ENDS[False]:
+            email = m.end()
+            start = email
+    pattern = byte_word_pattern(tagged=True)
+    codes = lastindex_codes(pattern, TOKEN_CLASS_NAMES, {'guj_letters': 'guj_word'})
+    spans = spans_from_matches(pattern.finditer(buf, start, end), end, codes, TOKEN_CLASS_NAMES)
+    if email is not None:
+        spans.starts.insert(0, 0)
+        spans.ends.insert(0, email)
+        spans.classes.insert(0, TOKEN_CLASS_NAMES.index('email'))
+    return spans
+
+
+def decode_tokens(tokens):
+    # All tokens in one decode: no token can contain a NUL byte
+    if not tokens:
+        return []
+    return b'\x00'.join(tokens).decode('utf-8').split('\x00')
+
+
+def byte_word_tokenizer(data):
+    # Same as gujarati_word_tokenizer(data.decode("utf-8")) for valid UTF-8 bytes
+    return decode_tokens(byte_tokens(data))
+
+
+def open_mmap(f):
+    # An empty file can't be mmapped; b"" tokenizes the same
+    if os.fstat(f.fileno()).st_size == 0:
+        return b""
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def tokenize_file_bytes(input_file):
+    # All tokens of a file as str, like list(iter_file_tokens(input_file))
+    with open(input_file, "rb") as f:
+        buf = open_mmap(f)
+        try:
+            return decode_tokens(byte_tokens(buf, translate_newlines=True))
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+
+
+# --- File to file, without decoding anything ---
+SENTENCE_END_BYTES = {t.encode('utf-8') for t in SENTENCE_END_TOKENS}
+
+
+def write_byte_tokens(tokens, outfile):
+    # write_tokens for bytes tokens and a binary file; returns the number of tokens
+    parts = []
+    for word in tokens:
+        parts.append(word)
+        parts.append(b'\n' if word in SENTENCE_END_BYTES else b' ')
+    outfile.write(b''.join(parts))
+    return len(tokens)
+
+
+def tokenize_byte_ranges(input_file, edges, output_file):
+    # Tokenizes bytes [edges[0], edges[-1]) of input_file into output_file, one
+    # findall per [edges[i], edges[i + 1]); edges are where no token continues
+    n = 0
+    with open(input_file, "rb") as f, open(output_file, "wb") as outfile:
+        buf = open_mmap(f)
+        try:
+            for start, end in zip(edges, edges[1:]):
+                n += write_byte_tokens(byte_tokens(buf, start, end, translate_newlines=True), outfile)
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+    return n
+
+
+def process_file_bytes(input_file, output_file, workers=1, chunk_size=1024 * 256):
+    # Bytes-mode process_in_chunks (workers=1) / process_in_shards (workers > 1):
+    # same output file, without decoding the input. Returns the number of tokens.
+    # Each findall holds its piece's tokens as bytes objects (over 10x the piece
+    # size on this corpus), so pieces are much smaller than process_in_chunks'.
+    if is_parquet(input_file):
+        raise ValueError("process_file_bytes needs a UTF-8 text file, not parquet")
+    with open(input_file, "rb") as f:
+        buf = open_mmap(f)
+        if isinstance(buf, mmap.mmap):
+            with buf:
+                # about chunk_size bytes per findall, and at least one piece per worker
+                edges = find_shard_edges(buf, max(workers, len(buf) // chunk_size))
+        else:
+            edges = [0, 0]
+    pieces = len(edges) - 1
+    workers = min(workers, pieces)
+    if workers <= 1:
+        return tokenize_byte_ranges(input_file, edges, output_file)
+    # contiguous runs of pieces, one per worker
+    bounds = [pieces * i // workers for i in range(workers + 1)]
+    jobs = [(input_file, edges[bounds[i]:bounds[i + 1] + 1], f"{output_file}.{i:03d}") for i in range(workers)]
+    with Pool(workers) as pool:
+        counts = pool.starmap(tokenize_byte_ranges, jobs)
+    join_shards([job[2] for job in jobs], output_file)
+    return sum(counts)
+
+
+if __name__ == "__main__":
+    process_file_bytes("indiccorp_gu.txt", "indiccorp_gu_words.txt", workers=os.cpu_count())
@@ -0,0 +1,267 @@
+import hashlib
+import math
+import os
+from collections import deque
+
+# One accumulator for every metrics pass (sentence files, word files, raw
+# sentence lists). Counts are plain numbers, so shards built in different
+# processes can be merged with merge() and the result is the same as one pass.
+#
+# Distinct words (for TTR) can be counted two ways:
+#   exact=True   a set of every word type (5.7M strings on IndicCorp, GBs of RAM)
+#   exact=False  HyperLogLog with 2**precision one-byte registers. The relative
+#                standard error of the distinct count is 1.04 / sqrt(2**precision):
+#                precision=14 -> 16 KB of registers, about 0.81% (so TTR is within
+#                about +-1.6% of the exact value 95% of the time).
+
+
+class HyperLogLog:
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(self.m)
+
+    def add_many(self, words):
+        # blake2b instead of hash(): hash() is salted per process, so registers
+        # from different processes could not be merged
+        p = self.precision
+        rest_bits = 64 - p
+        rest_mask = (1 << rest_bits) - 1
+        regs = self.registers
+        for w in words:
+            h = int.from_bytes(hashlib.blake2b(w.encode("utf-8"), digest_size=8).digest(), "little")
+            idx = h >> rest_bits
+            rank = rest_bits - (h & rest_mask).bit_length() + 1
+            if rank > regs[idx]:
+                regs[idx] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("cannot merge HyperLogLog sketches with different precision")
+        regs = self.registers
+        for i, r in enumerate(other.registers):
+            if r > regs[i]:
+                regs[i] = r
+
+    def count(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # small range correction (linear counting)
+            return m * math.log(m / zeros)
+        return estimate
+
+
+class CorpusStats:
+    def __init__(self, exact=True, precision=14, mattr_window=500, max_sentence_len=100):
+        self.exact = exact
+        self.total_sentences = 0
+        self.total_words = 0
+        self.total_chars = 0
+        self.unique_words = set() if exact else None
+        self.hll = None if exact else HyperLogLog(precision)
+        # set instead when the distinct count is already known (e.g. from a bincount)
+        self.known_distinct = None
+        # words waiting to go into the sketch, deduplicated first so each type is
+        # hashed once per batch instead of once per token
+        self._pending = set()
+        # moving-average TTR (MATTR): mean TTR over every window of mattr_window tokens
+        self.mattr_window = mattr_window
+        self.mattr_sum = 0.0
+        self.mattr_windows = 0
+        self._window = deque()
+        self._window_counts = {}
+        # sentence_length_hist[n] = sentences with n words; the last bucket is n >= max_sentence_len
+        self.max_sentence_len = max_sentence_len
+        self.sentence_length_hist = [0] * (max_sentence_len + 1)
+
+    def add_sentence(self, sentence):
+        sentence = sentence.strip()
+        if sentence:
+            self.add(sentence.split(), len(sentence))
+
+    def add(self, words, chars, is_sentence=True):
+        # words: the tokens of one line/sentence, chars: how many characters to
+        # count for it (callers differ on whether spaces count)
+        if is_sentence:
+            self.total_sentences += 1
+            self.sentence_length_hist[min(len(words), self.max_sentence_len)] += 1
+        self.total_words += len(words)
+        self.total_chars += chars
+        if self.exact:
+            self.unique_words.update(words)
+        else:
+            self._pending.update(words)
+            if len(self._pending) >= 50000:
+                self._flush()
+        if self.mattr_window:
+            self._update_mattr(words)
+
+    def _flush(self):
+        if self._pending:
+            self.hll.add_many(self._pending)
+            self._pending = set()
+
+    def _update_mattr(self, words):
+        window, counts, size = self._window, self._window_counts, self.mattr_window
+        for w in words:
+            window.append(w)
+            counts[w] = counts.get(w, 0) + 1
+            if len(window) > size:
+                old = window.popleft()
+                if counts[old] == 1:
+                    del counts[old]
+                else:
+                    counts[old] -= 1
+            if len(window) == size:
+                self.mattr_sum += len(counts) / size
+                self.mattr_windows += 1
+
+    def merge(self, other):
+        # Windows that would straddle the two shards are not counted, which
+        # changes MATTR by a negligible amount on large shards.
+        if other.exact != self.exact:
+            raise ValueError("cannot merge exact and approximate CorpusStats")
+        self.total_sentences += other.total_sentences
+        self.total_words += other.total_words
+        self.total_chars += other.total_chars
+        if self.exact:
+            self.unique_words.update(other.unique_words)
+        else:
+            self._flush()
+            other._flush()
+            self.hll.merge(other.hll)
+        self.mattr_sum += other.mattr_sum
+        self.mattr_windows += other.mattr_windows
+        for n, c in enumerate(other.sentence_length_hist[:len(self.sentence_length_hist)]):
+            self.sentence_length_hist[n] += c
+        return self
+
+    def __getstate__(self):
+        # the MATTR window only matters while counting; don't ship it between processes
+        if not self.exact:
+            self._flush()
+        state = self.__dict__.copy()
+        state["_window"] = deque()
+        state["_window_counts"] = {}
+        return state
+
+    @property
+    def distinct_words(self):
+        if self.known_distinct is not None:
+            return self.known_distinct
+        if self.exact:
+            return len(self.unique_words)
+        self._flush()
+        return round(self.hll.count())
+
+    @property
+    def ttr(self):
+        return self.distinct_words / self.total_words if self.total_words else 0
+
+    @property
+    def mattr(self):
+        return self.mattr_sum / self.mattr_windows if self.mattr_windows else self.ttr
+
+    @property
+    def words_per_sentence(self):
+        return self.total_words / self.total_sentences if self.total_sentences else 0
+
+    @property
+    def avg_chars_per_word(self):
+        return self.total_chars / self.total_words if self.total_words else 0
+
+    def write_metrics(self, metrics_filename, approx_sentences=False):
+        # approx_sentences=True is the word-file layout (sentences guessed from punctuation)
+        ttr_note = "" if self.exact else f" (HyperLogLog, +-{2 * self.hll.relative_error:.2%})"
+        with open(metrics_filename, "w", encoding="utf-8") as m:
+            if approx_sentences:
+                m.write(f"Total words: {self.total_words}\n")
+                m.write(f"Total characters: {self.total_chars}\n")
+                m.write(f"Number of sentences (approx): {self.total_sentences}\n")
+                m.write(f"Words per sentence (approx): {self.words_per_sentence:.2f}\n")
+            else:
+                m.write(f"Total sentences: {self.total_sentences}\n")
+                m.write(f"Total words: {self.total_words}\n")
+                m.write(f"Total characters: {self.total_chars}\n")
+                m.write(f"Words per sentence: {self.words_per_sentence:.2f}\n")
+            m.write(f"Average characters per word: {self.avg_chars_per_word:.2f}\n")
+            m.write(f"Type-Token Ratio (TTR): {self.ttr:.4f}{ttr_note}\n")
+            if self.mattr_window:
+                m.write(f"Moving-average TTR (window {self.mattr_window}): {self.mattr:.4f}\n")
+            m.write("Sentence length histogram (words: sentences):\n")
+            for n, c in enumerate(self.sentence_length_hist):
+                if c:
+                    label = f"{n}+" if n == self.max_sentence_len else str(n)
+                    m.write(f"  {label}: {c}\n")
+
+
+# --- Sharded metrics over a file ---
+SENTENCE_ENDINGS = ['.', '।', '\u0964', '…', '...']
+
+
+def add_line(stats, line, line_kind):
+    if line_kind == "sentence":
+        # one sentence per line, characters include the spaces
+        stats.add_sentence(line)
+    else:
+        # word-tokenizer output: tokens per line, characters exclude the spaces,
+        # a line counts as a sentence if it has sentence-ending punctuation
+        words = line.split()
+        stats.add(words, sum(map(len, words)), any(p in line for p in SENTENCE_ENDINGS))
+
+
+def text_lines(raw):
+    # The lines a text-mode read gives for one b"\n"-terminated line read in
+    # binary that contains a \r: universal newlines also end a line at a lone
+    # \r and turn \r\n into \n. A \r\n never straddles two binary lines, so
+    # this is exact.
+    line = raw.decode("utf-8", errors="ignore")
+    parts = line.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return [part + "\n" for part in parts[:-1]] + ([parts[-1]] if parts[-1] else [])
+
+
+def stats_for_range(filename, start, end, line_kind, options):
+    # Lines that start in [start, end) (byte offsets), split like the lines of
+    # the file opened in text mode, so any sharding gives the same totals
+    stats = CorpusStats(**options)
+    with open(filename, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()  # finish the line that started before this range
+        pos = f.tell()
+        for line in f:
+            if pos >= end:
+                break
+            pos += len(line)
+            if b"\r" in line:
+                for text in text_lines(line):
+                    add_line(stats, text, line_kind)
+            else:
+                add_line(stats, line.decode("utf-8", errors="ignore"), line_kind)
+    return stats
+
+
+def file_stats(filename, line_kind="sentence", workers=1, **options):
+    # line_kind: "sentence" (one sentence per line) or "words" (word-tokenizer output)
+    size = os.path.getsize(filename)
+    if workers == 1:
+        # the same reader as the shards, so the worker count never changes the result
+        return stats_for_range(filename, 0, size, line_kind, options)
+
+    from multiprocessing import Pool
+
+    edges = [size * i // workers for i in range(workers + 1)]
+    jobs = [(filename, edges[i], edges[i + 1], line_kind, options) for i in range(workers)]
+    with Pool(workers) as pool:
+        shards = pool.starmap(stats_for_range, jobs)
+    stats = shards[0]
+    for shard in shards[1:]:
+        stats.merge(shard)
+    return stats
@@ -0,0 +1,241 @@
+import atexit
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Opt-in instrumentation for gujarati_sentence_tokenizer, gujarati_word_tokenizer
+# and process_in_chunks. Nothing is measured unless a Recorder is active: each of
+# those functions reads `instrumentation.active` once per call and takes its
+# normal code path when it is None, so a disabled run pays one attribute lookup.
+#
+# Enable it around a block:
+#     with instrumentation.enabled(log_file="run.jsonl", trace_memory=True) as rec:
+#         process_in_chunks("indiccorp_gu.txt", "indiccorp_gu_words.txt")
+#     print(rec.summary())
+# or for a whole script run: TOKENIZER_TRACE=run.jsonl python word_tokenizer_Regex.py
+# (TOKENIZER_TRACE_MEMORY=1 adds tracemalloc peaks).
+#
+# Events (one JSON object per line in the log, the same dicts go to the callback):
+#   {"event": "call", "fn": ..., "seconds": ..., "stages": {stage: seconds},
+#    "peak_bytes": {stage: bytes}, "counts": {...}}            one per tokenizer call
+#   {"event": "chunk", "fn": "process_in_chunks", "index": i, "chars": n,
+#    "read_s": ..., "latency_s": ..., "peak_bytes": ...}       one per input chunk
+#   {"event": "summary", ...}                                  totals, when disabled
+# Every event also has "pid", so logs from forked workers can be told apart.
+# peak_bytes are tracemalloc peaks above the memory in use when the stage started.
+
+active = None
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class Call:
+    # Bookkeeping for one instrumented call. Stages are consecutive: mark(stage)
+    # charges the time since the previous mark (or the start) to that stage.
+
+    def __init__(self, recorder, fn, **fields):
+        self.recorder = recorder
+        self.fn = fn
+        self.fields = fields
+        self.stages = {}
+        self.peaks = {}
+        self.counts = {}
+        self.chunk_index = 0
+        self.start = self._last = time.perf_counter()
+        self._base = recorder.reset_peak()
+
+    def add(self, stage, seconds, peak=None):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        if peak is not None and peak > self.peaks.get(stage, -1):
+            self.peaks[stage] = peak
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        peak = None
+        if self.recorder.trace_memory:
+            peak = self.recorder.take_peak() - self._base
+            self._base = self.recorder.reset_peak()
+        self.add(stage, now - self._last, peak)
+        # tracemalloc bookkeeping above is not charged to the next stage
+        self._last = time.perf_counter()
+
+    def timed_chunks(self, chunks, stage="read"):
+        # Yields the chunks, timing each next() as `stage` and emitting one chunk
+        # event per chunk. latency_s is the time from handing a chunk on to asking
+        # for the next one, i.e. everything done downstream with that chunk.
+        rec = self.recorder
+        it = iter(chunks)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                chunk = next(it)
+            except StopIteration:
+                self.add(stage, time.perf_counter() - t0)
+                return
+            t1 = time.perf_counter()
+            self.add(stage, t1 - t0)
+            base = rec.reset_peak()
+            yield chunk
+            t2 = time.perf_counter()
+            event = {"event": "chunk", "fn": self.fn, "index": self.chunk_index, "chars": len(chunk),
+                     "read_s": t1 - t0, "latency_s": t2 - t1}
+            if rec.trace_memory:
+                event["peak_bytes"] = peak = rec.take_peak() - base
+                self.peaks["chunk"] = max(self.peaks.get("chunk", 0), peak)
+            rec.chunk_latencies.setdefault(self.fn, []).append(t2 - t1)
+            rec.emit(event)
+            self.chunk_index += 1
+
+    def timed_writer(self, outfile, stage="write"):
+        return TimedWriter(outfile, self, stage)
+
+    def done(self, rest=None, **counts):
+        # rest names the stage that gets the time not charged to any other stage
+        seconds = time.perf_counter() - self.start
+        if rest is not None:
+            self.stages[rest] = self.stages.get(rest, 0.0) + seconds - sum(self.stages.values())
+        self.counts.update(counts)
+        event = {"event": "call", "fn": self.fn, **self.fields, "seconds": seconds,
+                 "stages": self.stages, "counts": self.counts}
+        if self.recorder.trace_memory:
+            event["peak_bytes"] = self.peaks
+        self.recorder.finish_call(self)
+        self.recorder.emit(event)
+
+
+class TimedWriter:
+    # File stand-in that charges the time spent in write() to one stage
+
+    def __init__(self, outfile, call, stage):
+        self._outfile = outfile
+        self._call = call
+        self._stage = stage
+
+    def write(self, s):
+        t0 = time.perf_counter()
+        n = self._outfile.write(s)
+        self._call.add(self._stage, time.perf_counter() - t0)
+        return n
+
+    def __getattr__(self, name):
+        return getattr(self._outfile, name)
+
+
+class Recorder:
+    def __init__(self, callback=None, log_file=None, trace_memory=False):
+        self.callback = callback
+        self.log_file = log_file
+        self.trace_memory = trace_memory
+        self.calls = {}           # fn -> number of calls
+        self.seconds = {}         # fn -> total seconds
+        self.stages = {}          # fn -> {stage: seconds}
+        self.counts = {}          # fn -> {key: total}
+        self.chunk_latencies = {}
+        self.peak_bytes = 0
+        self._log = None
+        self._started_tracing = False
+
+    def start(self):
+        if self.log_file is not None:
+            # appended and line buffered, so forked workers can share the file
+            self._log = open(self.log_file, "a", encoding="utf-8", buffering=1)
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def stop(self):
+        self.emit({"event": "summary", **self.summary()})
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def emit(self, event):
+        event["pid"] = os.getpid()
+        if self.callback is not None:
+            self.callback(event)
+        if self._log is not None:
+            self._log.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def call(self, fn, **fields):
+        return Call(self, fn, **fields)
+
+    def reset_peak(self):
+        # Starts a new peak window, returns the memory in use at its start
+        if not self.trace_memory:
+            return 0
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak_bytes = max(self.peak_bytes, peak)
+        tracemalloc.reset_peak()
+        return current
+
+    def take_peak(self):
+        if not self.trace_memory:
+            return 0
+        peak = tracemalloc.get_traced_memory()[1]
+        self.peak_bytes = max(self.peak_bytes, peak)
+        return peak
+
+    def finish_call(self, call):
+        fn = call.fn
+        self.calls[fn] = self.calls.get(fn, 0) + 1
+        self.seconds[fn] = self.seconds.get(fn, 0.0) + time.perf_counter() - call.start
+        stages = self.stages.setdefault(fn, {})
+        for stage, seconds in call.stages.items():
+            stages[stage] = stages.get(stage, 0.0) + seconds
+        counts = self.counts.setdefault(fn, {})
+        for key, n in call.counts.items():
+            if isinstance(n, dict):
+                sub = counts.setdefault(key, {})
+                for k, v in n.items():
+                    sub[k] = sub.get(k, 0) + v
+            else:
+                counts[key] = counts.get(key, 0) + n
+
+    def summary(self):
+        latency = {}
+        for fn, values in self.chunk_latencies.items():
+            values = sorted(values)
+            latency[fn] = {"chunks": len(values), "mean_s": sum(values) / len(values),
+                           "p50_s": percentile(values, 0.50), "p99_s": percentile(values, 0.99),
+                           "max_s": values[-1]}
+        out = {"calls": self.calls, "seconds": self.seconds, "stages": self.stages,
+               "counts": self.counts, "chunk_latency": latency}
+        if self.trace_memory:
+            self.take_peak()
+            out["peak_bytes"] = self.peak_bytes
+        return out
+
+
+@contextmanager
+def enabled(callback=None, log_file=None, trace_memory=False):
+    global active
+    previous = active
+    active = Recorder(callback, log_file, trace_memory).start()
+    try:
+        yield active
+    finally:
+        active.stop()
+        active = previous
+
+
+def enable_from_env():
+    # TOKENIZER_TRACE=<log file> turns instrumentation on for the whole process
+    global active
+    log_file = os.environ.get("TOKENIZER_TRACE")
+    if not log_file or active is not None:
+        return
+    active = Recorder(log_file=log_file, trace_memory=os.environ.get("TOKENIZER_TRACE_MEMORY") == "1").start()
+    atexit.register(active.stop)
+
+
+enable_from_env()
@@ -1,11 +1,76 @@
-import pandas as pd
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # only needed once a .parquet file is read or written
+    pa = pq = None
 
-# Read each line as a sentence
-with open("gu_sentences_indic_corp.txt", "r", encoding="utf-8", errors="ignore") as f:
-    sentences = [line.strip() for line in f if line.strip()]  
+# Streaming text <-> Parquet. The converter writes one row group per
+# rows_per_group sentences, so memory is one batch of sentences instead of the
+# whole corpus plus a DataFrame copy. The readers go record batch by record batch,
+# and the tokenizers use them to take a .parquet file wherever they take a text file.
 
-# Create DataFrame
-df = pd.DataFrame(sentences, columns=["text"])
+SCHEMA = pa.schema([("text", pa.string())]) if pa is not None else None
 
-# Save as Parquet
-df.to_parquet("gu_sentences_indic_corp.parquet", index=False)
\ No newline at end of file
+
+def require_pyarrow():
+    if pq is None:
+        raise ImportError(".parquet files need pyarrow (pip install pyarrow)")
+
+
+def convert_to_parquet(input_file, output_file, rows_per_group=500000, compression="zstd",
+                       compression_level=None, use_dictionary=False):
+    # One row per non-empty line, like the old list + DataFrame version.
+    # use_dictionary=False because sentences are almost all distinct, so a
+    # dictionary page only costs time; turn it on for short repetitive lines.
+    require_pyarrow()
+    rows = 0
+    with open(input_file, "r", encoding="utf-8", errors="ignore") as f, \
+         pq.ParquetWriter(output_file, SCHEMA, compression=compression,
+                          compression_level=compression_level, use_dictionary=use_dictionary) as writer:
+        batch = []
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            batch.append(line)
+            if len(batch) >= rows_per_group:
+                writer.write_table(pa.table({"text": batch}, schema=SCHEMA), row_group_size=rows_per_group)
+                rows += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(pa.table({"text": batch}, schema=SCHEMA), row_group_size=rows_per_group)
+            rows += len(batch)
+    return rows
+
+
+def is_parquet(path):
+    return str(path).lower().endswith(".parquet")
+
+
+def num_row_groups(parquet_file):
+    require_pyarrow()
+    return pq.ParquetFile(parquet_file).num_row_groups
+
+
+def iter_parquet_rows(parquet_file, column="text", batch_size=65536, row_groups=None):
+    # Lists of strings, one per record batch (null rows dropped).
+    # row_groups limits the read to those row groups, e.g. one shard's range.
+    require_pyarrow()
+    pf = pq.ParquetFile(parquet_file)
+    for batch in pf.iter_batches(batch_size=batch_size, columns=[column], row_groups=row_groups):
+        yield [r for r in batch.column(0).to_pylist() if r is not None]
+
+
+def iter_parquet_text(parquet_file, column="text", batch_size=65536, row_groups=None):
+    # Text chunks with one row per line: the same text the .txt version gives
+    for rows in iter_parquet_rows(parquet_file, column, batch_size, row_groups):
+        if rows:
+            yield "\n".join(rows) + "\n"
+
+
+def row_group_text(parquet_file, group, column="text"):
+    return "".join(iter_parquet_text(parquet_file, column, row_groups=[group]))
+
+
+if __name__ == "__main__":
+    convert_to_parquet("gu_sentences_indic_corp.txt", "gu_sentences_indic_corp.parquet")
@@ -0,0 +1,372 @@
+import hashlib
+import json
+import sys
+from array import array
+
+from sentence_tokenizer_Regex import ChunkedTextGenerator, gujarati_sentence_tokenizer
+
+try:
+    import numpy as np
+except ImportError:  # checked when a SentenceDeduper is made
+    np = None
+
+# Optional dedup stage after gujarati_sentence_tokenizer: drops sentences that
+# were already seen, so boilerplate repeated all over a web corpus (IndicCorp)
+# is tokenized, measured and counted once.
+#
+#   exact  same sentence after collapsing whitespace. Each sentence is a 64-bit
+#          blake2b key in an open-addressing numpy table (HashIndex): 12 bytes a
+#          slot instead of a str in a set.
+#   near   (near=True) also drops a sentence whose estimated Jaccard similarity
+#          to an earlier one is at least threshold. Shingles are character
+#          5-grams of the casefolded text, MinHash signatures have bands * rows
+#          values, and LSH finds candidates: two sentences are compared when all
+#          rows of one band agree. Candidates are checked on their signatures, so
+#          the threshold is what decides, not just a band collision.
+#
+# The tables live in max_mem_mb, counting their first allocation: each starts
+# at most at its share of the budget (but never below one 12-byte slot per
+# table, 17 of them with near=True). When one is full, sentences are still
+# written, they just are not remembered any more (the report says so); nothing
+# is ever dropped without a match.
+#
+# dedup_file_parallel is segment_file_parallel with the dedup in it: workers
+# segment chunks and compute keys and signatures (the expensive part), the
+# parent checks them against the tables in input order and writes the kept
+# sentences. The output is the same for any number of workers.
+#
+#     report = dedup_file_parallel("indiccorp_gu.txt", "gu_sentences_dedup.txt", near=True)
+# or: python sentence_dedup.py INPUT OUTPUT [--near] [--workers N] [--report FILE]
+
+NGRAM = 5
+MAX_LOAD = 0.5
+
+
+def exact_key(sentence):
+    return int.from_bytes(hashlib.blake2b(" ".join(sentence.split()).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def exact_keys(sentences):
+    return array("Q", map(exact_key, sentences))
+
+
+class MinHasher:
+    # bands * rows MinHash values per sentence from hash functions fixed by seed,
+    # so every worker process computes the same signatures. The functions are
+    # multiply-shift, (a * x + b) mod 2^64 >> 32 with odd a: no integer modulo,
+    # which would be most of the time here.
+    def __init__(self, bands=16, rows=4, ngram=NGRAM, seed=1):
+        rng = np.random.default_rng(seed)
+        self.bands, self.rows, self.ngram = bands, rows, ngram
+        self.a = rng.integers(1, 1 << 63, bands * rows, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 1 << 63, bands * rows, dtype=np.uint64)
+        self.gram_weights = rng.integers(1, 1 << 62, ngram, dtype=np.uint64) | np.uint64(1)
+        self.band_weights = rng.integers(1, 1 << 62, rows, dtype=np.uint64) | np.uint64(1)
+
+    def shingle_hashes(self, sentences):
+        # (hashes, owner): one hash per character n-gram of each normalized
+        # sentence, and the index of the sentence it came from. All sentences are
+        # joined with NUL so the n-grams are one sliding window; windows that
+        # cross a NUL are dropped. Short sentences are padded to one n-gram.
+        n = self.ngram
+        joined = "\x00".join(" ".join(s.casefold().split()).ljust(n) for s in sentences)
+        codes = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        sep = codes == 0
+        owner = np.cumsum(sep)
+        windows = np.lib.stride_tricks.sliding_window_view(codes, n)
+        hashes = (windows * self.gram_weights).sum(axis=1)  # wraps mod 2^64
+        count = len(hashes)
+        valid = (owner[n - 1:] == owner[:count]) & ~sep[:count]
+        return hashes[valid], owner[:count][valid]
+
+    def signatures(self, sentences, max_grams=1 << 15):
+        # (len(sentences), bands * rows) uint32 MinHash signatures, a few
+        # thousand n-grams at a time so the (values, n-grams) matrix stays small
+        out = np.empty((len(sentences), self.bands * self.rows), dtype=np.uint32)
+        start = 0
+        while start < len(sentences):
+            stop, chars = start, 0
+            while stop < len(sentences) and (stop == start or chars + len(sentences[stop]) <= max_grams):
+                chars += len(sentences[stop])
+                stop += 1
+            hashes, owner = self.shingle_hashes(sentences[start:stop])
+            values = np.multiply.outer(self.a, hashes)
+            values += self.b[:, None]
+            values >>= np.uint64(32)
+            firsts = np.searchsorted(owner, np.arange(stop - start))
+            out[start:stop] = np.minimum.reduceat(values, firsts, axis=1).T
+            start = stop
+        return out
+
+    def band_keys(self, signatures):
+        # (n, bands) uint64: one key per band, equal when all its rows are equal
+        rows = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        return (rows * self.band_weights).sum(axis=2)
+
+
+class HashIndex:
+    # uint64 key -> uint32 value, open addressing with linear probing, kept at
+    # most half full and grown by doubling up to max_bytes. Every operation takes
+    # a whole batch of keys (numpy), so a probe round is one vectorized step.
+    # Slot key 0 means empty; a key of 0 is stored as 1.
+    SLOT_BYTES = 12
+
+    def __init__(self, max_bytes, capacity=1 << 12):
+        # starts with the largest power of two slots that fits max_bytes too
+        self.max_bytes = max_bytes
+        self.count = 0
+        self.full = False
+        slots = max(1, min(capacity, max_bytes // self.SLOT_BYTES))
+        self._alloc(1 << (slots.bit_length() - 1))
+
+    def _alloc(self, capacity):
+        self.keys = np.zeros(capacity, dtype=np.uint64)
+        self.values = np.zeros(capacity, dtype=np.uint32)
+        self.mask = np.uint64(capacity - 1)
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + self.values.nbytes
+
+    def lookup(self, keys):
+        # values for keys, -1 where a key is not in the table
+        keys = np.where(keys == 0, np.uint64(1), keys)
+        out = np.full(len(keys), -1, dtype=np.int64)
+        idx = np.arange(len(keys))
+        slots = keys & self.mask
+        while len(idx):
+            found = self.keys[slots]
+            hit = found == keys[idx]
+            out[idx[hit]] = self.values[slots[hit]]
+            more = ~hit & (found != 0)
+            idx, slots = idx[more], (slots[more] + np.uint64(1)) & self.mask
+        return out
+
+    def insert(self, keys, values):
+        # keys must be distinct and not in the table yet. Returns False (and
+        # inserts nothing) when the table would have to grow past max_bytes.
+        if self.count + len(keys) > len(self.keys) * MAX_LOAD:
+            capacity = len(self.keys)
+            while self.count + len(keys) > capacity * MAX_LOAD:
+                capacity *= 2
+            if capacity * self.SLOT_BYTES > self.max_bytes:
+                self.full = True
+                return False
+            used = self.keys != 0
+            old_keys, old_values = self.keys[used], self.values[used]
+            self._alloc(capacity)
+            self._place(old_keys, old_values)
+        self._place(np.where(keys == 0, np.uint64(1), keys), values)
+        self.count += len(keys)
+        return True
+
+    def _place(self, keys, values):
+        idx = np.arange(len(keys))
+        slots = keys & self.mask
+        while len(idx):
+            empty = np.flatnonzero(self.keys[slots] == 0)
+            # several keys can reach the same empty slot in one round: the first takes it
+            taken, first = np.unique(slots[empty], return_index=True)
+            winners = empty[first]
+            self.keys[taken] = keys[idx[winners]]
+            self.values[taken] = values[idx[winners]]
+            rest = np.ones(len(idx), dtype=bool)
+            rest[winners] = False
+            idx, slots = idx[rest], (slots[rest] + np.uint64(1)) & self.mask
+
+
+def first_in_batch(keys):
+    # (unique keys, index of each key's first occurrence, and for every position
+    # the index of its key in unique)
+    return np.unique(keys, return_index=True, return_inverse=True)
+
+
+class SentenceDeduper:
+    # Parent side: the tables and the report. filter() takes one batch of
+    # sentences with their keys (and signatures) and says which to keep.
+    def __init__(self, near=False, threshold=0.8, bands=16, rows=4, max_mem_mb=1024):
+        if np is None:
+            raise ImportError("sentence dedup needs numpy (pip install numpy)")
+        budget = int(max_mem_mb * (1 << 20))
+        self.near = near
+        self.threshold = threshold
+        self.minhasher = MinHasher(bands, rows) if near else None
+        # per sentence: 24 bytes exact, 24 per band, 2 per signature value
+        if near:
+            per_sentence = 24 + 24 * bands + 2 * bands * rows
+            self.exact = HashIndex(budget * 24 // per_sentence)
+            self.band_tables = [HashIndex(budget * 24 // per_sentence) for _ in range(bands)]
+            self.max_signatures = budget // per_sentence
+            self.signatures = np.zeros((min(1 << 12, self.max_signatures), bands * rows), dtype=np.uint16)
+        else:
+            self.exact = HashIndex(budget)
+        self.stored = 0
+        self.report = {"sentences_in": 0, "sentences_out": 0, "exact_duplicates": 0, "near_duplicates": 0,
+                       "chars_in": 0, "chars_out": 0, "memory_full": False}
+
+    def _store(self, signatures):
+        # keeps the (16-bit) signatures of a batch; returns their ids, or None when full
+        n = len(signatures)
+        if self.stored + n > self.max_signatures:
+            return None
+        if self.stored + n > len(self.signatures):
+            capacity = len(self.signatures)
+            while self.stored + n > capacity:
+                capacity *= 2
+            grown = np.zeros((min(capacity, self.max_signatures), self.signatures.shape[1]), dtype=np.uint16)
+            grown[:self.stored] = self.signatures[:self.stored]
+            self.signatures = grown
+        self.signatures[self.stored:self.stored + n] = signatures
+        ids = np.arange(self.stored, self.stored + n)
+        self.stored += n
+        return ids
+
+    def _similar(self, a, b):
+        return (a == b).mean(axis=1) >= self.threshold
+
+    def _near_duplicates(self, signatures):
+        # True for each sentence of the batch that is near an earlier one (in an
+        # earlier batch, or earlier in this one)
+        n = len(signatures)
+        keys = self.minhasher.band_keys(signatures)
+        short = signatures.astype(np.uint16)
+        ids = self._store(short)
+        near = np.zeros(n, dtype=bool)
+        here = np.arange(n)
+        for band, table in enumerate(self.band_tables):
+            prior = table.lookup(keys[:, band])
+            unique, first, inverse = first_in_batch(keys[:, band])
+            earlier = first[inverse]
+            check = prior >= 0
+            near[check] |= self._similar(self.signatures[prior[check]], short[check])
+            check = (prior < 0) & (earlier != here)
+            near[check] |= self._similar(short[earlier[check]], short[check])
+            new = prior[first] < 0
+            if ids is not None and not table.full:
+                table.insert(unique[new], ids[first[new]].astype(np.uint32))
+        return near
+
+    def filter(self, sentences, keys, signatures=None):
+        # keys: exact_keys(sentences) (array or bytes), signatures: MinHasher
+        # signatures when near. Returns a bool array, True = keep.
+        keys = np.frombuffer(keys, dtype=np.uint64)
+        n = len(keys)
+        keep = np.ones(n, dtype=bool)
+        if n:
+            unique, first, inverse = first_in_batch(keys)
+            seen = self.exact.lookup(unique) >= 0
+            exact = seen[inverse] | (first[inverse] != np.arange(n))
+            if not self.exact.full:
+                new = ~seen
+                self.exact.insert(unique[new], np.zeros(int(new.sum()), dtype=np.uint32))
+            keep &= ~exact
+            self.report["exact_duplicates"] += int(exact.sum())
+            if self.near:
+                rest = np.flatnonzero(keep)
+                near = self._near_duplicates(signatures[rest])
+                keep[rest[near]] = False
+                self.report["near_duplicates"] += int(near.sum())
+        report = self.report
+        report["sentences_in"] += n
+        report["sentences_out"] += int(keep.sum())
+        report["chars_in"] += sum(map(len, sentences))
+        report["chars_out"] += sum(len(s) for s, k in zip(sentences, keep) if k)
+        report["memory_full"] = self.exact.full or (self.near and (any(t.full for t in self.band_tables)
+                                                                   or self.stored >= self.max_signatures))
+        return keep
+
+    def summary(self):
+        r = dict(self.report)
+        r["sentence_reduction"] = 1 - r["sentences_out"] / r["sentences_in"] if r["sentences_in"] else 0.0
+        r["char_reduction"] = 1 - r["chars_out"] / r["chars_in"] if r["chars_in"] else 0.0
+        r["table_bytes"] = self.exact.nbytes + (sum(t.nbytes for t in self.band_tables) + self.signatures.nbytes
+                                                if self.near else 0)
+        return r
+
+
+def keys_for(sentences, minhasher=None):
+    # Worker side: everything the parent needs to check a batch of sentences
+    signatures = minhasher.signatures(sentences) if minhasher is not None and sentences else None
+    return exact_keys(sentences).tobytes(), signatures
+
+
+def dedup_sentences(sentences, deduper, batch_size=4096):
+    # Kept sentences of an iterable, in order (in one process)
+    batch = []
+    for s in sentences:
+        batch.append(s)
+        if len(batch) >= batch_size:
+            yield from _kept(batch, deduper)
+            batch = []
+    yield from _kept(batch, deduper)
+
+
+def _kept(batch, deduper):
+    keys, signatures = keys_for(batch, deduper.minhasher)
+    return [s for s, k in zip(batch, deduper.filter(batch, keys, signatures)) if k]
+
+
+_worker_minhasher = None
+
+
+def _init_worker(near_params):
+    global _worker_minhasher
+    _worker_minhasher = MinHasher(*near_params) if near_params else None
+
+
+def segment_and_hash(text_chunk):
+    # Worker side of dedup_file_parallel
+    sentences = gujarati_sentence_tokenizer(text_chunk)
+    return (sentences,) + keys_for(sentences, _worker_minhasher)
+
+
+def dedup_file_parallel(input_file, output_file, workers=None, char_limit=5000000, near=False,
+                        threshold=0.8, bands=16, rows=4, max_mem_mb=1024, report_file=None):
+    # segment_file_parallel with exact (and near) duplicate sentences dropped.
+    # Returns the report (see SentenceDeduper.summary), also written as JSON to
+    # report_file if given.
+    from multiprocessing import Pool, cpu_count
+
+    workers = workers or cpu_count()
+    deduper = SentenceDeduper(near, threshold, bands, rows, max_mem_mb)
+    near_params = (bands, rows) if near else None
+    chunk_gen = ChunkedTextGenerator(input_file, char_limit=char_limit, sentence_safe=True)
+    with open(output_file, "w", encoding="utf-8") as outfile:
+        def write(result):
+            sentences, keys, signatures = result
+            keep = deduper.filter(sentences, keys, signatures)
+            outfile.write("".join(s + "\n\n" for s, k in zip(sentences, keep) if k))
+
+        if workers == 1:
+            _init_worker(near_params)
+            for text_chunk in chunk_gen:
+                write(segment_and_hash(text_chunk))
+        else:
+            with Pool(workers, initializer=_init_worker, initargs=(near_params,)) as pool:
+                for result in pool.imap(segment_and_hash, chunk_gen):
+                    write(result)
+    report = deduper.summary()
+    if report_file is not None:
+        with open(report_file, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def print_report(report):
+    print(f"Sentences: {report['sentences_in']} -> {report['sentences_out']} "
+          f"({report['sentence_reduction']:.1%} fewer; {report['exact_duplicates']} exact, "
+          f"{report['near_duplicates']} near duplicates)")
+    print(f"Characters: {report['chars_in']} -> {report['chars_out']} ({report['char_reduction']:.1%} fewer)")
+    print(f"Tables: {report['table_bytes'] / (1 << 20):.1f} MB"
+          + ("; memory bound reached, later sentences were not all remembered" if report["memory_full"] else ""))
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if len(args) < 2:
+        print("usage: python sentence_dedup.py INPUT OUTPUT [--near] [--workers N] [--report FILE]")
+        sys.exit(1)
+    workers = int(args[args.index("--workers") + 1]) if "--workers" in args else None
+    report_file = args[args.index("--report") + 1] if "--report" in args else None
+    print_report(dedup_file_parallel(args[0], args[1], workers=workers, near="--near" in args,
+                                     report_file=report_file))
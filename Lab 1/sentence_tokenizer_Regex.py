@@ -1,53 +1,252 @@
+import os
 import re
+from functools import lru_cache
+
+import instrumentation
+from corpus_stats import CorpusStats, file_stats
+from parquet_convert import is_parquet, iter_parquet_rows
+from spans import Spans, offset_array
+
+# Patterns to protect
+url_pattern = r'https?:\/\/(www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b([-a-zA-Z0-9()@:%_\+.~#?&//=]*)'
+email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}(?:\.[a-zA-Z]{2,})?$'
+date_pattern = r'\d{1,2}[-/]\d{1,2}[-/]\d{2,4}|\d{1,2}\s*(જાન્યુઆરી|ફેબ્રુઆરી|માર્ચ|એપ્રિલ|મે|જૂન|જુલાઈ|ઑગસ્ટ|સપ્ટેમ્બર|ઑક્ટોબર|નવેમ્બર|ડિસેમ્બર)\s*\d{2,4}'
+ellipsis_pattern = r'\.\.\.'
+# Abbreviations (e.g., Dr., Mr., etc. and Gujarati abbreviations), one per line in
+# abbreviations.txt; more can be added with use_abbreviations / GUJARATI_ABBREVIATIONS
+ABBREVIATIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "abbreviations.txt")
+
+
+def check_abbreviation(a, where=""):
+    # without a dot there is nothing to protect, and with whitespace the
+    # chunking rules (is_synced_line_start) would no longer hold
+    if "." not in a or any(ch.isspace() for ch in a):
+        raise ValueError(f"{where}abbreviation needs a dot and no whitespace: {a!r}")
+    return a
+
+
+def load_abbreviations(path):
+    abbreviations = []
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            abbreviations.append(check_abbreviation(line, f"{path}:{lineno}: "))
+    return abbreviations
+
+
+DEFAULT_ABBREVIATIONS = load_abbreviations(ABBREVIATIONS_FILE)
+abbrs = [re.escape(a) for a in DEFAULT_ABBREVIATIONS]
+abbr_pattern = r'(' + '|'.join(abbrs) + r')'
+# Numbers (Gujarati/English) followed by dot (e.g., 18. or ૧૮.)
+num_dot_pattern = r'(?:\d+|[\u0AE6-\u0AEF]+)\.'
+# Words with matra followed by dot (e.g., "તા.")
+guj_word_matra_dot = r'([\u0A80-\u0AFF]+[\u0ABE-\u0ACC\u0A81-\u0A83\u0ACD]+)\.'
+# Sentence ending punctuation followed by whitespace
+sentence_end_pattern = r'([\.!?।\u0964])\s+'
+
+
+def abbreviation_pattern(abbreviations):
+    # The abbreviations as one regex shaped like a trie: shared prefixes are
+    # matched once, and at each step only the branches for the next character
+    # can get past their first literal, so the time per position depends on the
+    # length of the abbreviations, not on how many there are. Longer
+    # abbreviations are tried first (the text continues past a shorter one).
+    # The lookaheads skip positions that can't start one: wrong first character,
+    # or no dot before the next whitespace.
+    if not abbreviations:
+        return "(?!)"
+    trie = {}
+    for a in abbreviations:
+        node = trie
+        for ch in a:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def walk(node):
+        branches = [re.escape(ch) + walk(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")" + ("?" if "" in node else "")
+
+    first = "".join(sorted({re.escape(a[0]) for a in abbreviations}))
+    return rf"(?=[{first}])(?=[^\s.]*+\.)" + walk(trie)
+
+
+# Single-pass scanner: every protected element and every sentence end is one
+# alternative of the same regex, so a left-to-right finditer walks the text once.
+# The alternatives are in the same priority order as the old re.sub passes.
+# Only a sentence end can split text, so a protected match just needs to swallow
+# its dot; (?!\.\.) stops a trailing dot from stealing the start of an ellipsis
+# (the ellipsis pass always ran first), and the matra rule only needs the two
+# characters before the dot to protect exactly the same dots as the long form.
+def scanner_protected(abbreviations):
+    return [
+        ('ellipsis', ellipsis_pattern),
+        ('url', url_pattern),
+        ('email', email_pattern),
+        ('date', date_pattern),
+        ('abbr', '(?:' + abbreviation_pattern(abbreviations) + r')(?!\.\.)'),
+        ('num_dot', num_dot_pattern + r'(?!\.\.)'),
+        ('matra_dot', r'[\u0A80-\u0AFF][\u0ABE-\u0ACC\u0A81-\u0A83\u0ACD]\.(?!\.\.)'),
+    ]
+
+
+SCANNER_END = r'(?P<end>[\.!?।\u0964])\s+'
+
+
+@lru_cache(maxsize=8)
+def build_scanners(abbreviations):
+    # (scanner, tagged scanner) for a tuple of abbreviations, compiled once per
+    # lexicon. The tagged one has each protected alternative in a named group so
+    # the instrumented path can count them by kind (m.lastgroup).
+    protected = scanner_protected(abbreviations)
+    return (re.compile('|'.join(p for _, p in protected) + '|' + SCANNER_END),
+            re.compile('|'.join(f'(?P<{kind}>{p})' for kind, p in protected) + '|' + SCANNER_END))
+
+
+SENTENCE_SCANNER, SENTENCE_SCANNER_TAGGED = build_scanners(tuple(sorted(set(DEFAULT_ABBREVIATIONS))))
+
+
+def use_abbreviations(*paths, words=(), replace=False):
+    # Adds the abbreviations in the files at paths (and words) to the lexicon the
+    # tokenizer uses, or replaces the default list with them (replace=True).
+    # Worker processes started by fork inherit it; with spawn, set
+    # GUJARATI_ABBREVIATIONS instead so every process loads the files on import.
+    global SENTENCE_SCANNER, SENTENCE_SCANNER_TAGGED
+    abbreviations = [] if replace else list(DEFAULT_ABBREVIATIONS)
+    for path in paths:
+        abbreviations.extend(load_abbreviations(path))
+    abbreviations.extend(check_abbreviation(w) for w in words)
+    # sorted and deduplicated so the same lexicon always hits the same cache entry
+    SENTENCE_SCANNER, SENTENCE_SCANNER_TAGGED = build_scanners(tuple(sorted(set(abbreviations))))
+
+
+if os.environ.get("GUJARATI_ABBREVIATIONS"):
+    use_abbreviations(*os.environ["GUJARATI_ABBREVIATIONS"].split(os.pathsep))
+
+
+def merge_short_sentences(sentences):
+    # Merge sentences with less than 3 words with previous sentence
+    merged = []
+    for s in sentences:
+        if merged and len(s.split()) < 3:
+            merged[-1] = merged[-1].rstrip() + ' ' + s
+        else:
+            merged.append(s)
+    return merged
+
 
 def gujarati_sentence_tokenizer(text):
-    # Patterns to protect
-    url_pattern = r'https?:\/\/(www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9]{1,6}0-9(\b([-a-zA-Z)@:%_\+.~#?&//=]*)'
-    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}(?:\.[a-zA-Z]{2,})?$'
-    date_pattern = r'\d{1,2}[-/]\d{1,2}[-/]\d{2,4}|\d{1,2}\s*(જાન્યુઆરી|ફેબ્રુઆરી|માર્ચ|એપ્રિલ|મે|જૂન|જુલાઈ|ઑગસ્ટ|સપ્ટેમ્બર|ઑક્ટોબર|નવેમ્બર|ડિસેમ્બર)\s*\d{2,4}'
-    
-    # Protect URLs, emails, dates, ellipsis by replacing them with placeholders
+    # One scan: protected elements are skipped over, sentence ends cut the text.
+    # Nothing is replaced, so there are no placeholders to restore afterwards.
+    if instrumentation.active is not None:
+        return gujarati_sentence_tokenizer_instrumented(text, instrumentation.active)
+    sentences = []
+    start = 0
+    for m in SENTENCE_SCANNER.finditer(text):
+        if m.lastgroup != "end":
+            continue
+        sentence = text[start:m.end("end")].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = m.end()
+
+    # Handle the last part if there's no ending punctuation
+    last = text[start:].strip()
+    if last:
+        sentences.append(last)
+
+    return merge_short_sentences(sentences)
+
+
+# gujarati_sentence_spans: at least 3 words (merge_short_sentences keeps it apart)
+THREE_WORDS = re.compile(r'\s*\S+\s+\S+\s+\S')
+LEADING_SPACE = re.compile(r'\s*')
+
+
+def gujarati_sentence_spans(text):
+    # The sentences of gujarati_sentence_tokenizer(text) as a spans.Spans of
+    # (start, end) offsets into text (no classes), without creating any strings.
+    # A sentence merged by merge_short_sentences spans all of its pieces, so
+    # text[start:end] keeps the original whitespace where the tokenizer puts ' '.
+    starts, ends = offset_array(len(text)), offset_array(len(text))
+
+    def add(a, b):
+        # merge_short_sentences, on offsets
+        if starts and not THREE_WORDS.match(text, a, b):
+            ends[-1] = b
+        else:
+            starts.append(a)
+            ends.append(b)
+
+    # the scanner's \s+ takes all the whitespace after a sentence end, so only
+    # the first sentence can start with whitespace and only the last end with it
+    start = LEADING_SPACE.match(text).end()
+    for m in SENTENCE_SCANNER.finditer(text):
+        if m.lastgroup != "end":
+            continue
+        add(start, m.end("end"))
+        start = m.end()
+    end = len(text)
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if end > start:
+        add(start, end)
+    return Spans(starts, ends)
+
+
+def gujarati_sentence_tokenizer_instrumented(text, recorder):
+    # gujarati_sentence_tokenizer with timings and the number of protected
+    # elements of each kind (what the legacy version turned into placeholders)
+    call = recorder.call("gujarati_sentence_tokenizer", chars=len(text))
+    protected = {}
+    sentences = []
+    start = 0
+    for m in SENTENCE_SCANNER_TAGGED.finditer(text):
+        kind = m.lastgroup
+        if kind != "end":
+            protected[kind] = protected.get(kind, 0) + 1
+            continue
+        sentence = text[start:m.end("end")].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = m.end()
+    last = text[start:].strip()
+    if last:
+        sentences.append(last)
+    call.mark("scan")
+    merged = merge_short_sentences(sentences)
+    call.mark("merge_short")
+    call.done(protected=protected, sentence_ends=len(sentences), sentences=len(merged))
+    return merged
+
+
+def gujarati_sentence_tokenizer_legacy(text):
+    # Original placeholder-based version, kept to cross-check the scanner
     protected = []
     def protect(match):
         protected.append(match.group(0))
         return f"__PROTECTED_{len(protected)-1}__"
 
     # Protect ellipsis (three dots)
-    text = re.sub(r'\.\.\.', protect, text)
+    text = re.sub(ellipsis_pattern, protect, text)
     text = re.sub(url_pattern, protect, text)
     text = re.sub(email_pattern, protect, text)
     text = re.sub(date_pattern, protect, text)
-
-
-    # Protect abbreviations (e.g., Dr., Mr., etc. and Gujarati abbreviations)
-    abbrs = [
-        r'Dr\.', r'Mr\.', r'Mrs\.', r'Ms\.', r'Prof\.', r'Sr\.', r'Jr\.', r'St\.', r'vs\.', r'etc\.', r'e\.g\.', r'i\.e\.', r'a\.m\.', r'p\.m\.',
-        r'એલ\.સી\.બી\.', r'પી\.એસ\.આઇ\.', r'શ્રી\.', r'શ્રીમતી\.', r'કું\.', r'શ્રીમ\.', r'ડૉ\.', r'પ્રો\.', r'સ્વ\.'
-    ]
-    abbr_pattern = r'(' + '|'.join(abbrs) + r')'
     text = re.sub(abbr_pattern, protect, text)
-
-    # Protect numbers (Gujarati/English) followed by dot (e.g., 18. or ૧૮.)
-    num_dot_pattern = r'(?:\d+|[\u0AE6-\u0AEF]+)\.'
     text = re.sub(num_dot_pattern, protect, text)
-
-    # Protect words with matra followed by dot (e.g., "તા.")
-    guj_word_matra_dot = r'([\u0A80-\u0AFF]+[\u0ABE-\u0ACC\u0A81-\u0A83\u0ACD]+)\.'
     text = re.sub(guj_word_matra_dot, protect, text)
 
-    # Use a more reliable method to split sentences
-    # Split at sentence ending punctuation
-    sentence_end_pattern = r'([\.!?।\u0964])\s+'
-    
     # Split the text but keep the punctuation
     parts = re.split(sentence_end_pattern, text)
     
     sentences = []
     for i in range(0, len(parts)-1, 2):
-        if i+1 < len(parts):
-            sentence = parts[i] + parts[i+1]
-        else:
-            sentence = parts[i]
+        sentence = parts[i] + parts[i+1]
         
         # Restore protected items
         for idx, item in enumerate(protected):
@@ -66,61 +265,119 @@ def gujarati_sentence_tokenizer(text):
         if last:
             sentences.append(last)
 
-    # Merge sentences with less than 3 words with previous sentence
-    merged = []
-    for s in sentences:
-        if merged and len(s.split()) < 3:
-            merged[-1] = merged[-1].rstrip() + ' ' + s
-        else:
-            merged.append(s)
-    
-    return merged
+    return merge_short_sentences(sentences)
+
+def is_synced_line_start(text, pos):
+    # True if no scanner match can run across the newline before pos, so a
+    # scan started at pos sees exactly what a scan of the whole text would.
+    # Only sentence ends (punct + spaces) and dates (digits, spaces, month)
+    # can contain a newline.
+    if pos < 2 or pos >= len(text) or text[pos - 1] != '\n':
+        return False
+    before = text[pos - 2]
+    if before.isspace() or before in '.!?।\u0964' or before.isdecimal():
+        return False
+    return not text[pos].isdecimal()
+
+
+def find_safe_cut(text, pos=0):
+    # Index where text can be split into two chunks that segment exactly like
+    # the whole text: right after a sentence end whose next sentence has at
+    # least 3 words (so it would not be merged back into the previous one).
+    # Returns -1 if there is no such point after pos.
+    while True:
+        pos = text.find('\n', pos) + 1
+        if pos == 0:
+            return -1
+        if is_synced_line_start(text, pos):
+            break
+    prev_end = -1
+    for m in SENTENCE_SCANNER.finditer(text, pos):
+        if m.lastgroup != "end":
+            continue
+        if prev_end != -1 and len(text[prev_end:m.end("end")].split()) >= 3:
+            return prev_end
+        prev_end = m.end()
+    return -1
+
 
 class ChunkedTextGenerator:
-    def __init__(self, file_path, char_limit=5000000):
+    # sentence_safe=True moves every chunk edge to a safe sentence boundary
+    # (see find_safe_cut), so chunks can be segmented independently and in
+    # any order and still give the same sentences as the whole file.
+    def __init__(self, file_path, char_limit=5000000, sentence_safe=False):
         self.file_path = file_path
         self.char_limit = char_limit
+        self.sentence_safe = sentence_safe
+
+    def _lines(self):
+        if is_parquet(self.file_path):
+            # one row per line, read record batch by record batch (parquet_convert.py)
+            for rows in iter_parquet_rows(self.file_path):
+                for row in rows:
+                    yield row + "\n"
+            return
+        with open(self.file_path, encoding="utf-8", errors="ignore") as infile:
+            yield from infile
 
     def __iter__(self):
         buffer = []
         total_chars = 0
-        with open(self.file_path, encoding="utf-8", errors="ignore") as infile:
-            for line in infile:
-                buffer.append(line)
-                total_chars += len(line)
-                if total_chars > self.char_limit:
+        next_try = self.char_limit
+        for line in self._lines():
+            buffer.append(line)
+            total_chars += len(line)
+            if total_chars > next_try:
+                if not self.sentence_safe:
                     yield "".join(buffer)
                     buffer = []
                     total_chars = 0
-            if buffer:
-                yield "".join(buffer)
+                    continue
+                text = "".join(buffer)
+                # only look for a cut in the last 10% so chunks stay close to char_limit
+                cut = find_safe_cut(text, int(self.char_limit * 0.9))
+                if cut == -1:
+                    # no safe boundary yet, read some more and try again
+                    buffer = [text]
+                    next_try = total_chars + self.char_limit // 10
+                    continue
+                yield text[:cut]
+                buffer = [text[cut:]]
+                total_chars = len(buffer[0])
+                next_try = self.char_limit
+        if buffer:
+            yield "".join(buffer)
+
+
+def segment_chunk(text_chunk):
+    # Worker side of segment_file_parallel: returns the chunk's output text
+    # in one string so only a single object is sent back to the parent.
+    return "".join(s + "\n\n" for s in gujarati_sentence_tokenizer(text_chunk))
+
+
+def segment_file_parallel(input_file, output_file, workers=None, char_limit=5000000):
+    # Segment a large file over a process pool. Chunks are cut at safe sentence
+    # boundaries and imap returns results in input order, so the output is the
+    # same as segmenting the whole file in one go (just written chunk by chunk).
+    from multiprocessing import Pool, cpu_count
+
+    workers = workers or cpu_count()
+    chunk_gen = ChunkedTextGenerator(input_file, char_limit=char_limit, sentence_safe=True)
+    with open(output_file, "w", encoding="utf-8") as outfile:
+        if workers == 1:
+            for text_chunk in chunk_gen:
+                outfile.write(segment_chunk(text_chunk))
+            return
+        with Pool(workers) as pool:
+            for out in pool.imap(segment_chunk, chunk_gen):
+                outfile.write(out)
 
 # --- Metrics calculation for large output file (streaming, memory efficient) ---
-def calculate_metrics_from_file(filename, metrics_filename):
-    total_sentences = 0
-    total_words = 0
-    total_chars = 0
-    unique_words = set()
-    with open(filename, encoding="utf-8") as f:
-        for line in f:
-            sentence = line.strip()
-            if not sentence:
-                continue
-            total_sentences += 1
-            words = sentence.split()
-            total_words += len(words)
-            total_chars += len(sentence)
-            unique_words.update(words)
-    words_per_sentence = total_words / total_sentences if total_sentences else 0
-    avg_chars_per_word = total_chars / total_words if total_words else 0
-    ttr = len(unique_words) / total_words if total_words else 0
-    with open(metrics_filename, "w", encoding="utf-8") as m:
-        m.write(f"Total sentences: {total_sentences}\n")
-        m.write(f"Total words: {total_words}\n")
-        m.write(f"Total characters: {total_chars}\n")
-        m.write(f"Words per sentence: {words_per_sentence:.2f}\n")
-        m.write(f"Average characters per word: {avg_chars_per_word:.2f}\n")
-        m.write(f"Type-Token Ratio (TTR): {ttr:.4f}\n")
+def calculate_metrics_from_file(filename, metrics_filename, exact=True, workers=1):
+    # exact=False counts distinct words with HyperLogLog (bounded memory),
+    # workers > 1 splits the file into byte ranges and merges the shard stats
+    stats = file_stats(filename, "sentence", workers=workers, exact=exact)
+    stats.write_metrics(metrics_filename)
 
 if __name__ == "__main__":
     with open("gu.txt", encoding="utf-8") as f:
@@ -131,29 +388,11 @@ if __name__ == "__main__":
         for s in sentences:
             out.write(s + "\n")
     # --- Metrics calculation ---
-    total_sentences = len(sentences)
-    total_words = sum(len(s.split()) for s in sentences)
-    total_chars = sum(len(s) for s in sentences)
-    words_per_sentence = total_words / total_sentences if total_sentences else 0
-    avg_chars_per_word = total_chars / total_words if total_words else 0
-    # TTR for sentence tokenizer: unique words divided by total words
-    all_words = []
+    stats = CorpusStats()
     for s in sentences:
-        all_words.extend(s.split())
-    ttr = len(set(all_words)) / total_words if total_words else 0
-    with open("gu_sentences_metrics.txt", "w", encoding="utf-8") as m:
-        m.write(f"Total sentences: {total_sentences}\n")
-        m.write(f"Total words: {total_words}\n")
-        m.write(f"Total characters: {total_chars}\n")
-        m.write(f"Words per sentence: {words_per_sentence:.2f}\n")
-        m.write(f"Average characters per word: {avg_chars_per_word:.2f}\n")
-        m.write(f"Type-Token Ratio (TTR): {ttr:.4f}\n")
+        stats.add_sentence(s)
+    stats.write_metrics("gu_sentences_metrics.txt")
 
     # --- Hugging Face IndicCorpV2 Gujarati Dataset Tokenization ---
-    chunk_gen = ChunkedTextGenerator("indiccorp_gu.txt", char_limit=5000000)
-    with open("gu_sentences_indic_corp.txt", "w", encoding="utf-8") as outfile:
-        for text_chunk in chunk_gen:
-            sentences = gujarati_sentence_tokenizer(text_chunk)
-            for s in sentences:
-                outfile.write(s + "\n\n")
-    calculate_metrics_from_file("gu_sentences_indic_corp.txt", "gu_sentences_indic_corp_metrics.txt")
+    segment_file_parallel("indiccorp_gu.txt", "gu_sentences_indic_corp.txt", char_limit=5000000)
+    calculate_metrics_from_file("gu_sentences_indic_corp.txt", "gu_sentences_indic_corp_metrics.txt", exact=False, workers=os.cpu_count())
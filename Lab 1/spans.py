@@ -0,0 +1,100 @@
+import re
+from array import array
+from itertools import islice
+from operator import attrgetter
+
+try:
+    import numpy as np
+except ImportError:  # only to_numpy needs numpy
+    np = None
+
+# Offsets instead of substrings: the tokenizers' span functions
+# (word_tokenizer_Regex.gujarati_word_spans, sentence_tokenizer_Regex.
+# gujarati_sentence_spans, byte_tokenizer.byte_word_spans) return a Spans, three
+# parallel arrays against the text (or bytes / mmap) they were given:
+#   starts, ends  array('I') (array('Q') past 4G), source[starts[i]:ends[i]] is item i
+#   classes       array('B') codes into class_names, or None (sentences)
+# That is 9 bytes per token instead of a str object and a list slot, and counting,
+# indexing or re-slicing never creates a substring:
+#     spans = gujarati_word_spans(text)
+#     spans.class_counts()                  # {"guj_word": ..., "punct": ...}
+#     starts, ends, classes = spans.to_numpy()   # views, no copy
+#     for token in spans.texts(text): ...   # substrings only where wanted
+
+BATCH = 256  # small batches stay in cache; larger ones are slower and hold more matches
+_lastindex = attrgetter("lastindex")
+
+
+def offset_array(limit):
+    return array("I" if limit < 1 << 32 else "Q")
+
+
+class Spans:
+    def __init__(self, starts, ends, classes=None, class_names=()):
+        self.starts = starts
+        self.ends = ends
+        self.classes = classes
+        self.class_names = list(class_names)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, i):
+        # (start, end, class name or None)
+        name = self.class_names[self.classes[i]] if self.classes is not None else None
+        return self.starts[i], self.ends[i], name
+
+    def __iter__(self):
+        for i in range(len(self.starts)):
+            yield self[i]
+
+    def texts(self, source):
+        # Items as slices of source (str, or bytes for byte spans), made lazily
+        return map(source.__getitem__, map(slice, self.starts, self.ends))
+
+    def class_counts(self):
+        if self.classes is None:
+            return {}
+        counts = {}
+        for code, name in enumerate(self.class_names):
+            n = self.classes.count(code)
+            if n:
+                counts[name] = counts.get(name, 0) + n
+        return counts
+
+    def to_numpy(self):
+        # (starts, ends, classes) as numpy arrays sharing the arrays' memory
+        if np is None:
+            raise ImportError("Spans.to_numpy needs numpy (pip install numpy)")
+        dtype = np.uint32 if self.starts.typecode == "I" else np.uint64
+        classes = None if self.classes is None else np.frombuffer(self.classes, dtype=np.uint8)
+        return np.frombuffer(self.starts, dtype=dtype), np.frombuffer(self.ends, dtype=dtype), classes
+
+
+def spans_from_matches(matches, limit, codes=None, class_names=()):
+    # Spans of an iterable of re matches. codes maps a match's lastindex to its
+    # class code (None: no classes). Offsets are read in C (map over the Match
+    # methods), a batch of matches at a time, so only BATCH match objects live at once.
+    starts, ends = offset_array(limit), offset_array(limit)
+    classes = array("B") if codes is not None else None
+    matches = iter(matches)
+    while True:
+        batch = list(islice(matches, BATCH))
+        if not batch:
+            break
+        starts.extend(map(re.Match.start, batch))
+        ends.extend(map(re.Match.end, batch))
+        if classes is not None:
+            classes.extend(map(codes.__getitem__, map(_lastindex, batch)))
+    return Spans(starts, ends, classes, class_names)
+
+
+def lastindex_codes(pattern, class_names, aliases=None):
+    # List indexed by group number giving the class code of the named group the
+    # match ended in (aliases: group name -> class name); other groups map to 0,
+    # they never end a match as long as every alternative is one named group
+    aliases = aliases or {}
+    codes = [0] * (pattern.groups + 1)
+    for name, index in pattern.groupindex.items():
+        codes[index] = class_names.index(aliases.get(name, name))
+    return codes
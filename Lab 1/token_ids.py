@@ -0,0 +1,315 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from array import array
+
+from corpus_stats import SENTENCE_ENDINGS, CorpusStats
+
+try:
+    import numpy as np
+except ImportError:  # only the reader needs numpy
+    np = None
+
+# Binary token-ID corpus, written next to (or instead of) the word-tokenizer text
+# output so later stages never re-parse UTF-8:
+#   <prefix>.vocab      one token per line, line n = token ID n (first-seen order)
+#   <prefix>.ids        uint32 token IDs, native byte order, one per token
+#   <prefix>.offsets    uint64 sentence starts into .ids, plus a final entry equal to
+#                       the token count, so sentence i is ids[offsets[i]:offsets[i+1]]
+#   <prefix>.meta.json  counts and dtypes, plus "words_file": size, mtime and
+#                       blake2b of the word file written in the same pass, so a
+#                       reader can tell whether the IDs still belong to that file
+# Tokens that contain whitespace (dates like "12 મે\n2020") are stored as one ID
+# per whitespace-separated part, exactly the tokens freq_distribution.read_tokens
+# gets from the word file, so counts and top-K agree with the text path.
+# python token_ids.py --check [TEXT] tokenizes TEXT (default: gu.txt plus a few
+# dates) into both outputs and exits 1 if their counts or top-K differ.
+
+SENTENCE_END_TOKENS = set(SENTENCE_ENDINGS)
+BATCH = 1 << 20
+
+
+class TokenIdWriter:
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.vocab = {}
+        self.words = []
+        self.total_tokens = 0
+        self.total_offsets = 0
+        self._ids = array('I')
+        self._offsets = array('Q', [0])
+        self._last_offset = 0
+        self._ids_file = open(prefix + ".ids", "wb")
+        self._offsets_file = open(prefix + ".offsets", "wb")
+
+    def _new_id(self, word):
+        # An int, or for a token with whitespace a tuple with the ID of each part
+        parts = word.split()
+        if len(parts) == 1 and parts[0] == word:
+            idx = len(self.words)
+            self.words.append(word)
+            self.vocab[word] = idx
+            return idx
+        ids = tuple(self.vocab[p] if p in self.vocab else self._new_id(p) for p in parts)
+        self.vocab[word] = ids
+        return ids
+
+    def add_many(self, tokens):
+        vocab, ids, offsets = self.vocab, self._ids, self._offsets
+        n = self.total_tokens
+        for word in tokens:
+            idx = vocab.get(word)
+            if idx is None:
+                idx = self._new_id(word)
+            if idx.__class__ is int:
+                ids.append(idx)
+                n += 1
+            else:
+                ids.extend(idx)
+                n += len(idx)
+            if word in SENTENCE_END_TOKENS:
+                offsets.append(n)
+                self._last_offset = n
+            if len(ids) >= BATCH:
+                self.total_tokens = n
+                self._flush()
+        self.total_tokens = n
+
+    def passthrough(self, tokens):
+        # Record tokens while handing them on (e.g. to write_tokens), so the text
+        # and the ID files come out of one tokenization pass.
+        batch = []
+        for word in tokens:
+            batch.append(word)
+            if len(batch) >= 65536:
+                self.add_many(batch)
+                batch.clear()
+            yield word
+        self.add_many(batch)
+
+    def _flush(self):
+        self._ids.tofile(self._ids_file)
+        del self._ids[:]
+        self.total_offsets += len(self._offsets)
+        self._offsets.tofile(self._offsets_file)
+        del self._offsets[:]
+
+    def close(self):
+        # the last sentence may lack its end punctuation
+        if self._last_offset != self.total_tokens:
+            self._offsets.append(self.total_tokens)
+        self._flush()
+        self._ids_file.close()
+        self._offsets_file.close()
+        with open(self.prefix + ".vocab", "w", encoding="utf-8") as f:
+            for w in self.words:
+                f.write(w + "\n")
+        with open(self.prefix + ".meta.json", "w", encoding="utf-8") as f:
+            json.dump({
+                "tokens": self.total_tokens,
+                "sentences": self.total_offsets - 1,
+                "vocab_size": len(self.words),
+                "ids_dtype": "uint32",
+                "offsets_dtype": "uint64",
+            }, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def file_fingerprint(path):
+    st = os.stat(path)
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 22), b""):
+            h.update(block)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "blake2b": h.hexdigest()}
+
+
+def record_word_file(prefix, words_file):
+    # Call once the word file is complete (closed)
+    with open(prefix + ".meta.json", encoding="utf-8") as f:
+        meta = json.load(f)
+    meta["words_file"] = file_fingerprint(words_file)
+    with open(prefix + ".meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+
+def matches_word_file(prefix, words_file):
+    # True if the corpus at prefix was written from words_file as it is now.
+    # Same size and mtime is enough; a changed mtime (copy, checkout) falls
+    # back to comparing the hash. Corpora without a record never match.
+    with open(prefix + ".meta.json", encoding="utf-8") as f:
+        recorded = json.load(f).get("words_file")
+    if not recorded:
+        return False
+    st = os.stat(words_file)
+    if st.st_size != recorded["size"]:
+        return False
+    return st.st_mtime_ns == recorded["mtime_ns"] or file_fingerprint(words_file)["blake2b"] == recorded["blake2b"]
+
+
+def write_token_ids(tokens, prefix):
+    with TokenIdWriter(prefix) as writer:
+        writer.add_many(tokens)
+    return writer
+
+
+def token_ids_from_word_file(words_file, prefix):
+    # For word files that already exist (one sentence per line, tokens split on spaces)
+    def tokens():
+        with open(words_file, encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                yield from line.split()
+    writer = write_token_ids(tokens(), prefix)
+    record_word_file(prefix, words_file)
+    return writer
+
+
+class TokenIdCorpus:
+    # Read side: .ids and .offsets are memory-mapped, nothing is decoded until a
+    # word is actually needed.
+    def __init__(self, prefix):
+        if np is None:
+            raise ImportError("reading token-ID corpora needs numpy (pip install numpy)")
+        self.prefix = prefix
+        with open(prefix + ".meta.json", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.ids = np.memmap(prefix + ".ids", dtype=np.uint32, mode="r") if self.meta["tokens"] else np.zeros(0, np.uint32)
+        self.offsets = np.memmap(prefix + ".offsets", dtype=np.uint64, mode="r")
+        self._words = None
+
+    @property
+    def words(self):
+        if self._words is None:
+            with open(self.prefix + ".vocab", encoding="utf-8") as f:
+                self._words = f.read().split("\n")[:-1]
+        return self._words
+
+    @property
+    def vocab_size(self):
+        return self.meta["vocab_size"]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def sentence(self, i):
+        return self.ids[int(self.offsets[i]):int(self.offsets[i + 1])]
+
+    def counts(self, chunk=1 << 24):
+        # bincount in slices: np.bincount casts to int64, which would double
+        # a billion-token array in one go
+        counts = np.zeros(self.vocab_size, dtype=np.int64)
+        for start in range(0, len(self.ids), chunk):
+            counts += np.bincount(self.ids[start:start + chunk], minlength=self.vocab_size)
+        return counts
+
+    def top_k(self, k, counts=None):
+        # Same order as freq_distribution.top_k (count desc, then word), but only
+        # the k largest counts are selected (argpartition) instead of sorting all
+        if counts is None:
+            counts = self.counts()
+        return top_k_from_counts(counts, self.words, k)
+
+    def corpus_stats(self, counts=None, max_sentence_len=100):
+        # The word-file metrics computed on arrays; sentences come from the offsets.
+        # (No moving-average TTR here: that needs the token stream in order.)
+        if counts is None:
+            counts = self.counts()
+        lengths = np.fromiter((len(w) for w in self.words), dtype=np.int64, count=self.vocab_size)
+        sentence_lengths = np.diff(self.offsets.astype(np.int64))
+        stats = CorpusStats(exact=True, mattr_window=0, max_sentence_len=max_sentence_len)
+        stats.known_distinct = int(np.count_nonzero(counts))
+        stats.total_words = int(counts.sum())
+        stats.total_chars = int((counts * lengths).sum())
+        stats.total_sentences = len(sentence_lengths)
+        hist = np.bincount(np.minimum(sentence_lengths, max_sentence_len), minlength=max_sentence_len + 1)
+        stats.sentence_length_hist = [int(c) for c in hist]
+        return stats
+
+
+def top_k_from_counts(counts, words, k):
+    k = min(k, int(np.count_nonzero(counts)))
+    if k <= 0:
+        return []
+    idx = np.argpartition(-counts, k - 1)[:k]
+    cutoff = counts[idx].min()
+    # every word tied at the cutoff is a candidate, so ties break by word like sorted() would
+    idx = np.concatenate([np.flatnonzero(counts > cutoff), np.flatnonzero(counts == cutoff)])
+    rows = sorted(((words[i], int(counts[i])) for i in idx), key=lambda kv: (-kv[1], kv[0]))
+    return rows[:k]
+
+
+# dates are single tokens with spaces (or a newline) inside, which the word file
+# splits again; the token-ID corpus has to count them the same way
+DATE_SAMPLE = "તે 5 માર્ચ 2020 ના રોજ આવ્યો. 12 મે\n2020 સુધી રહ્યો. 27 એપ્રિલ 1991 પછી 5 માર્ચ 2020!\n"
+
+
+def word_file_counts(words_file):
+    # the counts freq_distribution.read_tokens gives for the word file
+    counts = {}
+    with open(words_file, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            for tok in line.split():
+                counts[tok] = counts.get(tok, 0) + 1
+    return counts
+
+
+def check_token_ids(text_file=None, k=100):
+    # Tokenize text_file (default: gu.txt plus DATE_SAMPLE) once into a word file
+    # and a token-ID corpus, then check that the IDs give the word file's counts
+    # and top-K. Raises ValueError on any difference; returns the number of words.
+    from word_tokenizer_Regex import process_in_chunks  # it imports this module
+
+    work = tempfile.mkdtemp(prefix="token_ids_check_")
+    try:
+        if text_file is None:
+            text_file = os.path.join(work, "sample.txt")
+            gu = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gu.txt")
+            sample = ""
+            if os.path.isfile(gu):
+                with open(gu, encoding="utf-8") as f:
+                    sample = f.read()
+            with open(text_file, "w", encoding="utf-8") as f:
+                f.write(sample + "\n" + DATE_SAMPLE)
+        words_file, prefix = os.path.join(work, "words.txt"), os.path.join(work, "words")
+        process_in_chunks(text_file, words_file, ids_prefix=prefix)
+        text_counts = word_file_counts(words_file)
+        corpus = TokenIdCorpus(prefix)
+        counts = corpus.counts()
+        id_counts = {w: int(c) for w, c in zip(corpus.words, counts) if c}
+        if id_counts != text_counts:
+            diff = sorted(set(id_counts.items()) ^ set(text_counts.items()))[:10]
+            raise ValueError(f"token-ID counts differ from the word file, e.g. {diff}")
+        text_top = sorted(text_counts.items(), key=lambda kv: (-kv[1], kv[0]))[:k]
+        if top_k_from_counts(counts, corpus.words, k) != text_top:
+            raise ValueError(f"token-ID top-{k} differs from the word file's")
+        del corpus, counts  # release the memory maps before the files go
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return len(text_counts)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--check"]:
+        try:
+            n = check_token_ids(sys.argv[2] if len(sys.argv) > 2 else None)
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+        print(f"Token-ID corpus matches the word file ({n} words)")
+        sys.exit(0)
+    prefix = "indiccorp_gu_words"
+    if not (os.path.exists(prefix + ".meta.json") and matches_word_file(prefix, prefix + ".txt")):
+        token_ids_from_word_file(prefix + ".txt", prefix)
+    corpus = TokenIdCorpus(prefix)
+    counts = corpus.counts()
+    corpus.corpus_stats(counts).write_metrics(prefix + "_ids_metrics.txt", approx_sentences=True)
+    for word, count in corpus.top_k(20, counts):
+        print(word, count)
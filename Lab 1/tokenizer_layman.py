@@ -1,93 +1,419 @@
 # need to make a word and sentence tokenizer
 # tokenize all into words
 # tokenize punctuations, URLs, numbers, mail ids and dates
-# save the tokenized data into a separate file
-# Find total number of sentences, words, charachters, no. of words per sentence
-# average no. of chars per word, TTR
-# from datasets import load_dataset
 # This is for Gujarati language text processing
-left, right = 0, 0
-
-# dataset = load_dataset("ai4bharat/IndicCorpV2", "indiccorp_v2", data_dir="data/guj_Gujr")
-# for i, example in enumerate(dataset):
-#     print(example)
-#     if i >= 4:
-#         break
-
-def check_punctuation(char):
-    return char in ['.', ',', '!', '?', ';', ':', '-', '(', ')', '[', ']', '{', '}', '"', "'", '“', '”', '‘', '’']
-
-def check_url(word):
-    # we can't write // or / or . as they will already be a part of other word
-    return word.startswith("http") or word.startswith("https") or word.startswith("www")
-
-def check_email(word):
-    return "@" in word and "." in word and not word.startswith("http://") and not word.startswith("https://")
-
-def check_number(word):
-    return word.isdigit() or (word.replace('.', '', 1).isdigit() and word.count('.') < 2)
-
-def check_date(word):
-    # it is a simple date check for formats like dd/mm/yyyy, mm/dd/yyyy, yyyy-mm-dd
-    return (len(word) == 10 and (word[2] == '/' or word[2] == '-') and (word[5] == '/' or word[5] == '-')) or \
-           (len(word) == 7 and word[2] == '-' and word[5] == '-')
-
-def good_splitter(text):
-    global left, right
-    # in priority before punctuations we need to check for URLs, Emails and Dates
-    # First i am checking for URLs
-    if check_url(word):
-        # if this word is a URL means next few words are part of the URL
-        while(right < len(text) and right != '.'):
-            # but this . can be the start of the URL also so previous word is to be checked, if the previous 
-            # word is http or https or www then continue finding the '.
-            right += 1
-        
-        at_start = False
-        if text[right] == '.':
-            if fetch_prev_word(word) in ['http', 'https', 'www']:
-                right += 1
-                at_start = True
-        
-        if at_start:
-            while(right < len(text) and right != '.'):
-                right += 1
-
-        # we came till the end of the URL but the domain name is not included yet
-        while(right < len(text) and text[right] != ' '):
-            right += 1
-        return [text[left:right]]
-
-    # Now i am checking for Emails
-    if check_email(text):
-        # if this word is an email means previous 1 word and next 3 words are part of the email
-        # like it is detecting '@' symbol so previous word is the username and next 3 words are 'gmail', '.' , 'com'
-        while(left > 0 and text[left-1] != ' '):
-            left -= 1
-        while(right < len(text) and text[right] != ' '):
-            right += 1
-        return [text[left:right]]
-    
-    # now i am checking for Dates
-    if check_date(text):
-        # if this word is a date 
-        pass
-
-    return [text[left:right]]
-
-    # Now i am checking for Emails
-    if check_email(text):
-        # if this word is an email means previous 1 word and next 3 words are part of the email
-        # like it is detecting '@' symbol so previous word is the username and next 3 words are 'gmail', '.' , 'com'
-        while(left > 0 and text[left-1] != ' '):
-            left -= 1
-        while(right < len(text) and text[right] != ' '):
-            right += 1
-
-data = []
-with open("gu.txt", "r", encoding="utf-8") as f:
-    text = f.read()
-    data += good_splitter(text)
-
-print(data)
+#
+# Hand-written word tokenizer, no regexes: the same tokens as
+# word_tokenizer_Regex.gujarati_word_tokenizer, found in one left-to-right pass.
+#
+# Every code point gets a one-letter class from a table, for the whole text at
+# once and in C: charmap_encode maps ASCII and the Gujarati block (exactly 256
+# code points) to one byte each (anything else is classified by
+# classify_unmapped), and bytes.translate maps those bytes to classes:
+#   g  Gujarati letter/matra/sign (anything in U+0A80-U+0AFF except the digits)
+#   D  Gujarati digit   d  other decimal digit (\d in the regex)
+#   .  full stop        p  other punctuation token: , ! ? … ।
+#   h  the letter h (a URL can start there)
+#   ' ' any whitespace  x  everything else (never starts a token)
+# Characters of class x (and h, unless it starts "http://" or "https://") never
+# start a token and end any Gujarati word, so for finding words they behave like
+# whitespace, and . , ! ? … । are always tokens of their own. So a stretch made
+# only of g, those separators and that punctuation is cut with str.split(), in
+# bulk, on a copy of the text where x/h are spaces and the punctuation is padded
+# with spaces. Everything else (digits, URL starts, a dot run after a digit, the
+# stand-in for unmapped Gujarati code points) is marked b'!' in a separator map
+# found with bytes.find; from the start of the word around it the scanner tries
+# the token kinds in the same priority order as the regex alternatives. Every
+# check only moves forward, so nothing backtracks; a date is the only token
+# that can cross whitespace.
+#
+# Speed: the bulk split is C, the scanner is Python, one loop step per digit or
+# URL token. On prose (gu.txt) it is about 1.5x the regex tokenizer, several
+# times it on Latin-script text, about even on a mix with a number, date or
+# URL every 20 words or so, and slower (down to about a fifth of the regex)
+# on text that is mostly numbers, dates and URLs. Use the regex tokenizer there.
+#
+# python tokenizer_layman.py [FILE] [N] compares it with the regex tokenizer on
+# FILE (default gu.txt): throughput of both and the first N places they differ.
+# python tokenizer_layman.py --check [N] [FILE...] is the differential test: N
+# random strings built from fragments that exercise every branch, then the
+# files; it prints the first differences and exits 1 if any token differs.
 
+import codecs
+import random
+import sys
+import time
+from difflib import SequenceMatcher
+from string import ascii_letters, digits
+
+MONTHS = 'જાન્યુઆરી|ફેબ્રુઆરી|માર્ચ|એપ્રિલ|મે|જૂન|જુલાઈ|ઑગસ્ટ|સપ્ટેમ્બર|ઑક્ટોબર|નવેમ્બર|ડિસેમ્બર'
+# the regex uses [months]+, a character class, so any run of these (and '|') counts
+MONTH_CHARS = frozenset(MONTHS)
+DIGIT_CLASSES = 'dD'
+# strings, not sets: runs of them are measured with str.lstrip
+URL_HOST_CHARS = '-' + ascii_letters + digits + '@:%._+~#='
+URL_TLD_CHARS = ascii_letters + digits + '()'
+URL_PATH_CHARS = '-' + ascii_letters + digits + '()@:%_+.~#?&/='
+URL_RUN_BLOCK = 256
+EMAIL_LOCAL_CHARS = frozenset(ascii_letters + digits + '._%+-')
+EMAIL_DOMAIN_CHARS = frozenset(ascii_letters + digits + '.-')
+
+
+def char_class(ch):
+    cp = ord(ch)
+    if ch.isspace():
+        return ' '
+    if 0x0AE6 <= cp <= 0x0AEF:
+        return 'D'
+    if 0x0A80 <= cp <= 0x0AFF:
+        return 'g'
+    if ch.isdecimal():
+        return 'd'
+    if ch == '.':
+        return '.'
+    if ch in ',!?…।':
+        return 'p'
+    if ch == 'h':
+        return 'h'
+    return 'x'
+
+
+# byte b stands for chr(b) below 128 and for U+0A80 + (b - 128) above, except
+# that two unassigned Gujarati code points give their bytes to । and …, so all
+# punctuation tokens have a byte of their own; real U+0A84 / U+0A8E are
+# encoded as the stand-in U+0A80, which always goes to the scanner
+BYTE_CHARS = ''.join(
+    {0x84: '।', 0x8E: '…'}.get(b, chr(b) if b < 128 else chr(0x0A80 + b - 128)) for b in range(256)
+)
+ENCODING_MAP = codecs.charmap_build(BYTE_CHARS)
+CLASS_TABLE = bytes(ord(char_class(ch)) for ch in BYTE_CHARS)
+# 'g' stays, x and h count as whitespace, punctuation becomes 'p' (split off in
+# bulk), digits and the U+0A80 stand-in need the scanner and become '!'
+SPECIAL_TABLE = bytes(
+    33 if b == 0x80 else c if c in b'g ' else 32 if c in b'xh' else 112 if c in b'p.' else 33
+    for b, c in enumerate(CLASS_TABLE)
+)
+# for the split copy of the text: x and h bytes become spaces
+PLAIN_TABLE = bytes(32 if CLASS_TABLE[b] in b'xh' else b for b in range(256))
+# b'1' for digits, b'0' for everything else: the end of a digit run is one find(b'0')
+DIGIT_TABLE = bytes(49 if c in b'dD' else 48 for c in CLASS_TABLE)
+# b'p' for the punctuation marks, which the spaced copy pads with a space each side
+PUNCT_TABLE = bytes(112 if c in b'p.' else 32 for c in CLASS_TABLE)
+# "..." in the spaced copy, and the same length with the ellipsis as one token
+SPACED_DOTS = ' .  .  . '
+SPACED_ELLIPSIS = ' ...     '
+# a character outside the 256 mapped ones is encoded as a stand-in of its class
+UNMAPPED_STAND_INS = {' ': ' ', 'd': '0', 'g': '\u0a80', 'x': '\x00'}
+
+
+def classify_unmapped(exc):
+    # codec error handler, called with each run of characters outside the map
+    if not isinstance(exc, UnicodeEncodeError):
+        raise exc
+    run = exc.object[exc.start:exc.end]
+    return ''.join(UNMAPPED_STAND_INS[char_class(ch)] for ch in run), exc.end
+
+
+codecs.register_error('layman_class', classify_unmapped)
+
+
+def classify(text):
+    # Class letters (one per character of text), the special/separator map as a
+    # bytearray (b'!' where the scanner is needed), the digit mask (DIGIT_TABLE,
+    # plus a final b'0' so find never fails), the text with x/h as spaces and
+    # punctuation padded with spaces, and the mask of the padded marks
+    # (PUNCT_TABLE): character i of text is at i + 2 * marks.count(b'p', 0, i)
+    # in the spaced copy
+    data = codecs.charmap_encode(text, 'layman_class', ENCODING_MAP)[0]
+    special = bytearray(data.translate(SPECIAL_TABLE))
+    digits = data.translate(DIGIT_TABLE) + b'0'
+    i = text.find('http')
+    while i != -1:
+        if text.startswith(('http://', 'https://'), i):
+            special[i] = 33
+        i = text.find('http', i + 4)
+    # A run of dots splits into "..." tokens from its start (done in bulk on the
+    # spaced copy), unless it follows a digit: \d+\. may take its first dot, so
+    # the scanner reads the whole run
+    i = text.find('...')
+    while i != -1:
+        j = i + 3
+        while text.startswith('.', j):
+            j += 1
+        if i and digits[i - 1] == 49:
+            special[i:j] = b'!' * (j - i)
+        i = text.find('...', j)
+    plain = codecs.charmap_decode(data.translate(PLAIN_TABLE), 'strict', BYTE_CHARS)[0]
+    spaced = plain.replace('.', ' . ').replace(',', ' , ').replace('!', ' ! ').replace('?', ' ? ')
+    spaced = spaced.replace('।', ' । ').replace('…', ' … ').replace(SPACED_DOTS, SPACED_ELLIPSIS)
+    cls = data.translate(CLASS_TABLE).decode('ascii')
+    return cls, special, digits, spaced, data.translate(PUNCT_TABLE)
+
+
+def is_word_char(ch):
+    # \w for str patterns
+    return ch.isalnum() or ch == '_'
+
+
+def digit_run(digits, i):
+    # end of the run of digits starting at i
+    return digits.find(b'0', i)
+
+
+def match_date(text, cls, digits, i, k, n):
+    # \d{1,2}[-/]\d{1,2}[-/]\d{2,4}  or  \d{1,2}\s*[months]+\s*\d{2,4}, for
+    # the digit run [i, k); end or -1
+    if k - i > 2:
+        return -1
+    if k < n and text[k] in '-/':
+        j = k + 1
+        k2 = digit_run(digits, j)
+        if 1 <= k2 - j <= 2 and k2 < n and text[k2] in '-/':
+            k3 = digit_run(digits, k2 + 1)
+            if k3 - (k2 + 1) >= 2:
+                return min(k3, k2 + 5)
+    j = k
+    while j < n and cls[j] == ' ':
+        j += 1
+    m = j
+    while m < n and text[m] in MONTH_CHARS:
+        m += 1
+    if m == j:
+        return -1
+    while m < n and cls[m] == ' ':
+        m += 1
+    q = digit_run(digits, m)
+    if q - m >= 2:
+        return min(q, m + 4)
+    return -1
+
+
+def match_number(cls, digits, text, i, k, n):
+    # \d+\.  then  \d+([.,]\d+)+  then  [૦-૯]+  then  \d+ (first one that
+    # matches), for the digit run [i, k)
+    if k < n and text[k] == '.':
+        return k + 1
+    j = k
+    while j + 1 < n and text[j] in '.,' and cls[j + 1] in DIGIT_CLASSES:
+        j = digit_run(digits, j + 1)
+    if j > k:
+        return j
+    if cls[i] == 'D':
+        j = i + 1
+        while j < n and cls[j] == 'D':
+            j += 1
+        return j
+    return k
+
+
+def run_end(text, i, chars):
+    # end of the run of characters from chars starting at i
+    while True:
+        block = text[i:i + URL_RUN_BLOCK]
+        rest = block.lstrip(chars)
+        i += len(block) - len(rest)
+        if rest or not block:
+            return i
+
+
+def match_url(text, i, n):
+    # https?://(www\.)?[host]{1,256}\.[tld]{1,6}\b[path]*; end or -1.
+    # host and tld chars are all path chars, so whenever a match exists it ends
+    # where the run of path chars ends; only its existence has to be checked.
+    if text.startswith('https://', i):
+        b = i + 8
+    elif text.startswith('http://', i):
+        b = i + 7
+    else:
+        return -1
+    end = run_end(text, b, URL_PATH_CHARS)
+    host_end = run_end(text, b, URL_HOST_CHARS)
+    max_host = 260 if text.startswith('www.', b) else 256
+    p = text.find('.', b + 1, min(host_end, b + max_host + 1))
+    while p != -1:
+        t = p + 1
+        while t < end and t - p <= 6 and text[t] in URL_TLD_CHARS:
+            t += 1
+            # \b after the tld
+            if is_word_char(text[t - 1]) != (t < n and is_word_char(text[t])):
+                return end
+        p = text.find('.', p + 1, min(host_end, b + max_host + 1))
+    return -1
+
+
+def match_email(text):
+    # ^local@domain\.[a-zA-Z]{2,}(\.[a-zA-Z]{2,})?$ over the whole text ($ also
+    # matches before a final newline); the matched text or None
+    s = text[:-1] if text.endswith('\n') else text
+    local, at, domain = s.partition('@')
+    if not at or not local or not domain:
+        return None
+    if not EMAIL_LOCAL_CHARS.issuperset(local) or not EMAIL_DOMAIN_CHARS.issuperset(domain):
+        return None
+    dot = domain.rfind('.')
+    tld = domain[dot + 1:]
+    if dot < 1 or len(tld) < 2 or not tld.isascii() or not tld.isalpha():
+        return None
+    return s
+
+
+def scan(text, cls, special, digits, i, stop, tokens):
+    # Tokens starting in [i, stop), and on while the characters still need the
+    # scanner (special[i] == b'!'); returns where scanning stopped (>= stop)
+    n = len(text)
+    while i < stop or (i < n and special[i] == 33):
+        c = cls[i]
+        if c == 'g':
+            j = i + 1
+            while j < n and cls[j] in 'gD':
+                j += 1
+        elif c in DIGIT_CLASSES:
+            k = digit_run(digits, i)
+            j = match_date(text, cls, digits, i, k, n)
+            if j < 0:
+                j = match_number(cls, digits, text, i, k, n)
+        elif c == '.':
+            j = i + 3 if text.startswith('...', i) else i + 1
+        elif c == 'p':
+            j = i + 1
+        elif c == 'h' and (j := match_url(text, i, n)) > 0:
+            pass
+        else:
+            i += 1
+            while i < n and cls[i] == 'x':
+                i += 1
+            continue
+        tokens.append(text[i:j])
+        i = j
+    return i
+
+
+def layman_word_tokenizer(text):
+    tokens = []
+    cls, special, digits, spaced, marks = classify(text)
+    n = len(text)
+    pos = 0
+    if n and cls[0] != ' ':
+        email = match_email(text)
+        if email is not None:
+            tokens.append(email)
+            pos = len(email)
+    # spaced[pos + shift] is text[pos]
+    shift = 2 * marks.count(b'p', 0, pos)
+    while pos < n:
+        s = special.find(b'!', pos)
+        if s == -1:
+            tokens.extend(spaced[pos + shift:].split())
+            break
+        # [pos, s) is plain Gujarati words and punctuation, which split() cuts
+        # once it is spaced; the part touching s may go on past it
+        word = special.rfind(b' ', pos, s) + 1 or pos
+        if word > pos:
+            start = pos + shift
+            shift += 2 * marks.count(b'p', pos, word)
+            tokens.extend(spaced[start:word + shift].split())
+        if word == s and cls[s] in DIGIT_CLASSES:
+            # a date or a number, the most common thing here: what scan() would
+            # do first, without the call
+            k = digits.find(b'0', s)
+            pos = match_date(text, cls, digits, s, k, n)
+            if pos < 0:
+                pos = match_number(cls, digits, text, s, k, n)
+            tokens.append(text[s:pos])
+            if pos > k:
+                shift += 2 * marks.count(b'p', k, pos)
+            continue
+        pos = scan(text, cls, special, digits, word, s + 1, tokens)
+        shift += 2 * marks.count(b'p', word, pos)
+    return tokens
+
+
+# --- Differential check against the regex tokenizer ---
+def compare_tokenizers(text, show=10, context=3):
+    # Runs both tokenizers on text and reports speed and where the token
+    # sequences differ (as difflib opcodes over the two token lists)
+    from word_tokenizer_Regex import gujarati_word_tokenizer
+
+    start = time.perf_counter()
+    regex_tokens = gujarati_word_tokenizer(text)
+    regex_s = time.perf_counter() - start
+    start = time.perf_counter()
+    layman_tokens = layman_word_tokenizer(text)
+    layman_s = time.perf_counter() - start
+
+    diffs = []
+    if regex_tokens != layman_tokens:
+        matcher = SequenceMatcher(None, regex_tokens, layman_tokens, autojunk=False)
+        diffs = [op for op in matcher.get_opcodes() if op[0] != 'equal']
+    differing = sum(max(i2 - i1, j2 - j1) for _, i1, i2, j1, j2 in diffs)
+
+    print(f"Characters: {len(text)}")
+    print(f"Regex:  {len(regex_tokens)} tokens in {regex_s:.3f}s ({len(regex_tokens) / regex_s:,.0f} tokens/s)")
+    print(f"Layman: {len(layman_tokens)} tokens in {layman_s:.3f}s ({len(layman_tokens) / layman_s:,.0f} tokens/s)")
+    print(f"Speedup: {regex_s / layman_s:.2f}x")
+    if not diffs:
+        print("Token sequences are identical")
+    else:
+        agree = 1 - differing / max(len(regex_tokens), 1)
+        print(f"{len(diffs)} differing spans, {differing} tokens ({agree:.4%} agree)")
+        for tag, i1, i2, j1, j2 in diffs[:show]:
+            print(f"  {tag} at token {i1}: "
+                  f"regex {regex_tokens[max(0, i1 - context):i2 + context]} | "
+                  f"layman {layman_tokens[max(0, j1 - context):j2 + context]}")
+    return diffs
+
+
+# Pieces of the random check strings: letters and matras, month names, digits
+# of three scripts, every punctuation and whitespace case, URL and email
+# fragments, unassigned Gujarati code points and characters outside the map
+CHECK_FRAGMENTS = [
+    'ક', 'ખ', 'ા', 'ં', '્', 'ૉ', 'ડ', 'મ', 'ે', 'જ', 'ન', 'ુ', 'આ', 'રી', 'ફે', 'બ્રુ',
+    'માર્ચ', 'મે', 'એપ્રિલ', 'જૂન', '|',
+    '૦', '૧', '૯', '0', '1', '2', '9', '12', '2020', '૧૨', '५', '٣',
+    '.', '..', '...', '....', ',', '!', '?', '…', '।', '-', '/',
+    ' ', '  ', '\n', '\t', '\xa0', '\u2028', '\r\n',
+    'h', 'http://', 'https://', 'www.', 'a', 'Z', 'x', 'com', 'gmail.com', 'user@',
+    '@', ':', '%', '_', '+', '~', '#', '=', '(', ')', '&',
+    '\u0a80', '\u0a84', '\u0a8e', 'ૹ', '😀', 'é', 'ß', '\x00', '\x01',
+]
+
+
+def check_tokenizers(cases=100000, paths=(), seed=0, show=5):
+    # Differential test: the token lists of both tokenizers must be equal on
+    # `cases` random strings (up to 30 fragments each) and on every file in
+    # paths. Prints the first `show` differences; returns how many inputs differed.
+    from word_tokenizer_Regex import gujarati_word_tokenizer
+
+    rng = random.Random(seed)
+    inputs = (''.join(rng.choice(CHECK_FRAGMENTS) for _ in range(rng.randint(0, 30))) for _ in range(cases))
+    failed = 0
+    for label, text in [('random', t) for t in inputs] + [(path, None) for path in paths]:
+        if text is None:
+            with open(label, encoding="utf-8", errors="ignore") as f:
+                text = f.read()
+        regex_tokens = gujarati_word_tokenizer(text)
+        layman_tokens = layman_word_tokenizer(text)
+        if regex_tokens == layman_tokens:
+            continue
+        failed += 1
+        if failed > show:
+            continue
+        if label == 'random':
+            print(f"random: {text!r}\n  regex  {regex_tokens}\n  layman {layman_tokens}")
+        else:
+            print(f"{label}:")
+            compare_tokenizers(text, show=3)
+    print(f"{cases} random strings, {len(paths)} files: "
+          + ("tokens identical" if not failed else f"{failed} inputs differ"))
+    return failed
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--check"]:
+        args = sys.argv[2:]
+        cases = int(args.pop(0)) if args and args[0].isdigit() else 100000
+        sys.exit(1 if check_tokenizers(cases, args) else 0)
+    path = sys.argv[1] if len(sys.argv) > 1 else "gu.txt"
+    show = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        compare_tokenizers(f.read(), show)
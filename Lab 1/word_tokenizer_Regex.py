@@ -1,82 +1,294 @@
+import codecs
+import io
+import mmap
+import os
 import re
+import shutil
+from multiprocessing import Pool
+
+import instrumentation
+from corpus_stats import file_stats
+from parquet_convert import is_parquet, iter_parquet_text, num_row_groups, row_group_text
+from spans import lastindex_codes, spans_from_matches
+from token_ids import TokenIdWriter, record_word_file
+
+months = 'જાન્યુઆરી|ફેબ્રુઆરી|માર્ચ|એપ્રિલ|મે|જૂન|જુલાઈ|ઑગસ્ટ|સપ્ટેમ્બર|ઑક્ટોબર|નવેમ્બર|ડિસેમ્બર'
+url_pattern = r'https?:\/\/(www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b([-a-zA-Z0-9()@:%_\+.~#?&//=]*)'
+email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}(?:\.[a-zA-Z]{2,})?$'
+date_pattern = rf'\d{{1,2}}[-/]\d{{1,2}}[-/]\d{{2,4}}|\d{{1,2}}\s*[{months}]+\s*\d{{2,4}}'
+num_pattern = r'(?:[\d\u0AE6-\u0AEF]+(?:[\.,][\d\u0AE6-\u0AEF]+)+)'
+eng_num_dot_pattern = r'\d+\.'
+guj_num_pattern = r'[\u0AE6-\u0AEF]+'
+eng_num_pattern = r'\d+'
+guj_word_pattern = r'[\u0A80-\u0AFF]+(?:[\u0ABE-\u0ACC\u0A81-\u0A83\u0ACD]*)'
+punct_pattern = r'[\.।\u0964,!?…]' # includes . | danda | gujarati full stop | , ! ? …
+ellipsis_pattern = r'\.\.\.'
+
+combined_pattern = f'({url_pattern})|({email_pattern})|({date_pattern})|({eng_num_dot_pattern})|({num_pattern})|({ellipsis_pattern})|({punct_pattern})|({guj_num_pattern})|({eng_num_pattern})|({guj_word_pattern})'
+# Same tokens as combined_pattern, found faster: no token starts at whitespace,
+# and a Gujarati letter (not a digit) can only start a Gujarati word, so that
+# case is tried before the other nine alternatives.
+WORD_PATTERN = re.compile(r'(?=\S)(?:[\u0A80-\u0AE5\u0AF0-\u0AFF][\u0A80-\u0AFF]*|' + combined_pattern + ')')
+# Same tokens again, each alternative in a named group so the instrumented path
+# can count tokens by class (m.lastgroup); guj_letters is the Gujarati fast path
+TOKEN_CLASSES = [('url', url_pattern), ('email', email_pattern), ('date', date_pattern),
+                 ('eng_num_dot', eng_num_dot_pattern), ('num', num_pattern), ('ellipsis', ellipsis_pattern),
+                 ('punct', punct_pattern), ('guj_num', guj_num_pattern), ('eng_num', eng_num_pattern),
+                 ('guj_word', guj_word_pattern)]
+WORD_PATTERN_TAGGED = re.compile(
+    r'(?=\S)(?:(?P<guj_letters>[\u0A80-\u0AE5\u0AF0-\u0AFF][\u0A80-\u0AFF]*)|'
+    + '|'.join(f'(?P<{name}>{p})' for name, p in TOKEN_CLASSES) + ')'
+)
+# Class codes of gujarati_word_spans: the TOKEN_CLASSES names, in order
+# (a Gujarati word found by the fast path is a guj_word)
+TOKEN_CLASS_NAMES = [name for name, _ in TOKEN_CLASSES]
+TAGGED_CODES = lastindex_codes(WORD_PATTERN_TAGGED, TOKEN_CLASS_NAMES, {'guj_letters': 'guj_word'})
+
+# Tokens after which the output file starts a new line
+SENTENCE_END_TOKENS = {'.', '।', '\u0964', '…', '...'}
+
+# A token can only cross whitespace inside a "digits month digits" date, so a
+# chunk can be cut at a whitespace run unless both of its neighbours could be
+# part of such a date.
+date_chars = ''.join(sorted(set(months)))
+CUT_PATTERN = re.compile(rf'(?<=[^\d\s{date_chars}])\s+(?=\S)|\s+(?=[^\d\s{date_chars}])')
+
 
 def gujarati_word_tokenizer(text):
-    url_pattern = r'https?:\/\/(www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9]{1,6}0-9(\b([-a-zA-Z)@:%_\+.~#?&//=]*)'
-    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}(?:\.[a-zA-Z]{2,})?$'
-    date_pattern = r'\d{1,2}[-/]\d{1,2}[-/]\d{2,4}|\d{1,2}\s*[જાન્યુઆરી|ફેબ્રુઆરી|માર્ચ|એપ્રિલ|મે|જૂન|જુલાઈ|ઑગસ્ટ|સપ્ટેમ્બર|ઑક્ટોબર|નવેમ્બર|ડિસેમ્બર]+\s*\d{2,4}'
-    num_pattern = r'(?:[\d\u0AE6-\u0AEF]+(?:[\.,][\d\u0AE6-\u0AEF]+)+)'
-    eng_num_dot_pattern = r'\d+\.'
-    guj_num_pattern = r'[\u0AE6-\u0AEF]+'
-    eng_num_pattern = r'\d+'
-    guj_word_pattern = r'[\u0A80-\u0AFF]+(?:[\u0ABE-\u0ACC\u0A81-\u0A83\u0ACD]*)'
-    punct_pattern = r'[\.।\u0964,!?…]' # includes . | danda | gujarati full stop | , ! ? …
-    ellipsis_pattern = r'\.\.\.'
-
-    combined_pattern = f'({url_pattern})|({email_pattern})|({date_pattern})|({eng_num_dot_pattern})|({num_pattern})|({ellipsis_pattern})|({punct_pattern})|({guj_num_pattern})|({eng_num_pattern})|({guj_word_pattern})'
-    words = [w for w in re.findall(combined_pattern, text)]
-    flat_words = []
-    for tup in words:
-        for w in tup:
-            if w:
-                flat_words.append(w)
-    return flat_words
-
-def process_in_chunks(input_file, output_file, tokenizer, chunk_size=1024 * 1024 * 100):  # 100 MB chunks
-    buffer = ""
-
-    with open(input_file, "r", encoding="utf-8", errors="ignore") as infile, \
-         open(output_file, "w", encoding="utf-8") as outfile:
+    if instrumentation.active is not None:
+        return gujarati_word_tokenizer_instrumented(text, instrumentation.active)
+    return [m.group() for m in WORD_PATTERN.finditer(text)]
+
+
+def gujarati_word_tokenizer_instrumented(text, recorder):
+    # gujarati_word_tokenizer with timings and token counts per class
+    call = recorder.call("gujarati_word_tokenizer", chars=len(text))
+    matches = list(WORD_PATTERN_TAGGED.finditer(text))
+    call.mark("scan")
+    tokens = [m.group() for m in matches]
+    call.mark("extract")
+    classes = {}
+    for m in matches:
+        name = m.lastgroup
+        classes[name] = classes.get(name, 0) + 1
+    call.mark("classify")
+    call.done(tokens=len(tokens), classes=classes)
+    return tokens
+
+
+def gujarati_word_spans(text, pos=0, endpos=None):
+    # The tokens of gujarati_word_tokenizer(text) as a spans.Spans (start, end,
+    # class code) against text, without creating the substrings. pos/endpos work
+    # like finditer's: ^ (the email alternative) still only matches at 0.
+    if endpos is None:
+        endpos = len(text)
+    return spans_from_matches(WORD_PATTERN_TAGGED.finditer(text, pos, endpos), endpos,
+                              TAGGED_CODES, TOKEN_CLASS_NAMES)
+
+
+def find_token_safe_cut(text, lookahead=4096):
+    # Last position in text where no token can continue across, i.e. where
+    # tokenizing text[:cut] and text[cut:] separately gives the same tokens as
+    # tokenizing the whole thing. Only the last `lookahead` chars are searched
+    # first. Returns -1 if there is no such position (no usable whitespace).
+    for start in (max(0, len(text) - lookahead), 0):
+        cut = -1
+        for m in CUT_PATTERN.finditer(text, start):
+            cut = m.end()
+        if cut != -1:
+            return cut
+    return -1
+
+
+def iter_text_tokens(chunks, tokenizer=None, at_file_start=True):
+    # Stream tokens from an iterable of text chunks with flat memory. Each chunk
+    # is only tokenized up to its last safe cut; the rest is carried into the
+    # next chunk so no word, number or URL is split at a chunk edge.
+    # tokenizer=None uses WORD_PATTERN.finditer directly on the chunk (no slicing).
+    # at_file_start=False means the text continues a file after a newline
+    # (a shard), so ^ must not match at its first char.
+    carry, offset = ("", 0) if at_file_start else ("\n", 1)
+    # offset = chars at the start of carry already consumed (kept only as context for ^)
+    for chunk in chunks:
+        text = carry + chunk
+        cut = find_token_safe_cut(text)
+        if cut <= offset:
+            carry = text
+            continue
+        if tokenizer is None:
+            for m in WORD_PATTERN.finditer(text, offset):
+                if m.start() >= cut:
+                    break
+                yield m.group()
+        else:
+            yield from tokenizer(text[offset:cut])
+        # keep one char before the cut so ^ can't match at the carry start
+        carry = text[cut - 1:]
+        offset = 1
+    if tokenizer is None:
+        for m in WORD_PATTERN.finditer(carry, offset):
+            yield m.group()
+    elif carry[offset:].strip():
+        yield from tokenizer(carry[offset:])
+
+
+def iter_file_chunks(input_file, chunk_size=1024 * 1024 * 8):
+    if is_parquet(input_file):
+        # one row per line, read record batch by record batch (parquet_convert.py)
+        yield from iter_parquet_text(input_file)
+        return
+    with open(input_file, "r", encoding="utf-8", errors="ignore") as infile:
+        yield from iter(lambda: infile.read(chunk_size), "")
+
 
+def iter_file_tokens(input_file, tokenizer=None, chunk_size=1024 * 1024 * 8):
+    yield from iter_text_tokens(iter_file_chunks(input_file, chunk_size), tokenizer)
+
+
+def write_tokens(tokens, outfile, batch_size=100000):
+    # One write per batch instead of one per token. Returns the number of tokens.
+    batch = []
+    n = 0
+    for word in tokens:
+        batch.append(word)
+        batch.append('\n' if word in SENTENCE_END_TOKENS else ' ')
+        if len(batch) >= batch_size:
+            outfile.write("".join(batch))
+            n += len(batch) // 2
+            batch.clear()
+    outfile.write("".join(batch))
+    return n + len(batch) // 2
+
+
+def process_in_chunks(input_file, output_file, tokenizer=None, chunk_size=1024 * 1024 * 8, ids_prefix=None):
+    # ids_prefix also writes the binary token-ID corpus (see token_ids.py) from the same pass.
+    # When instrumentation is on, the run is split into read / write / tokenize
+    # (everything else, including token IDs) with one latency per input chunk.
+    call = None
+    chunks = iter_file_chunks(input_file, chunk_size)
+    if instrumentation.active is not None:
+        call = instrumentation.active.call("process_in_chunks", input_file=str(input_file))
+        chunks = call.timed_chunks(chunks)
+    tokens = iter_text_tokens(chunks, tokenizer)
+    with open(output_file, "w", encoding="utf-8") as outfile:
+        if call is not None:
+            outfile = call.timed_writer(outfile)
+        if ids_prefix is None:
+            n = write_tokens(tokens, outfile)
+        else:
+            with TokenIdWriter(ids_prefix) as writer:
+                n = write_tokens(writer.passthrough(tokens), outfile)
+    if ids_prefix is not None:
+        record_word_file(ids_prefix, output_file)
+    if call is not None:
+        call.done(rest="tokenize", tokens=n)
+
+# --- Parallel mode: mmap the input and tokenize newline-aligned shards ---
+def find_shard_edges(mm, n_shards):
+    # Byte offsets splitting mm into about n_shards ranges. Every inner edge is
+    # just after a newline whose whitespace run no token can span (same rule as
+    # CUT_PATTERN), so the shards tokenize exactly like the whole file.
+    size = len(mm)
+    edges = [0]
+    for i in range(1, n_shards):
+        pos = max(size * i // n_shards, edges[-1])
         while True:
-            chunk = infile.read(chunk_size)
-            if not chunk:
+            nl = mm.find(b"\n", pos)
+            if nl == -1:
+                break
+            pos = nl + 1
+            left = mm[max(0, nl - 16):nl].decode("utf-8", errors="ignore").rstrip()
+            right = mm[nl + 1:nl + 17].decode("utf-8", errors="ignore").lstrip()
+            if left and right and CUT_PATTERN.search(left[-1] + "\n" + right[0]):
+                break
+        if nl == -1:
+            break
+        if pos > edges[-1] and pos < size:
+            edges.append(pos)
+    edges.append(size)
+    return edges
+
+
+def find_row_group_edges(parquet_file, n_shards):
+    # Parquet version of find_shard_edges: shards are ranges of row groups, and a
+    # group edge is only used when the rows on either side can't form one token
+    n = num_row_groups(parquet_file)
+    edges = [0]
+    for i in range(1, n_shards):
+        g = max(n * i // n_shards, edges[-1] + 1)
+        while g < n:
+            left = row_group_text(parquet_file, g - 1).rstrip()
+            right = row_group_text(parquet_file, g).lstrip()
+            if left and right and CUT_PATTERN.search(left[-1] + "\n" + right[0]):
                 break
+            g += 1
+        if g >= n:
+            break
+        edges.append(g)
+    edges.append(n)
+    return edges
+
+
+def iter_mmap_text(mm, start, end, chunk_size):
+    # Decode mm[start:end] chunk by chunk the way open(..., "r", errors="ignore")
+    # would, including the universal newline translation.
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(errors="ignore"), translate=True)
+    for pos in range(start, end, chunk_size):
+        stop = min(pos + chunk_size, end)
+        yield decoder.decode(mm[pos:stop], final=stop == end)
+
+
+def tokenize_shard(input_file, start, end, shard_file, tokenizer=None, chunk_size=1024 * 1024 * 8):
+    # start/end are byte offsets, or row-group indexes for a .parquet input
+    if is_parquet(input_file):
+        with open(shard_file, "w", encoding="utf-8") as outfile:
+            chunks = iter_parquet_text(input_file, row_groups=list(range(start, end)))
+            write_tokens(iter_text_tokens(chunks, tokenizer, at_file_start=start == 0), outfile)
+        return shard_file
+    with open(input_file, "rb") as f, \
+         mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+         open(shard_file, "w", encoding="utf-8") as outfile:
+        chunks = iter_mmap_text(mm, start, end, chunk_size)
+        write_tokens(iter_text_tokens(chunks, tokenizer, at_file_start=start == 0), outfile)
+    return shard_file
+
+
+def join_shards(shard_files, output_file, remove=True):
+    with open(output_file, "wb") as out:
+        for shard_file in shard_files:
+            with open(shard_file, "rb") as part:
+                shutil.copyfileobj(part, out, 1024 * 1024 * 16)
+            if remove:
+                os.remove(shard_file)
+
 
-            buffer += chunk
-
-            if len(buffer) > chunk_size:
-                words = tokenizer(buffer)
-                for word in words:
-                    if re.match(r'^\d+\.$', word):
-                        outfile.write(word + ' ')
-                    elif word in ['.', '।', '\u0964', '…', '...']:
-                        outfile.write(word + '\n')
-                    else:
-                        outfile.write(word + ' ')
-                buffer = ""  
-
-        if buffer.strip():
-            words = tokenizer(buffer)
-            for word in words:
-                if re.match(r'^\d+\.$', word):
-                    outfile.write(word + ' ')
-                elif word in ['.', '।', '\u0964', '…', '...']:
-                    outfile.write(word + '\n')
-                else:
-                    outfile.write(word + ' ')
+def process_in_shards(input_file, output_file, workers=None, tokenizer=None, chunk_size=1024 * 1024 * 8, join=True):
+    # Parallel version of process_in_chunks: one shard per worker, each written to
+    # output_file.NNN. With join=True the shards are concatenated in order into
+    # output_file (byte-identical to process_in_chunks) and removed.
+    workers = workers or os.cpu_count() or 1
+    if is_parquet(input_file):
+        edges = find_row_group_edges(input_file, workers)
+    else:
+        with open(input_file, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                open(output_file, "w").close()
+                return [output_file]
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                edges = find_shard_edges(mm, workers)
+    jobs = [(input_file, edges[i], edges[i + 1], f"{output_file}.{i:03d}", tokenizer, chunk_size)
+            for i in range(len(edges) - 1)]
+    if len(jobs) == 1:
+        shard_files = [tokenize_shard(*jobs[0])]
+    else:
+        with Pool(len(jobs)) as pool:
+            shard_files = pool.starmap(tokenize_shard, jobs)
+    if not join:
+        return shard_files
+    join_shards(shard_files, output_file)
+    return [output_file]
 
 if __name__ == "__main__":
-    process_in_chunks("indiccorp_gu.txt", "indiccorp_gu_words.txt", gujarati_word_tokenizer)
-    sentence_endings = ['.', '।', '\u0964', '…', '...']
-    total_words = 0
-    total_chars = 0
-    unique_words = set()
-    num_sentences = 0
-    with open("indiccorp_gu_words.txt", encoding="utf-8") as f:
-        for line in f:
-            words_in_line = line.strip().split()
-            total_words += len(words_in_line)
-            total_chars += sum(len(w) for w in words_in_line)
-            unique_words.update(words_in_line)
-            if any(p in line for p in sentence_endings):
-                num_sentences += 1
-    words_per_sentence = total_words / num_sentences if num_sentences else 0
-    avg_chars_per_word = total_chars / total_words if total_words else 0
-    ttr = len(unique_words) / total_words if total_words else 0
-    with open("indiccorp_gu_words_metrics.txt", "w", encoding="utf-8") as m:
-        m.write(f"Total words: {total_words}\n")
-        m.write(f"Total characters: {total_chars}\n")
-        m.write(f"Number of sentences (approx): {num_sentences}\n")
-        m.write(f"Words per sentence (approx): {words_per_sentence:.2f}\n")
-        m.write(f"Average characters per word: {avg_chars_per_word:.2f}\n")
-        m.write(f"Type-Token Ratio (TTR): {ttr:.4f}\n")
\ No newline at end of file
+    process_in_shards("indiccorp_gu.txt", "indiccorp_gu_words.txt")
+    stats = file_stats("indiccorp_gu_words.txt", "words", workers=os.cpu_count(), exact=False)
+    stats.write_metrics("indiccorp_gu_words_metrics.txt", approx_sentences=True)
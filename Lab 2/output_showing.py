@@ -1,6 +1,8 @@
 import re
 from typing import List, Dict
 
+from noun_lexicon import load_lexicon
+
 class NounMorphologyStemmer:
     def __init__(self, brown_nouns_file: str = None):
         self.valid_nouns = set()
@@ -14,11 +16,8 @@ class NounMorphologyStemmer:
         }
         self.irregular_singulars = {v: k for k, v in self.irregular_plurals.items()}
         if brown_nouns_file:
-            with open(brown_nouns_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    noun = line.strip().lower()
-                    if noun:
-                        self.valid_nouns.add(noun)
+            # prebuilt snapshot, loaded without parsing the text file (see noun_lexicon.py)
+            self.valid_nouns = load_lexicon(brown_nouns_file)
 
     def stem(self, word: str) -> str:
         if word in self.irregular_plurals:
@@ -1,6 +1,10 @@
+import argparse
+import os
 import re
 from typing import Dict, List, Tuple, Optional
 
+from noun_lexicon import load_lexicon
+
 class NounMorphologyFST:
     def __init__(self, brown_nouns_file: str = None):
         self.valid_nouns = set()
@@ -33,11 +37,8 @@ class NounMorphologyFST:
         self.irregular_singulars = {v: k for k, v in self.irregular_plurals.items()}
         
         if brown_nouns_file:
-            with open(brown_nouns_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    noun = line.strip().lower()
-                    if noun:
-                        self.valid_nouns.add(noun)
+            # prebuilt snapshot, loaded without parsing the text file (see noun_lexicon.py)
+            self.valid_nouns = load_lexicon(brown_nouns_file)
             print(f"Loaded {len(self.valid_nouns)} nouns from Brown corpus")
     
     def is_valid_noun(self, word: str) -> bool:
@@ -106,37 +107,39 @@ class NounMorphologyFST:
         
         return plural
     
-    def analyze_word(self, word: str) -> str:
-        word = word.strip().lower()
-        
+    def analyze(self, word: str) -> Optional[Tuple[str, str]]:
+        # (lemma, "SG" or "PL") for an already stripped + lowercased word, None if invalid
         if not word:
-            return "Invalid Word"
+            return None
         
         if word in self.irregular_plurals:
-            plural = self.irregular_plurals[word]
             if self.is_valid_noun(word):
-                return f"{word} = {word}+N+SG"
-            else:
-                return "Invalid Word"
+                return word, "SG"
+            return None
         
         if word in self.irregular_singulars:
             singular = self.irregular_singulars[word]
             if self.is_valid_noun(singular):
-                return f"{word} = {singular}+N+PL"
-            else:
-                return "Invalid Word"
+                return singular, "PL"
+            return None
         
         # assume it's singular and try to check this
         if self.is_valid_noun(word):
-            plural = self.get_plural_form(word)
-            return f"{word} = {word}+N+SG"
+            return word, "SG"
         
         # now if that didn't work then try to derive singular from potential plural
         potential_singular = self.get_singular_form(word)
         if potential_singular != word and self.is_valid_noun(potential_singular):
-            return f"{word} = {potential_singular}+N+PL"
+            return potential_singular, "PL"
         
-        return "Invalid Word"
+        return None
+    
+    def analyze_word(self, word: str) -> str:
+        word = word.strip().lower()
+        result = self.analyze(word)
+        if result is None:
+            return "Invalid Word"
+        return f"{word} = {result[0]}+N+{result[1]}"
     
     def process_corpus(self, words: List[str]) -> Dict[str, str]:
         results = {}
@@ -144,6 +147,15 @@ class NounMorphologyFST:
             results[word] = self.analyze_word(word)
         return results
     
+    def count_analyses(self, type_counts: Dict[str, int]) -> Dict[str, int]:
+        # "lemma+N+SG"/"lemma+N+PL" -> tokens, plus "Invalid Word" -> tokens.
+        # Works on type counts, so every distinct word is analyzed once.
+        counts: Dict[str, int] = {}
+        for word, c in type_counts.items():
+            key = format_analysis(self.analyze(word))
+            counts[key] = counts.get(key, 0) + c
+        return counts
+    
     def demonstrate_rules(self):
         examples = [
             'fox', 'foxes', 'watch', 'watches', 'class', 'classes',
@@ -157,14 +169,118 @@ class NounMorphologyFST:
             analysis = self.analyze_word(word)
             print(f"{word:15} -> {analysis}")
 
-brown_nouns_file = "brown_nouns.txt"
-fst = NounMorphologyFST(brown_nouns_file)
-fst.demonstrate_rules()
-
-while True:
-    word = input("\nEnter a word to analyze: ").strip()
-    if word.lower() == 'quit':
-        break
-    if word:
-        result = fst.analyze_word(word)
-        print(f"My Result: {result}")
\ No newline at end of file
+
+def format_analysis(result: Optional[Tuple[str, str]]) -> str:
+    return "Invalid Word" if result is None else f"{result[0]}+N+{result[1]}"
+
+
+# --- Batch mode: lemma counts for a whole token file ---
+# The token file (e.g. Lab 1 word-tokenizer output) is split into byte ranges;
+# each worker counts the word types of its range and analyzes every type once,
+# so the cost grows with the vocabulary, not with the number of tokens.
+
+_worker_fst: Optional[NounMorphologyFST] = None
+
+
+def _init_worker(brown_nouns_file: str) -> None:
+    global _worker_fst
+    _worker_fst = NounMorphologyFST(brown_nouns_file)
+
+
+def count_types_in_range(token_file: str, start: int, end: int) -> Dict[str, int]:
+    # lowercased token types of the lines that start in [start, end)
+    counts: Dict[str, int] = {}
+    with open(token_file, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()  # finish the line that started before this range
+        pos = f.tell()
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            pos += len(line)
+            for tok in line.decode("utf-8", errors="ignore").lower().split():
+                counts[tok] = counts.get(tok, 0) + 1
+    return counts
+
+
+def analyze_range(token_file: str, start: int, end: int, keep_types: bool) -> Tuple[Dict[str, int], Optional[Dict[str, int]]]:
+    types = count_types_in_range(token_file, start, end)
+    return _worker_fst.count_analyses(types), types if keep_types else None
+
+
+def merge_counts(total: Dict[str, int], part: Dict[str, int]) -> None:
+    for k, c in part.items():
+        total[k] = total.get(k, 0) + c
+
+
+def analyze_file(token_file: str, brown_nouns_file: str, workers: int = 1,
+                 keep_types: bool = False) -> Tuple[Dict[str, int], Optional[Dict[str, int]]]:
+    # Returns (analysis -> token count, word type -> token count if keep_types)
+    from multiprocessing import Pool
+
+    size = os.path.getsize(token_file)
+    n_ranges = max(1, workers * 4) if workers > 1 else 1
+    edges = [size * i // n_ranges for i in range(n_ranges + 1)]
+    jobs = [(token_file, edges[i], edges[i + 1], keep_types) for i in range(n_ranges)]
+    if workers > 1:
+        with Pool(workers, initializer=_init_worker, initargs=(brown_nouns_file,)) as pool:
+            parts = pool.starmap(analyze_range, jobs)
+    else:
+        _init_worker(brown_nouns_file)
+        parts = [analyze_range(*job) for job in jobs]
+    analyses: Dict[str, int] = {}
+    types: Optional[Dict[str, int]] = {} if keep_types else None
+    for part_analyses, part_types in parts:
+        merge_counts(analyses, part_analyses)
+        if keep_types:
+            merge_counts(types, part_types)
+    return analyses, types
+
+
+def write_counts(counts: Dict[str, int], out_file: str, header: str) -> None:
+    # compact TSV, most frequent first
+    with open(out_file, "w", encoding="utf-8") as f:
+        f.write(header + "\n")
+        for key, c in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0])):
+            f.write(f"{key}\t{c}\n")
+
+
+def write_type_analyses(fst: NounMorphologyFST, types: Dict[str, int], out_file: str) -> None:
+    with open(out_file, "w", encoding="utf-8") as f:
+        f.write("word\tanalysis\tcount\n")
+        for word, c in sorted(types.items(), key=lambda kv: (-kv[1], kv[0])):
+            f.write(f"{word}\t{format_analysis(fst.analyze(word))}\t{c}\n")
+
+
+def interactive(fst: NounMorphologyFST) -> None:
+    fst.demonstrate_rules()
+
+    while True:
+        word = input("\nEnter a word to analyze: ").strip()
+        if word.lower() == 'quit':
+            break
+        if word:
+            result = fst.analyze_word(word)
+            print(f"My Result: {result}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Noun morphology FST (interactive, or batch over a token file)")
+    ap.add_argument("--nouns", default="brown_nouns.txt")
+    ap.add_argument("--corpus", help="token file to analyze without prompting (whitespace-separated tokens)")
+    ap.add_argument("--out", default="lemma_counts.tsv", help="analysis -> token count")
+    ap.add_argument("--types-out", help="also write word, analysis, count per distinct word")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+
+    if args.corpus:
+        analyses, types = analyze_file(args.corpus, args.nouns, args.workers, keep_types=bool(args.types_out))
+        write_counts(analyses, args.out, "analysis\tcount")
+        print(f"Wrote {len(analyses)} analyses ({sum(analyses.values())} tokens) to {args.out}")
+        if args.types_out:
+            write_type_analyses(NounMorphologyFST(args.nouns), types, args.types_out)
+            print(f"Wrote {len(types)} word types to {args.types_out}")
+    else:
+        interactive(NounMorphologyFST(args.nouns))
\ No newline at end of file
@@ -0,0 +1,413 @@
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Trie stemmer with the same heuristic as Lab 3/q1.cpp, stored as flat NumPy
+# arrays instead of one unordered_map node per character.
+#
+# Layout: nodes are numbered level by level (root = 0), and the children of a
+# node are consecutive and sorted by symbol. So keys[i] = parent * alphabet +
+# symbol of node i + 1 is strictly increasing, and a child lookup is a
+# searchsorted over keys, which also works for a whole batch of words at once.
+# Everything best_split needs is precomputed per node at build time:
+#   count      words passing through the node (q1.cpp's cnt)
+#   branching  number of children
+#   max_child  largest child count
+#   score      (1 - max_child / count) * branching, only used when
+#              branching >= BRANCH_THRESHOLD (the `eligible` mask)
+#
+# Words are sequences of integer symbols: bytes (like q1.cpp's char) by default,
+# or Gujarati grapheme clusters for the frequency-weighted mode further down.
+
+BRANCH_THRESHOLD = 15
+EPS = 1e-9
+BATCH = 1 << 16
+
+
+class Sequences:
+    # Many symbol sequences in one flat array: word i = flat[starts[i]:starts[i] + lengths[i]]
+    def __init__(self, flat: np.ndarray, lengths: np.ndarray):
+        self.flat = flat
+        self.lengths = lengths.astype(np.int64)
+        self.starts = np.zeros(len(lengths), dtype=np.int64)
+        np.cumsum(self.lengths[:-1], out=self.starts[1:])
+
+    @classmethod
+    def from_bytes(cls, words: Sequence[bytes], reverse: bool = False) -> "Sequences":
+        if reverse:
+            words = [w[::-1] for w in words]
+        flat = np.frombuffer(b"".join(words), dtype=np.uint8)
+        return cls(flat, np.fromiter(map(len, words), dtype=np.int64, count=len(words)))
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def batches(self, size: int = BATCH) -> Iterable[Tuple[int, "Sequences"]]:
+        for lo in range(0, len(self), size):
+            hi = min(lo + size, len(self))
+            start = self.starts[lo]
+            end = self.starts[hi - 1] + self.lengths[hi - 1] if hi > lo else start
+            yield lo, Sequences(self.flat[start:end], self.lengths[lo:hi])
+
+
+class CompactTrie:
+    def __init__(self, keys: np.ndarray, counts: np.ndarray, alphabet: int,
+                 threshold: int = BRANCH_THRESHOLD):
+        self.alphabet = alphabet
+        self.keys = keys
+        self.count = counts
+        self.parent = np.concatenate([[-1], keys // alphabet])
+        self.symbol = np.concatenate([[-1], keys % alphabet])
+        n = len(counts)
+        self.branching = np.bincount(self.parent[1:], minlength=n)
+        self.max_child = np.zeros(n, dtype=np.int64)
+        if n > 1:
+            # children are consecutive, so each parent's max is one reduceat segment
+            first = np.flatnonzero(np.concatenate([[True], self.parent[2:] != self.parent[1:-1]]))
+            self.max_child[self.parent[1:][first]] = np.maximum.reduceat(counts[1:], first)
+        self.threshold = threshold
+        self.eligible = (self.branching >= threshold) & (counts > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            frac = 1.0 - self.max_child.astype(np.float64) / counts.astype(np.float64)
+        self.score = np.where(self.eligible, frac * self.branching, 0.0)
+        # levels[d]:levels[d + 1] are the nodes at depth d (parents are non-decreasing)
+        self.levels = [0]
+        while self.levels[-1] < n:
+            self.levels.append(max(self.levels[-1] + 1, int(np.searchsorted(self.parent, self.levels[-1]))))
+
+    @classmethod
+    def build(cls, seqs: Sequences, weights: Optional[np.ndarray] = None, alphabet: int = 256,
+              threshold: int = BRANCH_THRESHOLD) -> "CompactTrie":
+        # weights: how many times each sequence counts (default 1, like one
+        # insert_word per line in q1.cpp)
+        n = len(seqs)
+        w = np.ones(n, dtype=np.int64) if weights is None else np.asarray(weights, dtype=np.int64)
+        node_of = np.zeros(n, dtype=np.int64)
+        keys: List[np.ndarray] = []
+        counts: List[np.ndarray] = [np.array([w.sum()], dtype=np.int64)]
+        next_id = 1
+        depth = 0
+        active = np.flatnonzero(seqs.lengths > 0)
+        while active.size:
+            level_keys = node_of[active] * alphabet + seqs.flat[seqs.starts[active] + depth]
+            uniq, inv = np.unique(level_keys, return_inverse=True)
+            keys.append(uniq)
+            counts.append(np.bincount(inv, weights=w[active], minlength=len(uniq)).astype(np.int64))
+            node_of[active] = next_id + inv
+            next_id += len(uniq)
+            depth += 1
+            active = active[seqs.lengths[active] > depth]
+        all_keys = np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64)
+        return cls(all_keys, np.concatenate(counts), alphabet, threshold)
+
+    def __len__(self) -> int:
+        return len(self.count)
+
+    def remap_symbols(self, lut: np.ndarray, alphabet: int) -> "CompactTrie":
+        # Same trie with symbol s renamed lut[s]. Children have to be re-sorted,
+        # so it is rebuilt through merge().
+        trie = CompactTrie.__new__(CompactTrie)
+        trie.alphabet, trie.count, trie.levels = alphabet, self.count, self.levels
+        trie.parent = self.parent
+        trie.symbol = np.concatenate([[-1], lut[self.symbol[1:]]]) if len(self.symbol) > 1 else self.symbol
+        return CompactTrie.merge([trie], alphabet, self.threshold)
+
+    @classmethod
+    def merge(cls, tries: Sequence["CompactTrie"], alphabet: int,
+              threshold: int = BRANCH_THRESHOLD) -> "CompactTrie":
+        # Union of tries over the same symbols, counts added: the trie of all
+        # their words. Done level by level, like build().
+        mapped = [np.zeros(len(t), dtype=np.int64) for t in tries]
+        keys: List[np.ndarray] = []
+        counts: List[np.ndarray] = [np.array([sum(int(t.count[0]) for t in tries)], dtype=np.int64)]
+        next_id = 1
+        for depth in range(1, max(len(t.levels) for t in tries) - 1):
+            level_keys, level_counts, sizes = [], [], []
+            for t, m in zip(tries, mapped):
+                if depth + 1 < len(t.levels):
+                    lo, hi = t.levels[depth], t.levels[depth + 1]
+                else:
+                    lo = hi = len(t)
+                level_keys.append(m[t.parent[lo:hi]] * alphabet + t.symbol[lo:hi])
+                level_counts.append(t.count[lo:hi])
+                sizes.append((lo, hi))
+            uniq, inv = np.unique(np.concatenate(level_keys), return_inverse=True)
+            keys.append(uniq)
+            counts.append(np.bincount(inv, weights=np.concatenate(level_counts), minlength=len(uniq)).astype(np.int64))
+            pos = 0
+            for m, (lo, hi) in zip(mapped, sizes):
+                m[lo:hi] = next_id + inv[pos:pos + hi - lo]
+                pos += hi - lo
+            next_id += len(uniq)
+        all_keys = np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64)
+        return cls(all_keys, np.concatenate(counts), alphabet, threshold)
+
+    def best_split_batch(self, seqs: Sequences) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # q1.cpp's best_split for every sequence: (best_index, score, support),
+        # best_index = -1 if no eligible node is on the word's path
+        n = len(seqs)
+        best_i = np.full(n, -1, dtype=np.int64)
+        best_score = np.zeros(n, dtype=np.float64)
+        best_support = np.zeros(n, dtype=np.int64)
+        node = np.zeros(n, dtype=np.int64)
+        keys = self.keys
+        depth = 0
+        active = np.flatnonzero(seqs.lengths > 0)
+        while active.size and len(keys):
+            q = node[active] * self.alphabet + seqs.flat[seqs.starts[active] + depth]
+            pos = np.searchsorted(keys, q)
+            found = pos < len(keys)
+            found[found] = keys[pos[found]] == q[found]
+            # symbol not in the trie: the walk stops, like the `break` in q1.cpp
+            active, child = active[found], pos[found] + 1
+            node[active] = child
+            s, bs = self.score[child], best_score[active]
+            better = self.eligible[child] & (
+                (s > bs + EPS) | ((np.abs(s - bs) < EPS) & (depth > best_i[active]))
+            )
+            upd = active[better]
+            best_i[upd] = depth
+            best_score[upd] = s[better]
+            best_support[upd] = self.count[child[better]]
+            depth += 1
+            active = active[seqs.lengths[active] > depth]
+        return best_i, best_score, best_support
+
+    def best_split(self, seq: Sequence[int]) -> Tuple[int, float, int]:
+        seqs = Sequences(np.asarray(seq, dtype=np.int64), np.array([len(seq)]))
+        i, s, sup = self.best_split_batch(seqs)
+        return int(i[0]), float(s[0]), int(sup[0])
+
+
+# (stem, suffix, score, support); suffix == b"" means no split
+Split = Tuple[bytes, bytes, float, int]
+
+
+class TrieStemmer:
+    # Prefix trie over the words and suffix trie over the reversed words, split
+    # the way q1.cpp's main() does (a split needs a stem of >= 2 and a non-empty suffix).
+
+    def __init__(self, words: Sequence[bytes], weights: Optional[np.ndarray] = None,
+                 threshold: int = BRANCH_THRESHOLD):
+        self.prefix_trie = CompactTrie.build(Sequences.from_bytes(words), weights, threshold=threshold)
+        self.suffix_trie = CompactTrie.build(Sequences.from_bytes(words, reverse=True), weights, threshold=threshold)
+
+    def split_batch(self, words: Sequence[bytes], side: str = "prefix") -> List[Split]:
+        out: List[Split] = []
+        trie = self.prefix_trie if side == "prefix" else self.suffix_trie
+        seqs = Sequences.from_bytes(words, reverse=side == "suffix")
+        for lo, batch in seqs.batches():
+            idx, score, support = trie.best_split_batch(batch)
+            for k, (i, s, sup) in enumerate(zip(idx.tolist(), score.tolist(), support.tolist())):
+                w = words[lo + k]
+                if i == -1:
+                    out.append((w, b"", 0.0, 0))
+                    continue
+                cut = i + 1 if side == "prefix" else len(w) - (i + 1)
+                stem, sfx = w[:cut], w[cut:]
+                if len(stem) < 2 or not sfx:
+                    out.append((w, b"", 0.0, 0))
+                else:
+                    out.append((stem, sfx, s, sup))
+        return out
+
+
+# --- Gujarati mode: grapheme clusters, weighted by corpus frequency ---
+# q1.cpp's bytes split UTF-8 sequences and separate matras from their consonant,
+# and every type counts once. Here a symbol is one grapheme cluster (conjuncts
+# joined through virama, with their matras/nukta/anusvara) and each word is
+# inserted with its corpus count from freq_distribution.py's table
+# (<words file>.freqcache.tsv, "word\tcount" lines sorted by word).
+# The vocabulary is split into byte ranges of that table, one trie per range is
+# built in a worker, and the shard tries are merged.
+
+GRAPHEME = re.compile(
+    r'(?:[\u0A95-\u0AB9]\u0ABC?\u0ACD[\u200C\u200D]?)*'  # consonant + virama (conjuncts)
+    r'.[\u0A81-\u0A83\u0ABC\u0ABE-\u0ACD\u0AE2\u0AE3\u200C\u200D]*',  # base + signs
+    re.S,
+)
+
+
+def graphemes(word: str) -> List[str]:
+    return GRAPHEME.findall(word)
+
+
+def encode_graphemes(words: Sequence[str], symbols: Dict[str, int],
+                     reverse: bool = False) -> Sequences:
+    # symbols grows with every new cluster seen
+    flat: List[int] = []
+    lengths = np.zeros(len(words), dtype=np.int64)
+    for i, w in enumerate(words):
+        g = graphemes(w)
+        if reverse:
+            g.reverse()
+        flat.extend(symbols.setdefault(c, len(symbols)) for c in g)
+        lengths[i] = len(g)
+    return Sequences(np.array(flat, dtype=np.int64), lengths)
+
+
+def read_freq_range(freq_file: str, start: int, end: int, min_count: int = 1) -> Tuple[List[str], np.ndarray]:
+    # words and counts of the table lines that start in [start, end)
+    words: List[str] = []
+    counts: List[int] = []
+    with open(freq_file, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()  # finish the line that started before this range
+        pos = f.tell()
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            pos += len(line)
+            w, _, c = line.decode("utf-8", errors="ignore").rstrip("\n").rpartition("\t")
+            if w and int(c) >= min_count:
+                words.append(w)
+                counts.append(int(c))
+    return words, np.array(counts, dtype=np.int64)
+
+
+def shard_tries(freq_file: str, start: int, end: int, min_count: int,
+                threshold: int) -> Tuple[List[str], CompactTrie, CompactTrie]:
+    # prefix and suffix trie of one vocabulary shard, over the shard's own symbols
+    words, counts = read_freq_range(freq_file, start, end, min_count)
+    symbols: Dict[str, int] = {}
+    pref_seqs = encode_graphemes(words, symbols)
+    suf_seqs = encode_graphemes(words, symbols, reverse=True)
+    # one spare symbol ID that is never in a trie, for clusters seen only at query time
+    alphabet = len(symbols) + 1
+    return (list(symbols), CompactTrie.build(pref_seqs, counts, alphabet, threshold),
+            CompactTrie.build(suf_seqs, counts, alphabet, threshold))
+
+
+class GraphemeSegmenter:
+    # Frequency-weighted prefix/suffix tries over grapheme clusters, built from
+    # a frequency table in parallel shards and merged.
+
+    def __init__(self, symbols: List[str], prefix_trie: CompactTrie, suffix_trie: CompactTrie):
+        self.symbols = symbols
+        self.symbol_ids = {c: i for i, c in enumerate(symbols)}
+        self.prefix_trie = prefix_trie
+        self.suffix_trie = suffix_trie
+
+    @classmethod
+    def from_freq_table(cls, freq_file: str, workers: int = 1, min_count: int = 1,
+                        threshold: int = BRANCH_THRESHOLD) -> "GraphemeSegmenter":
+        size = os.path.getsize(freq_file)
+        n = max(1, workers * 4) if workers > 1 else 1
+        edges = [size * i // n for i in range(n + 1)]
+        jobs = [(freq_file, edges[i], edges[i + 1], min_count, threshold) for i in range(n)]
+        if workers > 1:
+            from multiprocessing import Pool
+            with Pool(workers) as pool:
+                shards = pool.starmap(shard_tries, jobs)
+        else:
+            shards = [shard_tries(*job) for job in jobs]
+        # one sorted alphabet for all shards, then rename each shard's symbols
+        symbols = sorted(set().union(*(s for s, _, _ in shards)))
+        ids = {c: i for i, c in enumerate(symbols)}
+        alphabet = len(symbols) + 1
+        prefs, sufs = [], []
+        for local, pref, suf in shards:
+            lut = np.array([ids[c] for c in local] or [0], dtype=np.int64)
+            prefs.append(pref.remap_symbols(lut, alphabet))
+            sufs.append(suf.remap_symbols(lut, alphabet))
+        return cls(symbols, CompactTrie.merge(prefs, alphabet, threshold), CompactTrie.merge(sufs, alphabet, threshold))
+
+    def split_batch(self, words: Sequence[str], side: str = "prefix") -> List[Tuple[str, str, float, int]]:
+        # (stem, suffix, score, support) per word, suffix "" = no split; the stem
+        # needs at least 2 grapheme clusters (q1.cpp: 2 bytes)
+        trie = self.prefix_trie if side == "prefix" else self.suffix_trie
+        clusters = [graphemes(w) for w in words]
+        # clusters never seen while building get the spare ID, so the walk stops there
+        unknown = len(self.symbols)
+        flat = np.array([self.symbol_ids.get(c, unknown) for g in clusters for c in (g if side == "prefix" else g[::-1])],
+                        dtype=np.int64)
+        seqs = Sequences(flat, np.fromiter(map(len, clusters), dtype=np.int64, count=len(clusters)))
+        out = []
+        for lo, batch in seqs.batches():
+            idx, score, support = trie.best_split_batch(batch)
+            for k, (i, s, sup) in enumerate(zip(idx.tolist(), score.tolist(), support.tolist())):
+                w, g = words[lo + k], clusters[lo + k]
+                if i == -1:
+                    out.append((w, "", 0.0, 0))
+                    continue
+                cut = i + 1 if side == "prefix" else len(g) - (i + 1)
+                if cut < 2 or cut >= len(g):
+                    out.append((w, "", 0.0, 0))
+                else:
+                    out.append(("".join(g[:cut]), "".join(g[cut:]), s, sup))
+        return out
+
+
+def read_words(path: str) -> List[bytes]:
+    # lines as q1.cpp reads them: getline() + ASCII tolower, duplicates kept
+    with open(path, "rb") as f:
+        lines = f.read().split(b"\n")
+    if lines and lines[-1] == b"":
+        lines.pop()
+    return [line.lower() for line in lines]
+
+
+def write_splits(words: Sequence[bytes], splits: List[Split], out_file: str) -> Tuple[int, float]:
+    count, score_sum = 0, 0.0
+    with open(out_file, "wb") as f:
+        for w, (stem, sfx, score, support) in zip(words, splits):
+            if sfx:
+                f.write(w + b"=" + stem + b"+" + sfx + f"  # score={score:g} support={support}\n".encode())
+                count += 1
+                score_sum += score
+            else:
+                f.write(w + b"=" + w + b"+  # nosplit\n")
+    return count, score_sum
+
+
+def segment_vocabulary(freq_file: str, out_prefix: str, workers: int, min_count: int) -> None:
+    seg = GraphemeSegmenter.from_freq_table(freq_file, workers, min_count)
+    print(f"Built tries: {len(seg.prefix_trie)} prefix nodes, {len(seg.suffix_trie)} suffix nodes, "
+          f"{len(seg.symbols)} grapheme clusters")
+    words, _ = read_freq_range(freq_file, 0, os.path.getsize(freq_file), min_count)
+    for side in ("prefix", "suffix"):
+        out_file = f"{out_prefix}{side}_out.txt"
+        splits = 0
+        with open(out_file, "w", encoding="utf-8") as f:
+            for lo in range(0, len(words), BATCH):
+                chunk = words[lo:lo + BATCH]
+                for w, (stem, sfx, score, support) in zip(chunk, seg.split_batch(chunk, side)):
+                    if sfx:
+                        f.write(f"{w}={stem}+{sfx}  # score={score:g} support={support}\n")
+                        splits += 1
+                    else:
+                        f.write(f"{w}={w}+  # nosplit\n")
+        print(f"Wrote {out_file}: {splits} of {len(words)} words split")
+
+
+if __name__ == "__main__":
+    # Default: same files as q1.cpp: prefix_out.txt, suffix_out.txt and the
+    # better of the two (more splits, then higher score sum) as trie_q1_output.txt.
+    # With --freq-table: the Gujarati grapheme / frequency-weighted mode.
+    import argparse
+    import shutil
+    import sys
+
+    ap = argparse.ArgumentParser(description="Trie-based stem+suffix splitting")
+    ap.add_argument("--freq-table", help="word<TAB>count table, e.g. ../Lab 1/indiccorp_gu_words.txt.freqcache.tsv")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--min-count", type=int, default=1, help="skip words rarer than this")
+    ap.add_argument("--out-prefix", default="gu_")
+    args = ap.parse_args()
+    if args.freq_table:
+        segment_vocabulary(args.freq_table, args.out_prefix, args.workers, args.min_count)
+        sys.exit()
+
+    words = read_words("brown_nouns.txt")
+    stemmer = TrieStemmer(words)
+    pref_count, pref_sum = write_splits(words, stemmer.split_batch(words, "prefix"), "prefix_out.txt")
+    suf_count, suf_sum = write_splits(words, stemmer.split_batch(words, "suffix"), "suffix_out.txt")
+    winner = "prefix"
+    if suf_count > pref_count or (suf_count == pref_count and suf_sum > pref_sum):
+        winner = "suffix"
+    shutil.copyfile(f"{winner}_out.txt", "trie_q1_output.txt")
+    print(f"written prefix_out={pref_count} suffix_out={suf_count} winner={winner}", file=sys.stderr)
@@ -9,18 +9,76 @@ Assignment-2 Q2: Frequency distribution and stopword removal plots.
       freq_after_stop_T_top100.png, freq_after_stop_T_top100.csv
 
 If matplotlib is unavailable, CSVs are still written.
+
+With numpy installed, counts are held in a FrequencyTable (NumPy arrays): a
+lone top-K uses partial selection (np.argpartition), and any number of
+thresholds are answered from one count order built on the first threshold
+(a searchsorted and a K-slice each). If a token-ID corpus (Lab 1/token_ids.py)
+written from this same word file (its meta records the file's size, mtime and
+hash) sits next to the input, it is counted with np.bincount instead of
+re-reading the text.
+Without numpy the top-N and thresholds are selected in one streaming pass.
+
+The counted table is cached next to the input (<input>.freqcache.tsv/.json,
+keyed on size, mtime and block hashes), so re-running with other thresholds or
+--top-n skips the counting, and appending to the word file only counts the new
+lines. --no-cache restores the original single-dict path.
+
+With --workers N the text is split into byte ranges counted by N processes.
+Each worker spills its partial counts to a sorted run file whenever its dict
+grows past --max-mem-mb, and the runs are combined with a k-way merge, so the
+vocabulary never has to fit in one dict. Top-K and the threshold sweep are then
+taken in one streaming pass over the merged counts.
+
+With --ngram 2 (or 3, ...) bigrams (trigrams) within each line are counted
+instead, into freq_bigram_top100.csv and freq_bigram_after_stop_T_top100.csv.
+N-grams are counted under 64-bit hash keys in NumPy arrays, spilled to sorted
+binary runs past --max-mem-mb and merged externally; a second pass over the
+input recovers the text of the rows that are written.
+
+With --approx only the top-N is computed, in fixed memory: a Count-Min Sketch
+plus a SpaceSaving heavy-hitter table. freq_top100.csv then gets a max_error
+column; each word's true count lies in [frequency - max_error, frequency].
+
+Usage: python freq_distribution.py [--thresholds 5 10 20 ...] [--top-n 100] [--interactive]
+                                   [--workers N] [--max-mem-mb MB] [--spill-dir DIR] [--no-cache] [--ngram N]
+                                   [--approx [--sketch-width W] [--sketch-depth D] [--heavy-hitters M]]
 """
 
 from __future__ import annotations
 
+import argparse
+import bisect
+import hashlib
+import heapq
+import json
+import math
 import os
+import random
+import shutil
+import sys
+import tempfile
+from array import array
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:
+    np = None
 
 
 DEFAULT_INPUT_NAME = "indiccorp_gu_words.txt"
 DEFAULT_THRESHOLDS = [5, 10, 20]
 TOP_N = 100
+# rough cost of one dict entry (short str key + int + hash slot), for --max-mem-mb
+BYTES_PER_ENTRY = 120
+READ_BLOCK = 1 << 22
+MERGE_FAN_IN = 64
+
+# (total tokens, vocabulary size, top-N rows, {threshold: (kept words, top-N rows)})
+Summary = Tuple[int, int, List[Tuple[str, int]], Dict[int, Tuple[int, List[Tuple[str, int]]]]]
 
 
 def find_input_file() -> Path | None:
@@ -64,12 +122,15 @@ def top_k(freq: Dict[str, int], k: int) -> List[Tuple[str, int]]:
     return sorted(freq.items(), key=lambda kv: (-kv[1], kv[0]))[:k]
 
 
-def write_csv(rows: List[Tuple[str, int]], out_path: Path) -> None:
-    lines = ["word,frequency"] + [f"{w},{c}" for w, c in rows]
+def write_csv(rows: List[Tuple[str, int]], out_path: Path, errors: List[int] | None = None, label: str = "word") -> None:
+    if errors is None:
+        lines = [f"{label},frequency"] + [f"{w},{c}" for w, c in rows]
+    else:
+        lines = [f"{label},frequency,max_error"] + [f"{w},{c},{e}" for (w, c), e in zip(rows, errors)]
     out_path.write_text("\n".join(lines), encoding="utf-8")
 
 
-def plot_bar(rows: List[Tuple[str, int]], title: str, out_path: Path) -> bool:
+def plot_bar(rows: List[Tuple[str, int]], title: str, out_path: Path, xlabel: str = "Words") -> bool:
     try:
         import matplotlib.pyplot as plt  # type: ignore
 
@@ -79,7 +140,7 @@ def plot_bar(rows: List[Tuple[str, int]], title: str, out_path: Path) -> bool:
         fig, ax = plt.subplots(figsize=(16, 6))
         ax.bar(range(len(words)), counts, width=width, color="#4C78A8")
         ax.set_title(title)
-        ax.set_xlabel("Words")
+        ax.set_xlabel(xlabel)
         ax.set_ylabel("Frequency")
         ax.set_xticks(range(len(words)))
         # Show every Nth x-tick label to avoid clutter
@@ -98,7 +159,950 @@ def remove_stopwords_by_threshold(freq: Dict[str, int], threshold: int) -> Dict[
     return {w: c for w, c in freq.items() if c < threshold}
 
 
-def main() -> None:
+class FrequencyTable:
+    # Vocabulary as two parallel arrays: words[i] (Python list, never copied) and
+    # counts[i] (int64). Nothing is sorted up front. A lone top_k finds its K-th
+    # count with np.argpartition, sorts only the words above it, and takes the
+    # words tied at it in lexicographic order (heapq.nsmallest, as many as are
+    # still needed). The first threshold query builds `order` (word indices by
+    # count, descending, stable) and its sorted counts once; after that every
+    # threshold is a searchsorted plus a K-slice of order. Words with equal
+    # counts are put in lexicographic order only as far as a query reaches into
+    # their tie group (cached per group), so rows come out exactly like top_k().
+
+    def __init__(self, words: List[str], counts) -> None:
+        self.words = words
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.order: np.ndarray | None = None
+        # ascending negated counts of order, for searchsorted
+        self._neg_sorted: np.ndarray | None = None
+        # start rank of a tie group -> its first words in word order
+        self._tie_prefixes: Dict[int, List[str]] = {}
+
+    @classmethod
+    def from_dict(cls, freq: Dict[str, int]) -> "FrequencyTable":
+        return cls(list(freq.keys()), np.fromiter(freq.values(), dtype=np.int64, count=len(freq)))
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[Tuple[str, int]]) -> "FrequencyTable":
+        words: List[str] = []
+        counts: List[int] = []
+        for w, c in pairs:
+            words.append(w)
+            counts.append(c)
+        return cls(words, counts)
+
+    @classmethod
+    def from_token_ids(cls, prefix: str) -> "FrequencyTable":
+        from token_ids import TokenIdCorpus  # Lab 1, see add_lab1_to_path()
+
+        corpus = TokenIdCorpus(prefix)
+        return cls(corpus.words, corpus.counts())
+
+    @property
+    def total_tokens(self) -> int:
+        return int(self.counts.sum())
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def rank_of_threshold(self, threshold: int) -> int:
+        # number of words with frequency >= threshold (= first rank that survives)
+        if self._neg_sorted is None:
+            return int(np.count_nonzero(self.counts >= threshold))
+        return int(np.searchsorted(self._neg_sorted, -threshold, side="right"))
+
+    def _rank(self) -> None:
+        if self.order is None:
+            self.order = np.argsort(-self.counts, kind="stable")
+            self._neg_sorted = -self.counts[self.order]
+
+    def _tie_prefix(self, lo: int, hi: int, m: int) -> List[str]:
+        # the first m words of the tie group at ranks [lo, hi), in word order
+        prefix = self._tie_prefixes.get(lo)
+        if prefix is None or len(prefix) < min(m, hi - lo):
+            group = map(self.words.__getitem__, self.order[lo:hi].tolist())
+            prefix = sorted(group) if m >= hi - lo else heapq.nsmallest(m, group)
+            self._tie_prefixes[lo] = prefix
+        return prefix
+
+    def ranked(self, start: int, stop: int) -> List[Tuple[str, int]]:
+        # rows at ranks [start, stop) in (-count, word) order
+        self._rank()
+        stop = min(stop, len(self.words))
+        rows: List[Tuple[str, int]] = []
+        pos = start
+        while pos < stop:
+            c = self._neg_sorted[pos]
+            lo = int(np.searchsorted(self._neg_sorted, c, side="left"))
+            hi = int(np.searchsorted(self._neg_sorted, c, side="right"))
+            end = min(stop, hi)
+            if hi - lo == 1:
+                group = [self.words[self.order[lo]]]
+            else:
+                group = self._tie_prefix(lo, hi, end - lo)
+            rows.extend((w, int(-c)) for w in group[pos - lo:end - lo])
+            pos = end
+        return rows
+
+    def _top_rows(self, idx: np.ndarray, k: int) -> List[Tuple[str, int]]:
+        # top_k() over the words at indices idx
+        k = min(k, len(idx))
+        if k <= 0:
+            return []
+        counts = self.counts[idx]
+        cutoff = counts[np.argpartition(-counts, k - 1)[k - 1]]
+        above = idx[counts > cutoff]
+        rows = sorted(((self.words[i], int(self.counts[i])) for i in above), key=lambda kv: (-kv[1], kv[0]))
+        tied = heapq.nsmallest(k - len(rows), (self.words[i] for i in idx[counts == cutoff]))
+        return rows + [(w, int(cutoff)) for w in tied]
+
+    def top_k(self, k: int) -> List[Tuple[str, int]]:
+        return self._top_rows(np.arange(len(self.words)), k)
+
+    def top_k_below(self, threshold: int, k: int) -> Tuple[int, List[Tuple[str, int]]]:
+        # remove_stopwords_by_threshold + top_k without building the pruned dict:
+        # words with count < threshold are exactly the ranks after rank_of_threshold
+        self._rank()
+        start = self.rank_of_threshold(threshold)
+        return len(self.words) - start, self.ranked(start, start + k)
+
+    def sweep(self, thresholds: Iterable[int], k: int) -> Dict[int, Tuple[int, List[Tuple[str, int]]]]:
+        return {t: self.top_k_below(t, k) for t in thresholds}
+
+
+def add_lab1_to_path() -> None:
+    lab1 = Path(__file__).resolve().parent.parent / "Lab 1"
+    if str(lab1) not in sys.path:
+        sys.path.insert(0, str(lab1))
+
+
+def token_ids_prefix_for(inp: Path) -> str | None:
+    # token-ID corpus written by Lab 1 from this very word file, if any; one
+    # that was written from another (or an older) word file is ignored
+    prefix = inp.with_suffix("")
+    if not prefix.with_name(prefix.name + ".meta.json").is_file() or np is None:
+        return None
+    add_lab1_to_path()
+    from token_ids import matches_word_file
+
+    if matches_word_file(str(prefix), inp):
+        return str(prefix)
+    print(f"Ignoring {prefix}.ids: it was not written from the current {inp.name}")
+    return None
+
+
+def build_table(inp: Path, prefix: str | None = None) -> FrequencyTable | Dict[str, int]:
+    # prefix: a token-ID corpus accepted by token_ids_prefix_for, counted instead of inp
+    if prefix:
+        print(f"Counting token IDs from: {prefix}.ids")
+        return FrequencyTable.from_token_ids(prefix)
+    freq = count_frequencies(read_tokens(inp))
+    return FrequencyTable.from_dict(freq) if np is not None else freq
+
+
+# --- Parallel counting: byte-range workers, sorted spill runs, k-way merge ---
+# A run file is "word\tcount" lines sorted by word (Python str order), so any
+# number of runs can be merged by streaming them side by side.
+
+
+def write_run(freq: Dict[str, int], path: Path) -> Path:
+    with path.open("w", encoding="utf-8") as f:
+        for w in sorted(freq):
+            f.write(f"{w}\t{freq[w]}\n")
+    return path
+
+
+def read_run(path: Path) -> Iterator[Tuple[str, int]]:
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            w, _, c = line.rstrip("\n").rpartition("\t")
+            yield w, int(c)
+
+
+def merge_pairs(runs: Iterable[Iterator[Tuple[str, int]]]) -> Iterator[Tuple[str, int]]:
+    # streaming k-way merge; equal words are adjacent after heapq.merge, so sum them
+    current, total = None, 0
+    for w, c in heapq.merge(*runs):
+        if w == current:
+            total += c
+        else:
+            if current is not None:
+                yield current, total
+            current, total = w, c
+    if current is not None:
+        yield current, total
+
+
+def merge_runs(paths: List[Path], out_dir: Path) -> Path:
+    # Tree merge: at most MERGE_FAN_IN runs are open at once; each level merges
+    # groups of runs into one until a single run is left.
+    level = 0
+    while len(paths) > 1:
+        merged: List[Path] = []
+        for i in range(0, len(paths), MERGE_FAN_IN):
+            group = paths[i:i + MERGE_FAN_IN]
+            if len(group) == 1:
+                merged.append(group[0])
+                continue
+            out = out_dir / f"merge_{level}_{i // MERGE_FAN_IN}.tsv"
+            with out.open("w", encoding="utf-8") as f:
+                for w, c in merge_pairs(read_run(p) for p in group):
+                    f.write(f"{w}\t{c}\n")
+            for p in group:
+                p.unlink()
+            merged.append(out)
+        paths = merged
+        level += 1
+    return paths[0]
+
+
+def read_range_text(fp: Path, start: int, end: int, block_size: int = READ_BLOCK) -> Iterator[str]:
+    # The lines that start in [start, end) (byte offsets, like Lab 1
+    # corpus_stats.stats_for_range), decoded about block_size bytes at a time.
+    # Every piece is whole lines, so no UTF-8 sequence or line is split.
+    with fp.open("rb") as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()  # finish the line that started before this range
+        pos = f.tell()
+        carry = b""
+        while pos < end:
+            block = f.read(min(block_size, end - pos))
+            if not block:
+                break
+            pos += len(block)
+            if pos >= end and not block.endswith(b"\n"):
+                block += f.readline()  # the line that crosses `end` is ours
+            data = carry + block
+            cut = data.rfind(b"\n") + 1
+            carry = data[cut:]
+            yield data[:cut].decode("utf-8", errors="ignore")
+        if carry:
+            yield carry.decode("utf-8", errors="ignore")
+
+
+def count_range(fp: Path, start: int, end: int, run_prefix: str, max_entries: int) -> List[Path]:
+    # Count the tokens of lines that start in [start, end) and return the
+    # sorted runs written.
+    runs: List[Path] = []
+    freq: Dict[str, int] = {}
+
+    def spill() -> None:
+        runs.append(write_run(freq, Path(f"{run_prefix}_{len(runs):04d}.tsv")))
+        freq.clear()
+
+    for text in read_range_text(fp, start, end):
+        for t in text.split():
+            if t in freq:
+                freq[t] += 1
+            else:
+                freq[t] = 1
+        if len(freq) > max_entries:
+            spill()
+    if freq or not runs:
+        spill()
+    return runs
+
+
+def count_parallel(
+    inp: Path, workers: int, max_mem_mb: int, spill_dir: Path, start: int = 0, end: int | None = None
+) -> Path:
+    # Returns one run file with the counts of lines starting in [start, end)
+    # (default: the whole input), sorted by word.
+    from multiprocessing import Pool
+
+    if end is None:
+        end = inp.stat().st_size
+    size = end - start
+    # more ranges than workers so a slow range doesn't hold up the rest
+    n_ranges = max(1, min(workers * 4, size // READ_BLOCK + 1))
+    edges = [start + size * i // n_ranges for i in range(n_ranges + 1)]
+    max_entries = max(1000, max_mem_mb * (1 << 20) // BYTES_PER_ENTRY)
+    jobs = [(inp, edges[i], edges[i + 1], str(spill_dir / f"run_{i:04d}"), max_entries) for i in range(n_ranges)]
+    if workers == 1:
+        runs = [count_range(*job) for job in jobs]
+    else:
+        with Pool(workers) as pool:
+            runs = pool.starmap(count_range, jobs)
+    return merge_runs([p for r in runs for p in r], spill_dir)
+
+
+# --- Frequency-table cache ---
+# The counts of a word file are kept next to it as a run file
+# (<input>.freqcache.tsv, word-sorted "word\tcount" lines) plus
+# <input>.freqcache.json with the input's size, mtime and a blake2b digest per
+# CACHE_HASH_BLOCK bytes of the part that was counted. The cache covers the file
+# up to its last newline; a trailing unterminated line is counted on every run.
+#   - size and mtime unchanged: only the last block is re-hashed, then the cache is used
+#   - file grew and the counted part still hashes the same: only the new lines are
+#     counted and merged into the cache
+#   - anything else: full recount
+CACHE_HASH_BLOCK = 1 << 26
+CACHE_VERSION = 1
+
+
+def cache_paths(inp: Path) -> Tuple[Path, Path]:
+    return inp.with_name(inp.name + ".freqcache.tsv"), inp.with_name(inp.name + ".freqcache.json")
+
+
+def hash_blocks(inp: Path, first_block: int, upto: int) -> List[str]:
+    # digests of blocks first_block.. of inp[:upto]; the last one may be partial
+    digests = []
+    with inp.open("rb") as f:
+        for block_start in range(first_block * CACHE_HASH_BLOCK, upto, CACHE_HASH_BLOCK):
+            f.seek(block_start)
+            h = hashlib.blake2b(digest_size=16)
+            left = min(CACHE_HASH_BLOCK, upto - block_start)
+            while left:
+                piece = f.read(min(READ_BLOCK, left))
+                if not piece:
+                    break
+                h.update(piece)
+                left -= len(piece)
+            digests.append(h.hexdigest())
+    return digests
+
+
+def last_newline_end(inp: Path, size: int) -> int:
+    # offset just past the last b"\n" (0 if there is none)
+    with inp.open("rb") as f:
+        pos = size
+        while pos > 0:
+            step = min(READ_BLOCK, pos)
+            f.seek(pos - step)
+            i = f.read(step).rfind(b"\n")
+            if i >= 0:
+                return pos - step + i + 1
+            pos -= step
+    return 0
+
+
+def load_cache_meta(inp: Path, st: os.stat_result) -> Dict | None:
+    # the cache metadata if the cached counts are still a prefix of inp
+    table_path, meta_path = cache_paths(inp)
+    if not (table_path.is_file() and meta_path.is_file()):
+        return None
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    except ValueError:
+        return None
+    upto = meta.get("counted_bytes", -1)
+    if meta.get("version") != CACHE_VERSION or meta.get("block_size") != CACHE_HASH_BLOCK or upto > st.st_size:
+        return None
+    hashes = meta["block_hashes"]
+    if st.st_size == meta["size"] and st.st_mtime_ns == meta["mtime_ns"]:
+        check_from = max(0, len(hashes) - 1)
+    else:
+        check_from = 0
+    if hash_blocks(inp, check_from, upto) != hashes[check_from:]:
+        return None
+    return meta
+
+
+def count_tail(inp: Path, start: int) -> Dict[str, int]:
+    with inp.open("rb") as f:
+        f.seek(start)
+        return count_frequencies(f.read().decode("utf-8", errors="ignore").split())
+
+
+def update_cache(
+    inp: Path, workers: int, max_mem_mb: int, work_dir: Path, table_path: Path | None = None
+) -> Tuple[Path, Dict[str, int]]:
+    # Bring the cached counts up to date; returns the table file and the counts
+    # of the unterminated last line, which are not cached.
+    # table_path=None uses the cache next to inp; otherwise the table is written
+    # there and nothing is cached.
+    st = inp.stat()
+    upto = last_newline_end(inp, st.st_size)
+    use_cache = table_path is None
+    meta = load_cache_meta(inp, st) if use_cache else None
+    if use_cache:
+        table_path, meta_path = cache_paths(inp)
+    if meta is None or meta["counted_bytes"] != upto:
+        old_upto = meta["counted_bytes"] if meta else 0
+        if meta:
+            print(f"Counting {upto - old_upto} appended bytes into the cached table")
+        elif use_cache:
+            print(f"No usable frequency cache; counting all of {inp.name}")
+        new_run = count_parallel(inp, max(1, workers), max_mem_mb, work_dir, old_upto, upto)
+        tmp = work_dir / "table.tsv"
+        if meta:
+            with tmp.open("w", encoding="utf-8") as f:
+                for w, c in merge_pairs([read_run(table_path), read_run(new_run)]):
+                    f.write(f"{w}\t{c}\n")
+        else:
+            shutil.move(str(new_run), str(tmp))
+        shutil.move(str(tmp), str(table_path))
+        if use_cache:
+            kept = meta["block_hashes"][:old_upto // CACHE_HASH_BLOCK] if meta else []
+            meta_path.write_text(json.dumps({
+                "version": CACHE_VERSION,
+                "input": inp.name,
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "counted_bytes": upto,
+                "block_size": CACHE_HASH_BLOCK,
+                "block_hashes": kept + hash_blocks(inp, len(kept), upto),
+            }, indent=2), encoding="utf-8")
+    elif (meta["size"], meta["mtime_ns"]) != (st.st_size, st.st_mtime_ns):
+        # only the unterminated tail changed; refresh the key
+        meta["size"], meta["mtime_ns"] = st.st_size, st.st_mtime_ns
+        meta_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    else:
+        print(f"Using cached frequency table: {table_path}")
+    return table_path, count_tail(inp, upto)
+
+
+def table_pairs(table_path: Path, tail: Dict[str, int]) -> Iterator[Tuple[str, int]]:
+    return merge_pairs([read_run(table_path), iter(sorted(tail.items()))])
+
+
+def select_from_pairs(pairs: Iterable[Tuple[str, int]], k: int, thresholds: Iterable[int]) -> Summary:
+    # total, vocab size, top_k() and the threshold sweep in one pass with
+    # k-sized heaps. Pairs arrive in word order, so among equal counts a later
+    # word ranks lower: the heap key (count, -position) keeps top_k()'s tie order.
+    thresholds = list(thresholds)
+    heaps: List[List[Tuple[int, int, str]]] = [[] for _ in range(len(thresholds) + 1)]
+    kept = [0] * len(thresholds)
+    limits = [None] + thresholds
+    total = vocab = 0
+    for pos, (w, c) in enumerate(pairs):
+        total += c
+        vocab += 1
+        item = (c, -pos, w)
+        for i, limit in enumerate(limits):
+            if limit is not None:
+                if c >= limit:
+                    continue
+                kept[i - 1] += 1
+            heap = heaps[i]
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+    def rows(heap: List[Tuple[int, int, str]]) -> List[Tuple[str, int]]:
+        return [(w, c) for c, _, w in sorted(heap, reverse=True)]
+
+    sweep = {t: (kept[i], rows(heaps[i + 1])) for i, t in enumerate(thresholds)}
+    return total, vocab, rows(heaps[0]), sweep
+
+
+# --- N-gram counting: hashed keys, binary spill runs, external merge ---
+# N-grams (n consecutive tokens of one line, i.e. one sentence of the Lab 1 word
+# file) are too many for a dict, so each is counted under a 64-bit key: every
+# word gets a blake2b hash and an n-gram's key is the polynomial
+# h1 * NGRAM_MULT**(n-1) + ... + hn (mod 2**64). Keys and counts live in NumPy
+# arrays; a worker folds its keys into a sorted (key, count) table and spills it
+# to a binary run (RUN_DTYPE records, sorted by key) whenever the table outgrows
+# --max-mem-mb. Runs are merged block by block, MERGE_FAN_IN at a time.
+# With a billion distinct n-grams the chance of any key collision is about 3%
+# (n**2 / 2**65), and a collision only merges two n-grams' counts.
+# Keys carry no text, so the top-N rows are picked on counts and their text is
+# recovered in a second pass over the corpus (see ngram_summary).
+NGRAM_MULT = 0x9E3779B97F4A7C15
+# text read per step; its token lists, not the key table, dominate a small budget
+NGRAM_READ_BLOCK = 1 << 20
+# stored record (16 bytes) plus the sort and merge temporaries, for --max-mem-mb
+BYTES_PER_NGRAM = 64
+NGRAM_NAMES = {2: "bigram", 3: "trigram"}
+if np is not None:
+    RUN_DTYPE = np.dtype([("key", "<u8"), ("count", "<i8")])
+
+
+def ngram_name(n: int) -> str:
+    return "word" if n == 1 else NGRAM_NAMES.get(n, f"{n}-gram")
+
+
+class WordHashes(dict):
+    # word -> 64-bit blake2b hash, computed on first use; stable across processes
+    def __missing__(self, word: str) -> int:
+        h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+        self[word] = h
+        return h
+
+
+def block_ngram_keys(text: str, n: int, hashes: WordHashes) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    # (tokens, keys, starts): the block's tokens in order, and the key of each
+    # n-gram that fits inside its line together with its first token's index
+    lines = [line.split() for line in text.split("\n")]
+    tokens = [t for line in lines for t in line]
+    lengths = np.fromiter(map(len, lines), dtype=np.int64, count=len(lines))
+    m = len(tokens) - n + 1
+    if m <= 0:
+        return tokens, np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+    h = np.fromiter(map(hashes.__getitem__, tokens), dtype=np.uint64, count=len(tokens))
+    keys = h[:m].copy()
+    mult = np.uint64(NGRAM_MULT)
+    for j in range(1, n):
+        keys *= mult
+        keys += h[j:m + j]
+    # token i fits an n-gram if at least n - 1 more tokens follow it on its line
+    line_ends = np.cumsum(lengths)
+    room = np.repeat(line_ends, lengths)[:m] - np.arange(m)
+    starts = np.flatnonzero(room >= n)
+    return tokens, keys[starts], starts
+
+
+def combine_counts(keys: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # sorted unique keys with the counts of equal keys summed
+    if not len(keys):
+        return keys, counts
+    order = np.argsort(keys, kind="stable")
+    keys, counts = keys[order], counts[order]
+    firsts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return keys[firsts], np.add.reduceat(counts, firsts)
+
+
+def write_key_run(keys: np.ndarray, counts: np.ndarray, path: Path, append: bool = False) -> Path:
+    records = np.empty(len(keys), dtype=RUN_DTYPE)
+    records["key"], records["count"] = keys, counts
+    with path.open("ab" if append else "wb") as f:
+        records.tofile(f)
+    return path
+
+
+def open_key_run(path: Path) -> np.ndarray:
+    if path.stat().st_size == 0:
+        return np.empty(0, dtype=RUN_DTYPE)
+    return np.memmap(path, dtype=RUN_DTYPE, mode="r")
+
+
+def count_ngram_range(fp: Path, start: int, end: int, n: int, run_prefix: str, max_entries: int) -> List[Path]:
+    # count_range for n-gram keys: the lines that start in [start, end) are
+    # hashed block by block; raw keys are buffered and folded into the sorted
+    # table, which is spilled once it holds more than max_entries // 2 keys.
+    runs: List[Path] = []
+    hashes = WordHashes()
+    table_keys = np.empty(0, dtype=np.uint64)
+    table_counts = np.empty(0, dtype=np.int64)
+    pending: List[np.ndarray] = []
+    buffered = 0
+
+    def fold() -> None:
+        nonlocal table_keys, table_counts, buffered
+        if not pending:
+            return
+        keys, counts = np.unique(np.concatenate(pending), return_counts=True)
+        pending.clear()
+        buffered = 0
+        table_keys, table_counts = combine_counts(
+            np.concatenate((table_keys, keys)), np.concatenate((table_counts, counts.astype(np.int64)))
+        )
+
+    def spill() -> None:
+        nonlocal table_keys, table_counts
+        runs.append(write_key_run(table_keys, table_counts, Path(f"{run_prefix}_{len(runs):04d}.keys")))
+        table_keys = np.empty(0, dtype=np.uint64)
+        table_counts = np.empty(0, dtype=np.int64)
+
+    for text in read_range_text(fp, start, end, NGRAM_READ_BLOCK):
+        _, keys, _ = block_ngram_keys(text, n, hashes)
+        pending.append(keys)
+        buffered += len(keys)
+        if buffered >= max_entries // 2:
+            fold()
+            if len(table_keys) > max_entries // 2:
+                spill()
+        if len(hashes) > max_entries // 4:
+            hashes.clear()  # the word cache is only a speed-up; keep it bounded too
+    fold()
+    if len(table_keys) or not runs:
+        spill()
+    return runs
+
+
+def merge_key_group(group: List[Path], out: Path, block: int) -> Path:
+    # Each step reads up to `block` records of every run, writes out all keys up
+    # to the smallest last key read from a run that is not finished (no run can
+    # still hold a smaller one) and advances each run past what was written.
+    runs = [open_key_run(p) for p in group]
+    pos = [0] * len(runs)
+    out.write_bytes(b"")
+    while any(p < len(r) for p, r in zip(pos, runs)):
+        windows = [r[p:p + block] for p, r in zip(pos, runs)]
+        bound = min(
+            (int(w["key"][-1]) for p, r, w in zip(pos, runs, windows) if p + len(w) < len(r)),
+            default=None,
+        )
+        taken = []
+        for j, w in enumerate(windows):
+            cut = len(w) if bound is None else int(np.searchsorted(w["key"], np.uint64(bound), side="right"))
+            taken.append(w[:cut])
+            pos[j] += cut
+        records = np.concatenate(taken)
+        write_key_run(*combine_counts(records["key"], records["count"]), out, append=True)
+    return out
+
+
+def merge_key_runs(paths: List[Path], out_dir: Path, block: int) -> Path:
+    # merge_runs for binary key runs
+    level = 0
+    while len(paths) > 1:
+        merged: List[Path] = []
+        for i in range(0, len(paths), MERGE_FAN_IN):
+            group = paths[i:i + MERGE_FAN_IN]
+            if len(group) == 1:
+                merged.append(group[0])
+                continue
+            merged.append(merge_key_group(group, out_dir / f"merge_{level}_{i // MERGE_FAN_IN}.keys", block))
+            for p in group:
+                p.unlink()
+        paths = merged
+        level += 1
+    return paths[0]
+
+
+def count_ngrams_parallel(inp: Path, n: int, workers: int, max_mem_mb: int, spill_dir: Path) -> Path:
+    # count_parallel for n-grams: one merged key run for the whole input
+    from multiprocessing import Pool
+
+    size = inp.stat().st_size
+    n_ranges = max(1, min(workers * 4, size // READ_BLOCK + 1))
+    edges = [size * i // n_ranges for i in range(n_ranges + 1)]
+    max_entries = max(1 << 16, max_mem_mb * (1 << 20) // BYTES_PER_NGRAM)
+    jobs = [(inp, edges[i], edges[i + 1], n, str(spill_dir / f"run_{i:04d}"), max_entries) for i in range(n_ranges)]
+    if workers == 1:
+        runs = [count_ngram_range(*job) for job in jobs]
+    else:
+        with Pool(workers) as pool:
+            runs = pool.starmap(count_ngram_range, jobs)
+    return merge_key_runs([p for r in runs for p in r], spill_dir, max(4096, max_entries // MERGE_FAN_IN))
+
+
+def key_cutoffs(run: np.ndarray, k: int, thresholds: List[int], block: int):
+    # One pass over the merged run: total, distinct keys, kept keys per threshold
+    # and, for the overall top-N and each threshold, the count of the N-th row
+    # (None if nothing qualifies). Only the k largest counts per list are held.
+    limits = [None] + thresholds
+    best = [np.empty(0, dtype=np.int64) for _ in limits]
+    kept = [0] * len(thresholds)
+    total = 0
+    for i in range(0, len(run), block):
+        counts = np.asarray(run["count"][i:i + block])
+        total += int(counts.sum())
+        for j, limit in enumerate(limits):
+            eligible = counts if limit is None else counts[counts < limit]
+            if limit is not None:
+                kept[j - 1] += len(eligible)
+            top = np.concatenate((best[j], eligible))
+            if len(top) > k:
+                top = np.partition(top, len(top) - k)[len(top) - k:]
+            best[j] = top
+    cutoffs = [int(b.min()) if len(b) else None for b in best]
+    return total, len(run), kept, cutoffs
+
+
+def split_at_cutoffs(run: np.ndarray, limits: List, cutoffs: List, block: int):
+    # per list: (keys and counts above its cutoff and below its limit, keys
+    # equal to the cutoff), keys sorted
+    above = [([], []) for _ in cutoffs]
+    tied: List[List[np.ndarray]] = [[] for _ in cutoffs]
+    for i in range(0, len(run), block):
+        records = np.asarray(run[i:i + block])
+        for j, (limit, c) in enumerate(zip(limits, cutoffs)):
+            if c is None:
+                continue
+            counts = records["count"]
+            sel = records[(counts > c) & (counts < limit)] if limit is not None else records[counts > c]
+            above[j][0].append(sel["key"])
+            above[j][1].append(sel["count"])
+            tied[j].append(records["key"][counts == c])
+
+    def cat(parts, dtype):
+        return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+    return (
+        [(cat(ks, np.uint64), cat(cs, np.int64)) for ks, cs in above],
+        [cat(ts, np.uint64) for ts in tied],
+    )
+
+
+def members(keys: np.ndarray, sorted_keys: np.ndarray) -> np.ndarray:
+    # mask of keys that occur in sorted_keys
+    if not len(sorted_keys):
+        return np.zeros(len(keys), dtype=bool)
+    idx = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return sorted_keys[idx] == keys
+
+
+def ngram_texts(inp: Path, n: int, above_keys: np.ndarray, tied: List[Tuple[np.ndarray, int]]):
+    # Second pass over the corpus. Returns the text of every key in above_keys
+    # and, for each (tied keys, m), the m lexicographically smallest texts among
+    # the tied keys, which is how top_k() breaks ties. Each distinct key is
+    # looked up once per block, never once per occurrence.
+    texts: Dict[int, str] = {}
+    smallest: List[List[Tuple[str, int]]] = [[] for _ in tied]
+    hashes = WordHashes()
+    for text in read_range_text(inp, 0, inp.stat().st_size, NGRAM_READ_BLOCK):
+        tokens, keys, starts = block_ngram_keys(text, n, hashes)
+        hits = members(keys, above_keys)
+        if hits.any():
+            found, first = np.unique(keys[hits], return_index=True)
+            for key, i in zip(found.tolist(), starts[hits][first].tolist()):
+                if key not in texts:
+                    texts[key] = " ".join(tokens[i:i + n])
+        for (tied_keys, m), best in zip(tied, smallest):
+            hits = members(keys, tied_keys)
+            if not m or not hits.any():
+                continue
+            found, first = np.unique(keys[hits], return_index=True)
+            chosen = {key for _, key in best}
+            for key, i in zip(found.tolist(), starts[hits][first].tolist()):
+                if key in chosen:
+                    continue
+                t = " ".join(tokens[i:i + n])
+                if len(best) < m or t < best[-1][0]:
+                    bisect.insort(best, (t, key))
+                    chosen.add(key)
+                    if len(best) > m:
+                        chosen.discard(best.pop()[1])
+        if len(hashes) > 1 << 20:
+            hashes.clear()
+    return texts, smallest
+
+
+def ngram_summary(inp: Path, run_path: Path, n: int, k: int, thresholds: Iterable[int], block: int) -> Summary:
+    # select_from_pairs for a merged key run: totals and cutoffs from the run,
+    # the rows above each cutoff plus the tie-broken rows at it, then the texts
+    # from the corpus. Rows are ordered like top_k(): count desc, then text.
+    thresholds = list(thresholds)
+    run = open_key_run(run_path)
+    total, vocab, kept, cutoffs = key_cutoffs(run, k, thresholds, block)
+    above, tied = split_at_cutoffs(run, [None] + thresholds, cutoffs, block)
+    above_keys = np.unique(np.concatenate([ks for ks, _ in above]))
+    texts, smallest = ngram_texts(inp, n, above_keys, [(t, k - len(a[0])) for t, a in zip(tied, above)])
+    del run
+
+    def rows(j: int) -> List[Tuple[str, int]]:
+        keys, counts = above[j]
+        out = sorted(((texts[key], c) for key, c in zip(keys.tolist(), counts.tolist())), key=lambda r: (-r[1], r[0]))
+        return out + [(t, cutoffs[j]) for t, _ in smallest[j]]
+
+    sweep = {t: (kept[i], rows(i + 1)) for i, t in enumerate(thresholds)}
+    return total, vocab, rows(0), sweep
+
+
+def summarize_ngrams(inp: Path, args: argparse.Namespace, top_n: int) -> Summary:
+    work_dir = Path(tempfile.mkdtemp(prefix="ngram_runs_", dir=args.spill_dir))
+    try:
+        run_path = count_ngrams_parallel(inp, args.ngram, max(1, args.workers), args.max_mem_mb, work_dir)
+        block = max(4096, args.max_mem_mb * (1 << 20) // BYTES_PER_NGRAM)
+        return ngram_summary(inp, run_path, args.ngram, top_n, args.thresholds, block)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# --- Approximate top-N in fixed memory ---
+# Both structures only ever overestimate, so the smaller of the two is an upper
+# bound on the true count; SpaceSaving also records how much of a word's count
+# may belong to the words it evicted, which gives the lower bound.
+
+
+class CountMinSketch:
+    # depth rows of `width` counters (width rounded up to a power of two). An
+    # estimate exceeds the true count by at most e/width * N with probability
+    # 1 - e**-depth. Rows are indexed by multiply-shift hashing of hash(word),
+    # which is fine within one process (hash() is salted per process).
+
+    def __init__(self, width: int = 1 << 20, depth: int = 4, seed: int = 0) -> None:
+        self.bits = max(1, (width - 1).bit_length())
+        self.width = 1 << self.bits
+        self.depth = depth
+        rng = random.Random(seed)
+        self.multipliers = [rng.getrandbits(64) | 1 for _ in range(depth)]
+        self.rows = [array("q", bytes(8 * self.width)) for _ in range(depth)]
+        self.total = 0
+
+    def _indexes(self, word: str) -> Iterator[int]:
+        h = hash(word) & 0xFFFFFFFFFFFFFFFF
+        shift = 64 - self.bits
+        for a in self.multipliers:
+            yield ((h * a) & 0xFFFFFFFFFFFFFFFF) >> shift
+
+    def update(self, freq: Dict[str, int]) -> None:
+        rows = self.rows
+        for w, c in freq.items():
+            for row, i in zip(rows, self._indexes(w)):
+                row[i] += c
+            self.total += c
+
+    def estimate(self, word: str) -> int:
+        return min(row[i] for row, i in zip(self.rows, self._indexes(word)))
+
+    @property
+    def epsilon(self) -> float:
+        return math.e / self.width
+
+    @property
+    def delta(self) -> float:
+        return math.exp(-self.depth)
+
+
+class SpaceSaving:
+    # At most `capacity` monitored words, each with (count, error): the true count
+    # is in [count - error, count], and every word occurring more than
+    # N / capacity times is guaranteed to be monitored. Weighted updates, so a
+    # whole batch of counts can be applied at once. The minimum is found through
+    # a heap with stale entries, rebuilt when it grows past 4 * capacity.
+
+    def __init__(self, capacity: int = 10000) -> None:
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self._heap: List[Tuple[int, str]] = []
+
+    def _pop_min(self) -> Tuple[str, int]:
+        heap, counts = self._heap, self.counts
+        while True:
+            c, w = heapq.heappop(heap)
+            if counts.get(w) == c:
+                return w, c
+
+    def update(self, freq: Dict[str, int]) -> None:
+        counts, errors, heap = self.counts, self.errors, self._heap
+        for w, c in freq.items():
+            if w in counts:
+                counts[w] += c
+            elif len(counts) < self.capacity:
+                counts[w] = c
+                errors[w] = 0
+            else:
+                old, floor = self._pop_min()
+                del counts[old], errors[old]
+                counts[w] = floor + c
+                errors[w] = floor
+            heapq.heappush(heap, (counts[w], w))
+            if len(heap) > 4 * self.capacity:
+                self._heap = heap = [(c2, w2) for w2, c2 in counts.items()]
+                heapq.heapify(heap)
+
+
+def approx_top_k(
+    tokens: Iterable[str], k: int, width: int, depth: int, capacity: int, batch: int = 1 << 20
+) -> Tuple[CountMinSketch, List[Tuple[str, int]], List[int]]:
+    # Tokens are counted exactly in batches of `batch` tokens (bounded dict),
+    # then each batch is folded into the sketch and the heavy-hitter table.
+    cms = CountMinSketch(width, depth)
+    hh = SpaceSaving(capacity)
+    it = iter(tokens)
+    while True:
+        freq = count_frequencies(islice(it, batch))
+        if not freq:
+            break
+        cms.update(freq)
+        hh.update(freq)
+    bounded = []
+    for w, c in hh.counts.items():
+        upper = min(c, cms.estimate(w))
+        bounded.append((w, upper, upper - min(upper, c - hh.errors[w])))
+    bounded.sort(key=lambda r: (-r[1], r[0]))
+    return cms, [(w, c) for w, c, _ in bounded[:k]], [e for _, _, e in bounded[:k]]
+
+
+def run_approx(inp: Path, args: argparse.Namespace) -> None:
+    cms, rows, errors = approx_top_k(
+        read_tokens(inp), args.top_n, args.sketch_width, args.sketch_depth, args.heavy_hitters
+    )
+    n = cms.total
+    print(f"Total tokens: {n}; Vocabulary size: not counted in --approx mode")
+    print(
+        f"Count-Min Sketch {cms.depth} x {cms.width}: overestimate <= {cms.epsilon * n:.0f} "
+        f"with probability {1 - cms.delta:.4f}; SpaceSaving({args.heavy_hitters}) monitors "
+        f"every word with count > {n // args.heavy_hitters}"
+    )
+    csv_path = Path(__file__).with_name("freq_top100.csv")
+    img_path = Path(__file__).with_name("freq_top100.png")
+    write_csv(rows, csv_path, errors)
+    print(f"Wrote {csv_path}")
+    plotted = plot_bar(rows, f"Top {len(rows)} words (overall, approximate)", img_path)
+    print(f"Wrote {img_path}" if plotted else "matplotlib not available; plot skipped")
+    print("Stopword thresholds need exact counts of rare words; skipped in --approx mode")
+
+
+def summarize(table: FrequencyTable | Dict[str, int], top_n: int, thresholds: Iterable[int]) -> Summary:
+    if isinstance(table, FrequencyTable):
+        return table.total_tokens, len(table), table.top_k(top_n), table.sweep(thresholds, top_n)
+    # numpy not available: original dict path, one pruned dict per threshold
+    freq = table
+    sweep = {}
+    for T in thresholds:
+        pruned = remove_stopwords_by_threshold(freq, T)
+        sweep[T] = (len(pruned), top_k(pruned, top_n))
+    return sum(freq.values()), len(freq), top_k(freq, top_n), sweep
+
+
+def summarize_counted(inp: Path, args: argparse.Namespace, top_n: int) -> Tuple[FrequencyTable | None, Summary]:
+    # Counting through run files: parallel workers and/or the on-disk cache.
+    work_dir = Path(tempfile.mkdtemp(prefix="freq_runs_", dir=args.spill_dir))
+    try:
+        table_path, tail = update_cache(
+            inp, args.workers, args.max_mem_mb, work_dir, work_dir / "counts.tsv" if args.no_cache else None
+        )
+        if np is not None and (not args.workers or args.interactive):
+            table = FrequencyTable.from_pairs(table_pairs(table_path, tail))
+            summary = summarize(table, top_n, args.thresholds)
+        else:
+            # the vocabulary is never held in memory
+            table = None
+            summary = select_from_pairs(table_pairs(table_path, tail), top_n, args.thresholds)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return table, summary
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Frequency distribution and stopword-threshold plots")
+    ap.add_argument("--thresholds", type=int, nargs="+", default=DEFAULT_THRESHOLDS)
+    ap.add_argument("--top-n", type=int, default=TOP_N)
+    ap.add_argument("--interactive", action="store_true",
+                    help="after writing the outputs, keep asking for thresholds to inspect")
+    ap.add_argument("--workers", type=int, default=0,
+                    help="count byte ranges of the input in N processes (0 = single-process path)")
+    ap.add_argument("--max-mem-mb", type=int, default=1024,
+                    help="per-worker budget for partial counts before they are spilled to disk")
+    ap.add_argument("--spill-dir", type=Path, default=None,
+                    help="where spill runs go (default: a temporary directory)")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="neither read nor write the <input>.freqcache.* frequency table")
+    ap.add_argument("--ngram", type=int, default=1,
+                    help="count n-grams of N tokens within a line (2 = bigrams, 3 = trigrams); needs numpy")
+    ap.add_argument("--approx", action="store_true",
+                    help="fixed-memory approximate top-N with error bounds (no threshold outputs)")
+    ap.add_argument("--sketch-width", type=int, default=1 << 20)
+    ap.add_argument("--sketch-depth", type=int, default=4)
+    ap.add_argument("--heavy-hitters", type=int, default=10000,
+                    help="words tracked by SpaceSaving in --approx mode")
+    return ap.parse_args(argv)
+
+
+def write_outputs(rows: List[Tuple[str, int]], title: str, stem: str, label: str = "word") -> Tuple[Path, Path, bool]:
+    csv_path = Path(__file__).with_name(f"{stem}.csv")
+    img_path = Path(__file__).with_name(f"{stem}.png")
+    write_csv(rows, csv_path, label=label)
+    return csv_path, img_path, plot_bar(rows, title, img_path, f"{label.capitalize()}s")
+
+
+def interactive_sweep(table: FrequencyTable, top_n: int) -> None:
+    print("Enter thresholds separated by spaces (empty line or 'quit' to exit)")
+    while True:
+        line = input("\nThresholds: ").strip()
+        if not line or line.lower() == "quit":
+            break
+        try:
+            thresholds = [int(t) for t in line.split()]
+        except ValueError:
+            print("Thresholds must be integers")
+            continue
+        for T, (kept, rows) in table.sweep(thresholds, top_n).items():
+            preview = ", ".join(f"{w}:{c}" for w, c in rows[:10])
+            print(f"T={T}: kept {kept} words; top: {preview}")
+
+
+def main(argv: List[str] | None = None) -> None:
+    args = parse_args(argv)
+    top_n = args.top_n
     inp = find_input_file()
     if not inp:
         print(
@@ -108,31 +1112,49 @@ def main() -> None:
         return
 
     print(f"Reading tokens from: {inp}")
-    freq = count_frequencies(read_tokens(inp))
-    total_tokens = sum(freq.values())
-    vocab_size = len(freq)
-    print(f"Total tokens: {total_tokens}; Vocabulary size: {vocab_size}")
+    if args.ngram > 1:
+        if args.approx or np is None:
+            print("--ngram needs numpy (pip install numpy) and exact counts (no --approx)")
+            return
+        table = None
+        total_tokens, vocab_size, top_rows, sweep = summarize_ngrams(inp, args, top_n)
+    elif args.approx:
+        run_approx(inp, args)
+        return
+    else:
+        ids_prefix = None if args.workers else token_ids_prefix_for(inp)
+        if args.workers or not (args.no_cache or ids_prefix):
+            table, (total_tokens, vocab_size, top_rows, sweep) = summarize_counted(inp, args, top_n)
+        else:
+            table = build_table(inp, ids_prefix)
+            total_tokens, vocab_size, top_rows, sweep = summarize(table, top_n, args.thresholds)
+    unit = ngram_name(args.ngram)
+    if args.ngram > 1:
+        print(f"Total {unit}s: {total_tokens}; distinct {unit}s: {vocab_size}")
+        prefix, removed = f"freq_{unit}_", f"frequent {unit}s"
+    else:
+        print(f"Total tokens: {total_tokens}; Vocabulary size: {vocab_size}")
+        prefix, removed = "freq_", "stopwords"
 
     # Top-N overall
-    top_rows = top_k(freq, TOP_N)
-    csv_path = Path(__file__).with_name("freq_top100.csv")
-    img_path = Path(__file__).with_name("freq_top100.png")
-    write_csv(top_rows, csv_path)
-    plotted = plot_bar(top_rows, f"Top {len(top_rows)} words (overall)", img_path)
+    csv_path, img_path, plotted = write_outputs(
+        top_rows, f"Top {len(top_rows)} {unit}s (overall)", f"{prefix}top100", unit
+    )
     print(f"Wrote {csv_path}")
     print(f"Wrote {img_path}" if plotted else "matplotlib not available; plot skipped")
 
     # Thresholded stopword removal and plots
-    for T in DEFAULT_THRESHOLDS:
-        pruned = remove_stopwords_by_threshold(freq, T)
-        top_rows_T = top_k(pruned, TOP_N)
-        csv_T = Path(__file__).with_name(f"freq_after_stop_{T}_top100.csv")
-        img_T = Path(__file__).with_name(f"freq_after_stop_{T}_top100.png")
-        write_csv(top_rows_T, csv_T)
-        plotted_T = plot_bar(top_rows_T, f"Top {len(top_rows_T)} after removing stopwords (freq >= {T})", img_T)
-        print(f"Threshold {T}: kept {len(pruned)} words; wrote {csv_T}")
+    for T, (kept, top_rows_T) in sweep.items():
+        csv_T, img_T, plotted_T = write_outputs(
+            top_rows_T, f"Top {len(top_rows_T)} after removing {removed} (freq >= {T})",
+            f"{prefix}after_stop_{T}_top100", unit
+        )
+        print(f"Threshold {T}: kept {kept} {unit}s; wrote {csv_T}")
         print(f"Threshold {T}: wrote {img_T}" if plotted_T else f"Threshold {T}: matplotlib not available; plot skipped")
 
+    if args.interactive and isinstance(table, FrequencyTable):
+        interactive_sweep(table, top_n)
+
 
 if __name__ == "__main__":
     main()
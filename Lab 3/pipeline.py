@@ -0,0 +1,280 @@
+"""
+One-pass corpus pipeline: raw text -> sentences -> words -> metrics -> frequencies.
+
+The separate scripts read the corpus (and their own outputs) several times:
+Lab 1 sentence_tokenizer_Regex.py and word_tokenizer_Regex.py each read the raw
+text, their metrics re-read the sentence and word files, and freq_distribution.py
+re-reads the word file. Here the raw text is read once. ChunkedTextGenerator
+(sentence_safe=True) cuts it at safe sentence boundaries, and every chunk is
+segmented, word-tokenized, measured and counted before the next one is read.
+
+The sentence and word files are intermediates and are only written when asked
+for (--sentences / --words). Their contents, the metrics and the frequency CSVs
+are the same as running the separate scripts on the same input. The only
+exception is MATTR with --workers > 1, where windows across chunk edges are not
+counted (see CorpusStats.merge).
+
+With --workers N the chunks are segmented, tokenized, measured and counted in N
+processes, and the parent merges the results in order. Word counts are spilled
+to sorted run files past --max-mem-mb and merged like freq_distribution
+--workers, so the vocabulary never has to fit in one dict.
+
+Outputs (in --out-dir):
+  <input stem>_sentences_metrics.txt, <input stem>_words_metrics.txt
+  freq_top100.csv/.png, freq_after_stop_T_top100.csv/.png for each threshold T
+
+Usage: python pipeline.py INPUT [--out-dir DIR] [--sentences FILE] [--words FILE]
+                          [--freq-table FILE] [--workers N] [--exact]
+                          [--thresholds 5 10 20 ...] [--top-n 100] [--max-mem-mb MB]
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, List, NamedTuple, TextIO, Tuple
+
+from freq_distribution import (
+    BYTES_PER_ENTRY,
+    DEFAULT_THRESHOLDS,
+    TOP_N,
+    Summary,
+    add_lab1_to_path,
+    merge_runs,
+    plot_bar,
+    read_run,
+    select_from_pairs,
+    write_csv,
+    write_run,
+)
+
+add_lab1_to_path()
+
+from corpus_stats import CorpusStats, add_line  # noqa: E402
+from sentence_tokenizer_Regex import ChunkedTextGenerator, segment_chunk  # noqa: E402
+from word_tokenizer_Regex import iter_text_tokens, write_tokens  # noqa: E402
+
+
+def tokenize_chunk(index: int, chunk: str) -> str:
+    # Word-file text for one chunk. Chunk edges are after a sentence end's
+    # whitespace, where no token can continue, so this is the chunk's slice of
+    # what process_in_chunks writes; only the first chunk may match ^ at its start.
+    out = io.StringIO()
+    write_tokens(iter_text_tokens([chunk], at_file_start=index == 0), out)
+    return out.getvalue()
+
+
+def count_tokens(text: str, freq: Dict[str, int]) -> None:
+    # same tokens as freq_distribution.read_tokens: whitespace-separated
+    for t in text.split():
+        if t in freq:
+            freq[t] += 1
+        else:
+            freq[t] = 1
+
+
+class ChunkResult(NamedTuple):
+    sentences_text: str
+    words_text: str
+    sentence_stats: CorpusStats
+    # words_text = head + complete lines + tail; head finishes the word-file line
+    # left open by the previous chunk and tail is left open for the next one.
+    # tail is None when words_text has no newline at all (head is everything).
+    head: str
+    word_stats: CorpusStats
+    tail: str | None
+    freq: Dict[str, int]
+
+
+def process_chunk(job: Tuple[int, str, Dict]) -> ChunkResult:
+    # Worker side of --workers: everything that only needs the chunk itself
+    index, chunk, stats_options = job
+    sentences_text = segment_chunk(chunk)
+    words_text = tokenize_chunk(index, chunk)
+    sentence_stats = CorpusStats(**stats_options)
+    for line in sentences_text.split("\n"):
+        add_line(sentence_stats, line, "sentence")
+    word_stats = CorpusStats(**stats_options)
+    first = words_text.find("\n")
+    if first == -1:
+        head, tail = words_text, None
+    else:
+        last = words_text.rfind("\n")
+        head, tail = words_text[:first], words_text[last + 1:]
+        for line in words_text[first + 1:last].split("\n") if last > first else ():
+            add_line(word_stats, line, "words")
+    freq: Dict[str, int] = {}
+    count_tokens(words_text, freq)
+    return ChunkResult(sentences_text, words_text, sentence_stats, head, word_stats, tail, freq)
+
+
+class Pipeline:
+    # The parent's side: output files, the running metrics and the word counts
+
+    def __init__(
+        self,
+        run_dir: Path,
+        sentences_out: TextIO | None = None,
+        words_out: TextIO | None = None,
+        exact: bool = False,
+        max_mem_mb: int = 1024,
+    ) -> None:
+        self.run_dir = run_dir
+        self.sentences_out = sentences_out
+        self.words_out = words_out
+        self.stats_options = {"exact": exact}
+        self.sentence_stats = CorpusStats(**self.stats_options)
+        self.word_stats = CorpusStats(**self.stats_options)
+        self.max_entries = max(1, max_mem_mb * (1 << 20) // BYTES_PER_ENTRY)
+        self.freq: Dict[str, int] = {}
+        self.runs: List[Path] = []
+        self.pending = ""  # word-file line still open at the end of the last chunk
+
+    def _write(self, sentences_text: str, words_text: str) -> None:
+        if self.sentences_out is not None:
+            self.sentences_out.write(sentences_text)
+        if self.words_out is not None:
+            self.words_out.write(words_text)
+
+    def _maybe_spill(self) -> None:
+        if len(self.freq) > self.max_entries:
+            self.runs.append(write_run(self.freq, self.run_dir / f"run_{len(self.runs):04d}.tsv"))
+            self.freq = {}
+
+    def add_chunk(self, index: int, chunk: str) -> None:
+        # Serial path: same order of additions as the separate scripts, so every
+        # metric (MATTR included) is exactly what they give
+        sentences_text = segment_chunk(chunk)
+        words_text = tokenize_chunk(index, chunk)
+        self._write(sentences_text, words_text)
+        for line in sentences_text.split("\n"):
+            add_line(self.sentence_stats, line, "sentence")
+        lines = (self.pending + words_text).split("\n")
+        self.pending = lines.pop()
+        for line in lines:
+            add_line(self.word_stats, line, "words")
+        count_tokens(words_text, self.freq)
+        self._maybe_spill()
+
+    def add_result(self, result: ChunkResult) -> None:
+        self._write(result.sentences_text, result.words_text)
+        self.sentence_stats.merge(result.sentence_stats)
+        if result.tail is None:
+            self.pending += result.head
+        else:
+            add_line(self.word_stats, self.pending + result.head, "words")
+            self.word_stats.merge(result.word_stats)
+            self.pending = result.tail
+        freq = self.freq
+        for w, c in result.freq.items():
+            if w in freq:
+                freq[w] += c
+            else:
+                freq[w] = c
+        self._maybe_spill()
+
+    def finish(self, top_n: int, thresholds: List[int], freq_table: Path | None = None) -> Summary:
+        if self.pending:
+            add_line(self.word_stats, self.pending, "words")
+            self.pending = ""
+        if not self.runs and freq_table is None:
+            return select_from_pairs(sorted(self.freq.items()), top_n, thresholds)
+        self.runs.append(write_run(self.freq, self.run_dir / f"run_{len(self.runs):04d}.tsv"))
+        self.freq = {}
+        merged = merge_runs(self.runs, self.run_dir)
+        self.runs = []
+        if freq_table is not None:
+            shutil.move(str(merged), str(freq_table))
+            merged = freq_table
+        return select_from_pairs(read_run(merged), top_n, thresholds)
+
+
+def run_pipeline(
+    input_file: Path,
+    sentences_file: Path | None = None,
+    words_file: Path | None = None,
+    freq_table: Path | None = None,
+    workers: int = 1,
+    char_limit: int = 5000000,
+    exact: bool = False,
+    top_n: int = TOP_N,
+    thresholds: List[int] = DEFAULT_THRESHOLDS,
+    max_mem_mb: int = 1024,
+    spill_dir: Path | None = None,
+) -> Tuple[CorpusStats, CorpusStats, Summary]:
+    # Returns (sentence stats, word stats, frequency summary)
+    run_dir = Path(tempfile.mkdtemp(prefix="pipeline_runs_", dir=spill_dir))
+    sentences_out = open(sentences_file, "w", encoding="utf-8") if sentences_file else None
+    words_out = open(words_file, "w", encoding="utf-8") if words_file else None
+    try:
+        pipe = Pipeline(run_dir, sentences_out, words_out, exact, max_mem_mb)
+        chunks = ChunkedTextGenerator(str(input_file), char_limit=char_limit, sentence_safe=True)
+        if workers == 1:
+            for index, chunk in enumerate(chunks):
+                pipe.add_chunk(index, chunk)
+        else:
+            from multiprocessing import Pool
+
+            jobs = ((index, chunk, pipe.stats_options) for index, chunk in enumerate(chunks))
+            with Pool(workers) as pool:
+                for result in pool.imap(process_chunk, jobs):
+                    pipe.add_result(result)
+        summary = pipe.finish(top_n, thresholds, freq_table)
+    finally:
+        for f in (sentences_out, words_out):
+            if f is not None:
+                f.close()
+        shutil.rmtree(run_dir, ignore_errors=True)
+    return pipe.sentence_stats, pipe.word_stats, summary
+
+
+def write_freq_outputs(summary: Summary, out_dir: Path) -> None:
+    # Same files and titles as freq_distribution.main
+    total_tokens, vocab_size, top_rows, sweep = summary
+    print(f"Total tokens: {total_tokens}; Vocabulary size: {vocab_size}")
+    csv_path = out_dir / "freq_top100.csv"
+    write_csv(top_rows, csv_path)
+    plotted = plot_bar(top_rows, f"Top {len(top_rows)} words (overall)", out_dir / "freq_top100.png")
+    print(f"Wrote {csv_path}" + ("" if plotted else " (matplotlib not available; plot skipped)"))
+    for T, (kept, rows) in sweep.items():
+        csv_T = out_dir / f"freq_after_stop_{T}_top100.csv"
+        write_csv(rows, csv_T)
+        plot_bar(rows, f"Top {len(rows)} after removing stopwords (freq >= {T})",
+                 out_dir / f"freq_after_stop_{T}_top100.png")
+        print(f"Threshold {T}: kept {kept} words; wrote {csv_T}")
+
+
+def main(argv: List[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Sentences, words, metrics and frequencies in one pass over the corpus")
+    ap.add_argument("input", type=Path, help="raw text (or .parquet, one row per line)")
+    ap.add_argument("--out-dir", type=Path, default=Path("."), help="where the metrics and frequency files go")
+    ap.add_argument("--sentences", type=Path, help="also write the sentence file (like segment_file_parallel)")
+    ap.add_argument("--words", type=Path, help="also write the word file (like process_in_chunks)")
+    ap.add_argument("--freq-table", type=Path, help="also write the word\\tcount table (sorted by word)")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--char-limit", type=int, default=5000000, help="characters per chunk")
+    ap.add_argument("--exact", action="store_true", help="exact distinct-word counts instead of HyperLogLog")
+    ap.add_argument("--thresholds", type=int, nargs="+", default=DEFAULT_THRESHOLDS)
+    ap.add_argument("--top-n", type=int, default=TOP_N)
+    ap.add_argument("--max-mem-mb", type=int, default=1024,
+                    help="budget for the word counts before they are spilled to disk")
+    ap.add_argument("--spill-dir", type=Path, default=None)
+    args = ap.parse_args(argv)
+
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    sentence_stats, word_stats, summary = run_pipeline(
+        args.input, args.sentences, args.words, args.freq_table, args.workers, args.char_limit,
+        args.exact, args.top_n, args.thresholds, args.max_mem_mb, args.spill_dir,
+    )
+    stem = args.input.stem
+    sentence_stats.write_metrics(str(args.out_dir / f"{stem}_sentences_metrics.txt"))
+    word_stats.write_metrics(str(args.out_dir / f"{stem}_words_metrics.txt"), approx_sentences=True)
+    print(f"Wrote {stem}_sentences_metrics.txt and {stem}_words_metrics.txt in {args.out_dir}")
+    write_freq_outputs(summary, args.out_dir)
+
+
+if __name__ == "__main__":
+    main()
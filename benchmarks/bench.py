@@ -0,0 +1,328 @@
+"""
+Benchmarks for the hot paths of the labs, on a synthetic corpus (synth_corpus.py).
+
+Stages:
+  sentence_tokenizer      Lab 1 gujarati_sentence_tokenizer on the whole text
+  chunked_text_generator  Lab 1 ChunkedTextGenerator(sentence_safe=True) over the file
+  sentence_dedup          Lab 1 dedup_file_parallel (exact + near duplicates), one worker
+  word_tokenizer          Lab 1 gujarati_word_tokenizer on the whole text
+  process_in_chunks       Lab 1 streaming word tokenization, file to file
+  process_file_bytes      Lab 1 bytes-mode word tokenization over an mmap, file to file
+  analyze_word            Lab 2 NounMorphologyFST.analyze_word on the English tokens
+  count_frequencies       Lab 3 count_frequencies(read_tokens(...)) + top_k(100)
+
+Each stage runs in its own Python process, so its peak RSS (ru_maxrss) is its
+own. Results (wall time, tokens/s, sentences/s, MB/s, peak RSS) are printed and
+saved as a JSON baseline; --compare reports the change against an older one and
+exits with status 1 if any stage got slower than --tolerance.
+
+Baselines are machine-specific and are not committed (baselines/ is git-ignored):
+make one locally before a change and compare against it after. Each records the
+host it ran on and the revision, with "-dirty" when the working tree had
+uncommitted changes; --compare warns when host, CPU count or corpus differ.
+
+Usage: python bench.py [--size-mb 20] [--seed 0] [--stages ...] [--repeat 3]
+                       [--out baselines/NAME.json] [--compare baselines/OLD.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parent
+LAB_DIRS = [ROOT / "Lab 1", ROOT / "Lab 2", ROOT / "Lab 3"]
+
+
+# --- Stages: setup (not timed) returns the input, run returns the counts ---
+
+def read_text(corpus: Path) -> str:
+    return corpus.read_text(encoding="utf-8", errors="ignore")
+
+
+def sentence_tokenizer(corpus: Path, work: Path) -> Tuple[Callable[[], Dict[str, int]], int]:
+    from sentence_tokenizer_Regex import gujarati_sentence_tokenizer
+
+    text = read_text(corpus)
+
+    def run() -> Dict[str, int]:
+        sentences = gujarati_sentence_tokenizer(text)
+        return {"sentences": len(sentences), "tokens": sum(len(s.split()) for s in sentences)}
+    return run, corpus.stat().st_size
+
+
+def chunked_text_generator(corpus: Path, work: Path) -> Tuple[Callable[[], Dict[str, int]], int]:
+    from sentence_tokenizer_Regex import ChunkedTextGenerator
+
+    def run() -> Dict[str, int]:
+        chunks = chars = 0
+        for chunk in ChunkedTextGenerator(str(corpus), char_limit=1000000, sentence_safe=True):
+            chunks += 1
+            chars += len(chunk)
+        return {"chunks": chunks, "chars": chars}
+    return run, corpus.stat().st_size
+
+
+def sentence_dedup(corpus: Path, work: Path) -> Tuple[Callable[[], Dict[str, int]], int]:
+    from sentence_dedup import dedup_file_parallel
+
+    out = work / "sentences_dedup.txt"
+
+    def run() -> Dict[str, int]:
+        report = dedup_file_parallel(str(corpus), str(out), workers=1, char_limit=1000000, near=True)
+        return {"sentences": report["sentences_in"], "kept": report["sentences_out"],
+                "exact_duplicates": report["exact_duplicates"], "near_duplicates": report["near_duplicates"]}
+    return run, corpus.stat().st_size
+
+
+def word_tokenizer(corpus: Path, work: Path) -> Tuple[Callable[[], Dict[str, int]], int]:
+    from word_tokenizer_Regex import SENTENCE_END_TOKENS, gujarati_word_tokenizer
+
+    text = read_text(corpus)
+
+    def run() -> Dict[str, int]:
+        tokens = gujarati_word_tokenizer(text)
+        return {"tokens": len(tokens), "sentences": sum(t in SENTENCE_END_TOKENS for t in tokens)}
+    return run, corpus.stat().st_size
+
+
+def process_in_chunks(corpus: Path, work: Path) -> Tuple[Callable[[], Dict[str, int]], int]:
+    from word_tokenizer_Regex import process_in_chunks as process
+
+    out = work / "words.txt"
+
+    def run() -> Dict[str, int]:
+        process(str(corpus), str(out))
+        tokens = lines = 0
+        with out.open(encoding="utf-8") as f:
+            for line in f:
+                tokens += len(line.split())
+                lines += 1
+        return {"tokens": tokens, "sentences": lines}
+    return run, corpus.stat().st_size
+
+
+def process_file_bytes(corpus: Path, work: Path) -> Tuple[Callable[[], Dict[str, int]], int]:
+    from byte_tokenizer import byte_word_pattern, process_file_bytes as process
+
+    byte_word_pattern()  # built once per process, not part of the timing
+    out = work / "words_bytes.txt"
+
+    def run() -> Dict[str, int]:
+        process(str(corpus), str(out))
+        tokens = lines = 0
+        with out.open(encoding="utf-8") as f:
+            for line in f:
+                tokens += len(line.split())
+                lines += 1
+        return {"tokens": tokens, "sentences": lines}
+    return run, corpus.stat().st_size
+
+
+def analyze_word(corpus: Path, work: Path) -> Tuple[Callable[[], Dict[str, int]], int]:
+    from q2 import NounMorphologyFST
+
+    words = re.findall(r"[A-Za-z]+", read_text(corpus))
+    with contextlib.redirect_stdout(sys.stderr):
+        fst = NounMorphologyFST(str(ROOT / "Lab 2" / "brown_nouns.txt"))
+
+    def run() -> Dict[str, int]:
+        valid = sum(fst.analyze_word(w) != "Invalid Word" for w in words)
+        return {"tokens": len(words), "valid": valid}
+    return run, sum(map(len, words))
+
+
+def count_frequencies(corpus: Path, work: Path) -> Tuple[Callable[[], Dict[str, int]], int]:
+    from freq_distribution import count_frequencies as count, read_tokens, top_k
+    from word_tokenizer_Regex import process_in_chunks as process
+
+    words_file = work / "count_words.txt"
+    process(str(corpus), str(words_file))
+
+    def run() -> Dict[str, int]:
+        freq = count(read_tokens(words_file))
+        top_k(freq, 100)
+        return {"tokens": sum(freq.values()), "types": len(freq)}
+    return run, words_file.stat().st_size
+
+
+STAGES: Dict[str, Callable[[Path, Path], Tuple[Callable[[], Dict[str, int]], int]]] = {
+    "sentence_tokenizer": sentence_tokenizer,
+    "chunked_text_generator": chunked_text_generator,
+    "sentence_dedup": sentence_dedup,
+    "word_tokenizer": word_tokenizer,
+    "process_in_chunks": process_in_chunks,
+    "process_file_bytes": process_file_bytes,
+    "analyze_word": analyze_word,
+    "count_frequencies": count_frequencies,
+}
+
+
+def run_stage(name: str, corpus: Path, work: Path, repeat: int) -> Dict:
+    # Runs inside the stage's own process
+    for d in LAB_DIRS:
+        sys.path.insert(0, str(d))
+    run, nbytes = STAGES[name](corpus, work)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        counts = run()
+        times.append(time.perf_counter() - start)
+    # ru_maxrss is in KB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    wall = min(times)
+    result = {
+        "wall_s": round(wall, 4),
+        "wall_all_s": [round(t, 4) for t in times],
+        "input_bytes": nbytes,
+        "mb_per_s": round(nbytes / wall / 1e6, 3) if wall else None,
+        "peak_rss_mb": round(peak / (1 << 20), 1),
+        "setup_rss_mb": round(rss_before * scale / (1 << 20), 1),
+        "counts": counts,
+    }
+    for key in ("tokens", "sentences"):
+        if key in counts:
+            result[f"{key}_per_s"] = round(counts[key] / wall, 1) if wall else None
+    return result
+
+
+def stage_in_subprocess(name: str, corpus: Path, work: Path, repeat: int) -> Dict:
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--stage", name,
+           "--corpus", str(corpus), "--work-dir", str(work), "--repeat", str(repeat)]
+    proc = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def git_revision() -> str | None:
+    # short hash of HEAD, plus "-dirty" if tracked files have uncommitted changes
+    try:
+        out = subprocess.run(["git", "-C", str(ROOT), "describe", "--always", "--dirty", "--abbrev=7"],
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def host_info() -> Dict:
+    return {
+        "name": platform.node(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def print_table(results: Dict[str, Dict]) -> None:
+    print(f"{'stage':24} {'wall s':>8} {'tokens/s':>12} {'sent/s':>10} {'MB/s':>8} {'peak MB':>8}")
+    for name, r in results.items():
+        print(f"{name:24} {r['wall_s']:>8.3f} {r.get('tokens_per_s') or 0:>12.0f} "
+              f"{r.get('sentences_per_s') or 0:>10.0f} {r['mb_per_s'] or 0:>8.2f} {r['peak_rss_mb']:>8.1f}")
+
+
+def compare(results: Dict[str, Dict], baseline: Dict, corpus: Dict, tolerance: float) -> List[str]:
+    regressions = []
+    old = baseline["stages"]
+    print(f"\nAgainst {baseline.get('git_revision')} ({baseline.get('created')}):")
+    host = host_info()
+    for key, label in [("name", "host"), ("cpu_count", "CPU count"), ("python", "Python")]:
+        if baseline.get("host", {}).get(key) != host[key]:
+            print(f"  warning: {label} differs ({baseline.get('host', {}).get(key)} vs {host[key]}), "
+                  f"timings are not comparable")
+    if baseline.get("corpus") != corpus:
+        print(f"  warning: corpus differs ({baseline.get('corpus')} vs {corpus})")
+    for name, r in results.items():
+        if name not in old:
+            continue
+        ratio = r["wall_s"] / old[name]["wall_s"] if old[name]["wall_s"] else float("inf")
+        rss = r["peak_rss_mb"] - old[name]["peak_rss_mb"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  <-- slower"
+            regressions.append(name)
+        if r["counts"] != old[name]["counts"]:
+            flag += "  (output counts differ)"
+        print(f"  {name:24} time x{ratio:.2f}  peak RSS {rss:+.1f} MB{flag}")
+    return regressions
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the tokenizers, analyzer and frequency counting")
+    ap.add_argument("--size-mb", type=float, default=20)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    ap.add_argument("--repeat", type=int, default=1, help="runs per stage; the fastest is reported")
+    ap.add_argument("--corpus", type=Path, help="use this file instead of generating one")
+    ap.add_argument("--out", type=Path, help="baseline JSON to write (default baselines/<host>-<revision>.json)")
+    ap.add_argument("--compare", type=Path, help="baseline JSON to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown before a stage is flagged")
+    ap.add_argument("--stage", help=argparse.SUPPRESS)
+    ap.add_argument("--work-dir", type=Path, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.stage:
+        # child process: run one stage, result as the last line of stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            result = run_stage(args.stage, args.corpus, args.work_dir, args.repeat)
+        print(json.dumps(result))
+        return
+
+    from synth_corpus import generate_corpus
+
+    # read before this run writes its own baseline, which may be the same file
+    old_baseline = json.loads(args.compare.read_text(encoding="utf-8")) if args.compare else None
+
+    with tempfile.TemporaryDirectory(prefix="nlp_bench_") as tmp:
+        work = Path(tmp)
+        corpus = args.corpus
+        if corpus is None:
+            corpus = work / f"synth_{args.size_mb:g}mb_seed{args.seed}.txt"
+            generate_corpus(corpus, int(args.size_mb * (1 << 20)), args.seed)
+        print(f"Corpus: {corpus} ({corpus.stat().st_size} bytes)")
+        results = {}
+        for name in args.stages:
+            results[name] = stage_in_subprocess(name, corpus, work, args.repeat)
+            print(f"  {name}: {results[name]['wall_s']:.3f} s")
+
+    print()
+    print_table(results)
+    revision = git_revision()
+    host = host_info()
+    corpus_info = {"generated": args.corpus is None, "size_mb": args.size_mb, "seed": args.seed,
+                   "path": None if args.corpus is None else str(args.corpus)}
+    baseline = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_revision": revision,
+        "host": host,
+        "corpus": corpus_info,
+        "repeat": args.repeat,
+        "stages": results,
+    }
+    out = args.out or HERE / "baselines" / f"{host['name'] or 'host'}-{revision or 'baseline'}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(baseline, indent=2), encoding="utf-8")
+    print(f"\nWrote {out}")
+
+    if old_baseline is not None:
+        regressions = compare(results, old_baseline, corpus_info, args.tolerance)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Deterministic synthetic Gujarati/English corpus for the benchmarks.
+
+The same (size, seed) always gives the same bytes, so timings from different
+versions of the code are measured on identical input. The text mixes what the
+Lab 1 tokenizers have to handle: Gujarati words (Zipf-distributed, with matras
+and conjuncts), English words and plural nouns, ASCII and Gujarati digits,
+numbers with dots, dates in both styles, URLs, e-mail lines, abbreviations,
+ellipses and all sentence-ending marks.
+
+Usage: python synth_corpus.py OUT_FILE [--size-mb 20] [--seed 0]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+from itertools import accumulate
+from pathlib import Path
+from typing import List
+
+CONSONANTS = [chr(c) for c in range(0x0A95, 0x0AB9 + 1) if c not in (0x0AA9, 0x0AB1, 0x0AB4)]
+VOWELS = ["અ", "આ", "ઇ", "ઈ", "ઉ", "એ", "ઓ"]
+MATRAS = ["", "", "", "ા", "િ", "ી", "ુ", "ૂ", "ે", "ૈ", "ો", "ૌ", "ં"]
+VIRAMA = "્"
+GUJ_DIGITS = "૦૧૨૩૪૫૬૭૮૯"
+MONTHS = ["જાન્યુઆરી", "ફેબ્રુઆરી", "માર્ચ", "એપ્રિલ", "મે", "જૂન", "જુલાઈ", "ઑગસ્ટ", "સપ્ટેમ્બર",
+          "ઑક્ટોબર", "નવેમ્બર", "ડિસેમ્બર"]
+ABBRS = ["Dr.", "Mr.", "Mrs.", "Prof.", "St.", "ડૉ.", "શ્રી.", "પ્રો.", "સ્વ.", "એલ.સી.બી.", "પી.એસ.આઇ."]
+ENGLISH = ["city", "cities", "fox", "foxes", "child", "children", "watch", "watches", "bag", "bags",
+           "house", "houses", "analysis", "analyses", "market", "markets", "school", "schools", "man",
+           "men", "company", "companies", "policy", "policies", "government", "news", "people", "the",
+           "and", "report", "reports", "mouse", "mice", "class", "classes", "box", "boxes", "data"]
+DOMAINS = ["example.com", "news.gujarat.in", "www.indiccorp.org", "data.gov.in"]
+SENTENCE_ENDS = [".", ".", ".", "?", "!", "।"]
+
+
+def make_vocabulary(rng: random.Random, size: int) -> List[str]:
+    words = set()
+    while len(words) < size:
+        syllables = []
+        if rng.random() < 0.15:
+            syllables.append(rng.choice(VOWELS))
+        for _ in range(rng.randint(1, 4)):
+            c = rng.choice(CONSONANTS)
+            if rng.random() < 0.12:
+                c += VIRAMA + rng.choice(CONSONANTS)  # conjunct
+            syllables.append(c + rng.choice(MATRAS))
+        words.add("".join(syllables))
+    return sorted(words)
+
+
+class CorpusGenerator:
+    def __init__(self, seed: int = 0, vocab_size: int = 20000):
+        self.rng = random.Random(seed)
+        self.vocab = make_vocabulary(self.rng, vocab_size)
+        # Zipf-like word frequencies (cumulative, so choices() doesn't re-add them per call)
+        self.cum_weights = list(accumulate(1.0 / (rank + 1) for rank in range(len(self.vocab))))
+
+    def number(self) -> str:
+        rng = self.rng
+        r = rng.random()
+        if r < 0.4:
+            return "".join(rng.choice(GUJ_DIGITS) for _ in range(rng.randint(1, 4)))
+        if r < 0.7:
+            return str(rng.randint(0, 99999))
+        return f"{rng.randint(1, 999)}.{rng.randint(0, 99)}"
+
+    def date(self) -> str:
+        rng = self.rng
+        if rng.random() < 0.5:
+            return f"{rng.randint(1, 28)}/{rng.randint(1, 12)}/{rng.randint(1990, 2030)}"
+        return f"{rng.randint(1, 28)} {rng.choice(MONTHS)} {rng.randint(1990, 2030)}"
+
+    def url(self) -> str:
+        rng = self.rng
+        path = "/".join(rng.choice(ENGLISH) for _ in range(rng.randint(0, 3)))
+        return f"https://{rng.choice(DOMAINS)}/{path}"
+
+    def token(self) -> str:
+        rng = self.rng
+        r = rng.random()
+        if r < 0.76:
+            return rng.choices(self.vocab, cum_weights=self.cum_weights)[0]
+        if r < 0.86:
+            return rng.choice(ENGLISH)
+        if r < 0.92:
+            return self.number()
+        if r < 0.94:
+            return self.date()
+        if r < 0.95:
+            return self.url()
+        if r < 0.97:
+            return rng.choice(ABBRS)
+        if r < 0.98:
+            return "..."
+        return ","
+
+    def sentence(self) -> str:
+        words = [self.token() for _ in range(self.rng.randint(4, 18))]
+        return " ".join(words) + self.rng.choice(SENTENCE_ENDS)
+
+    def line(self) -> str:
+        rng = self.rng
+        if rng.random() < 0.01:
+            # a line that is only an e-mail address (the e-mail pattern is anchored)
+            return f"{rng.choice(ENGLISH)}.{rng.randint(1, 999)}@{rng.choice(DOMAINS)}"
+        return " ".join(self.sentence() for _ in range(rng.randint(1, 6)))
+
+
+def generate_corpus(out_path: Path, size_bytes: int, seed: int = 0) -> int:
+    # Writes whole lines until at least size_bytes (UTF-8) are written
+    gen = CorpusGenerator(seed)
+    written = 0
+    with Path(out_path).open("w", encoding="utf-8", newline="\n") as f:
+        while written < size_bytes:
+            line = gen.line() + "\n"
+            f.write(line)
+            written += len(line.encode("utf-8"))
+    return written
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Generate a deterministic synthetic Gujarati/English corpus")
+    ap.add_argument("out", type=Path)
+    ap.add_argument("--size-mb", type=float, default=20)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    n = generate_corpus(args.out, int(args.size_mb * (1 << 20)), args.seed)
+    print(f"Wrote {n} bytes to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""
+Local tokenization service: the Lab 1 sentence and word tokenizers and the Lab 2
+noun analyzer behind one long-running asyncio server, over HTTP on TCP or a Unix
+socket. Only the standard library is used and nothing leaves the machine.
+
+Endpoints (JSON in, JSON out):
+  POST /sentences  {"text": "..."} -> {"sentences": [...]}
+                   {"texts": [...]} -> {"sentences": [[...], ...]}
+  POST /words      {"text": "..."} -> {"tokens": [...]}
+                   {"texts": [...]} -> {"tokens": [[...], ...]}
+  POST /analyze    {"word": "..."} -> {"analysis": {...}}
+                   {"words": [...]} -> {"analyses": [{...}, ...]}
+                   each analysis is {"word", "lemma", "number", "analysis"}, where
+                   "analysis" is NounMorphologyFST.analyze_word's string
+  GET  /stats      requests, p50/p99 latency per endpoint, queue depth, batch sizes
+  GET  /health
+
+The tokenizers run in a process pool whose workers import the labs once and load
+the noun lexicon once (from its prebuilt snapshot, see Lab 2/noun_lexicon.py).
+Requests are micro-batched: each endpoint has a queue, and a batch is sent to
+the pool when a worker is free. It takes every request queued by then, up to
+--max-batch-items items or --max-batch-chars characters. So an idle server
+answers one request at a time with no added delay. Under load, many small
+requests share one round trip to a worker. --max-delay-ms additionally holds a
+batch open for that long to collect more.
+
+Usage: python tokenize_service.py [--host 127.0.0.1] [--port 8765] [--unix PATH]
+                                  [--workers N] [--max-batch-items 256] [--max-delay-ms 0]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import http.client
+import json
+import os
+import socket
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+for lab in ("Lab 1", "Lab 2"):
+    if str(ROOT / lab) not in sys.path:
+        sys.path.insert(0, str(ROOT / lab))
+
+from q2 import NounMorphologyFST  # noqa: E402
+from sentence_tokenizer_Regex import gujarati_sentence_tokenizer  # noqa: E402
+from word_tokenizer_Regex import gujarati_word_tokenizer  # noqa: E402
+
+DEFAULT_NOUNS = ROOT / "Lab 2" / "brown_nouns.txt"
+LATENCY_WINDOW = 10000  # latencies kept per endpoint for the percentiles
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+# --- Worker side ---
+
+_worker_fst: Optional[NounMorphologyFST] = None
+
+
+def _init_worker(nouns_file: str) -> None:
+    global _worker_fst
+    with contextlib.redirect_stdout(sys.stderr):
+        _worker_fst = NounMorphologyFST(nouns_file)
+
+
+def analysis_record(fst: NounMorphologyFST, word: str) -> Dict[str, Optional[str]]:
+    result = fst.analyze(word.strip().lower())
+    return {"word": word,
+            "lemma": None if result is None else result[0],
+            "number": None if result is None else result[1],
+            "analysis": fst.analyze_word(word)}
+
+
+def run_batch(op: str, items: List[str]) -> List[Any]:
+    if op == "sentences":
+        return [gujarati_sentence_tokenizer(t) for t in items]
+    if op == "words":
+        return [gujarati_word_tokenizer(t) for t in items]
+    return [analysis_record(_worker_fst, w) for w in items]
+
+
+# --- Server side ---
+
+# op -> (single key, list key, response key for one, response key for many)
+OPS = {
+    "sentences": ("text", "texts", "sentences", "sentences"),
+    "words": ("text", "texts", "tokens", "tokens"),
+    "analyze": ("word", "words", "analysis", "analyses"),
+}
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class Batcher:
+    # One queue per endpoint; run() turns queued requests into pool batches
+
+    def __init__(self, service: "TokenizeService", op: str) -> None:
+        self.service = service
+        self.op = op
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.queued_items = 0
+        self.batches = 0
+        self.batched_items = 0
+        self.max_batch = 0
+
+    async def submit(self, items: List[str]) -> List[Any]:
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((items, future))
+        self.queued_items += len(items)
+        self.service.note_queue_depth()
+        return await future
+
+    def _size(self, items: List[str]) -> int:
+        return sum(map(len, items))
+
+    async def run(self) -> None:
+        svc = self.service
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            # wait for a free worker; requests arriving meanwhile join this batch
+            await svc.slots.acquire()
+            n, chars = len(batch[0][0]), self._size(batch[0][0])
+            deadline = loop.time() + svc.max_delay
+            while n < svc.max_batch_items and chars < svc.max_batch_chars:
+                if self.queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self.queue.get_nowait())
+                n += len(batch[-1][0])
+                chars += self._size(batch[-1][0])
+            self.queued_items -= n
+            asyncio.create_task(self._dispatch(batch, n))
+
+    async def _dispatch(self, batch: List[Tuple[List[str], asyncio.Future]], n: int) -> None:
+        svc = self.service
+        svc.in_flight += 1
+        try:
+            flat = [item for items, _ in batch for item in items]
+            results = await asyncio.get_running_loop().run_in_executor(svc.pool, run_batch, self.op, flat)
+        except Exception as e:  # pool failure: fail the requests, keep serving
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            pos = 0
+            for items, future in batch:
+                if not future.done():
+                    future.set_result(results[pos:pos + len(items)])
+                pos += len(items)
+            self.batches += 1
+            self.batched_items += n
+            self.max_batch = max(self.max_batch, n)
+        finally:
+            svc.in_flight -= 1
+            svc.slots.release()
+
+
+class TokenizeService:
+    def __init__(
+        self,
+        workers: int,
+        nouns_file: Path = DEFAULT_NOUNS,
+        max_batch_items: int = 256,
+        max_batch_chars: int = 1000000,
+        max_delay_ms: float = 0.0,
+        max_body: int = 16 << 20,
+    ) -> None:
+        self.workers = workers
+        self.nouns_file = nouns_file
+        self.max_batch_items = max_batch_items
+        self.max_batch_chars = max_batch_chars
+        self.max_delay = max_delay_ms / 1000
+        self.max_body = max_body
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.slots: asyncio.Semaphore
+        self.batchers: Dict[str, Batcher] = {}
+        self.latencies: Dict[str, Deque[float]] = {op: deque(maxlen=LATENCY_WINDOW) for op in OPS}
+        self.requests: Dict[str, int] = {op: 0 for op in OPS}
+        self.errors = 0
+        self.in_flight = 0
+        self.max_queue_depth = 0
+        self.started = time.time()
+
+    async def start(self) -> None:
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(str(self.nouns_file),))
+        self.slots = asyncio.Semaphore(self.workers)
+        self.batchers = {op: Batcher(self, op) for op in OPS}
+        self._tasks = [asyncio.create_task(b.run()) for b in self.batchers.values()]
+        # start the workers now, not on the first request
+        await asyncio.gather(*(asyncio.get_running_loop().run_in_executor(self.pool, run_batch, "words", [""])
+                               for _ in range(self.workers)))
+
+    def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    def queue_depth(self) -> int:
+        return sum(b.queued_items for b in self.batchers.values())
+
+    def note_queue_depth(self) -> None:
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth())
+
+    def stats(self) -> Dict[str, Any]:
+        endpoints = {}
+        for op, window in self.latencies.items():
+            values = sorted(window)
+            b = self.batchers[op]
+            endpoints[op] = {
+                "requests": self.requests[op],
+                "p50_ms": None if not values else round(percentile(values, 0.50) * 1000, 3),
+                "p99_ms": None if not values else round(percentile(values, 0.99) * 1000, 3),
+                "batches": b.batches,
+                "mean_batch_items": round(b.batched_items / b.batches, 2) if b.batches else None,
+                "max_batch_items": b.max_batch,
+                "queued_items": b.queued_items,
+            }
+        return {"uptime_s": round(time.time() - self.started, 1), "workers": self.workers,
+                "queue_depth": self.queue_depth(), "max_queue_depth": self.max_queue_depth,
+                "batches_in_flight": self.in_flight, "errors": self.errors, "endpoints": endpoints}
+
+    async def route(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        path = path.split("?", 1)[0].rstrip("/") or "/"
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/stats":
+            return 200, self.stats()
+        op = path.lstrip("/")
+        if op not in OPS:
+            return 404, {"error": f"unknown endpoint {path}"}
+        if method != "POST":
+            return 405, {"error": f"{path} takes POST"}
+        one_key, many_key, one_out, many_out = OPS[op]
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError as e:
+            return 400, {"error": f"invalid JSON: {e}"}
+        if isinstance(payload, dict) and isinstance(payload.get(one_key), str):
+            items, single = [payload[one_key]], True
+        elif isinstance(payload, dict) and isinstance(payload.get(many_key), list) \
+                and all(isinstance(t, str) for t in payload[many_key]):
+            items, single = payload[many_key], False
+        else:
+            return 400, {"error": f'expected {{"{one_key}": string}} or {{"{many_key}": [strings]}}'}
+        start = time.perf_counter()
+        results = await self.batchers[op].submit(items) if items else []
+        self.latencies[op].append(time.perf_counter() - start)
+        self.requests[op] += 1
+        return 200, {one_out: results[0]} if single else {many_out: results}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # HTTP/1.1 with keep-alive; bodies need Content-Length (no chunked uploads)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                method, path, _ = line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = h.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                keep_alive = headers.get("connection", "").lower() != "close"
+                if length > self.max_body:
+                    status, payload = 413, {"error": f"body over {self.max_body} bytes"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length)
+                    try:
+                        status, payload = await self.route(method, path, body)
+                    except Exception as e:
+                        status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                if status != 200:
+                    self.errors += 1
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                        f"Content-Type: application/json; charset=utf-8\r\n"
+                        f"Content-Length: {len(data)}\r\n")
+                if not keep_alive:
+                    head += "Connection: close\r\n"
+                writer.write(head.encode("latin-1") + b"\r\n" + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def report(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            print(json.dumps(self.stats()), file=sys.stderr, flush=True)
+
+
+async def serve(args: argparse.Namespace) -> None:
+    service = TokenizeService(args.workers, args.nouns, args.max_batch_items, args.max_batch_chars,
+                              args.max_delay_ms, args.max_body_mb << 20)
+    await service.start()
+    if args.unix:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(args.unix)
+        server = await asyncio.start_unix_server(service.handle, path=args.unix)
+        where = args.unix
+    else:
+        server = await asyncio.start_server(service.handle, args.host, args.port)
+        where = f"http://{args.host}:{args.port}"
+    print(f"Serving on {where} with {args.workers} workers", file=sys.stderr, flush=True)
+    reporter = asyncio.create_task(service.report(args.report_interval)) if args.report_interval > 0 else None
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if reporter is not None:
+            reporter.cancel()
+        service.close()
+
+
+# --- Client for other Python code ---
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class TokenizeClient:
+    # One keep-alive connection; TokenizeClient(unix="/tmp/tok.sock") for a Unix socket
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, unix: str | None = None,
+                 timeout: float = 60.0) -> None:
+        if unix:
+            self.conn: http.client.HTTPConnection = _UnixHTTPConnection(unix, timeout)
+        else:
+            self.conn = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def request(self, method: str, path: str, payload: Any = None) -> Any:
+        body = None if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        self.conn.request(method, path, body, headers)
+        resp = self.conn.getresponse()
+        data = json.loads(resp.read())
+        if resp.status != 200:
+            raise RuntimeError(f"{path}: {resp.status} {data.get('error')}")
+        return data
+
+    def sentences(self, text: str) -> List[str]:
+        return self.request("POST", "/sentences", {"text": text})["sentences"]
+
+    def words(self, text: str) -> List[str]:
+        return self.request("POST", "/words", {"text": text})["tokens"]
+
+    def analyze(self, words: List[str]) -> List[Dict[str, Optional[str]]]:
+        return self.request("POST", "/analyze", {"words": words})["analyses"]
+
+    def stats(self) -> Dict[str, Any]:
+        return self.request("GET", "/stats")
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Local batching server for the Lab 1 tokenizers and Lab 2 analyzer")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--nouns", type=Path, default=DEFAULT_NOUNS, help="noun list for /analyze")
+    ap.add_argument("--max-batch-items", type=int, default=256, help="texts or words per pool call")
+    ap.add_argument("--max-batch-chars", type=int, default=1000000, help="characters per pool call")
+    ap.add_argument("--max-delay-ms", type=float, default=0.0,
+                    help="how long a batch may wait for more requests once a worker is free")
+    ap.add_argument("--max-body-mb", type=int, default=16)
+    ap.add_argument("--report-interval", type=float, default=0.0,
+                    help="print /stats to stderr every N seconds (0 = never)")
+    args = ap.parse_args()
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()